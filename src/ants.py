@@ -0,0 +1,220 @@
+# ******************************* ants.py ***********************************
+#  Course: Soft Computing (SFC) - FIT BUT
+#  Project name: Shortest path search simulation using ACO
+#  Author: Beranek Tomas (xberan46)
+#  Date: 26.11.2022
+#  Up2date sources: https://github.com/TomasBeranek/but-sfc-project
+# ***************************************************************************
+
+
+import numpy as np
+
+
+# initial length of the path buffers, they grow when a longer path is needed
+PATH_CAPACITY = 16
+
+# arrays with the state of the ants, the index of positions of nodes in paths
+# is not a part of the state, it is rebuilt from the paths
+ANT_ARRAYS = ['next_node', 'last_node', 'last_edge', 'has_food', 'recently_acquired_food', 'recently_deposited_food', 'pheromone_increment', 'path', 'path_edges', 'path_len']
+
+# the index of positions of nodes in paths takes (ants x nodes) items, the
+# paths are searched instead if it would take more bytes than this
+NODE_POSITIONS_MEMORY_LIMIT = 256 * 1024 * 1024
+
+
+class AntTable:
+    # state of all the ants in preallocated NumPy arrays with one item (or
+    # row) per ant, so that there is no per-ant object and the state can be
+    # updated for many ants at once
+    def __init__(self, graph, ant_cnt):
+        self.graph = graph
+
+        self.next_node = np.full(ant_cnt, graph.start_node, dtype=np.int32)
+        self.last_node = np.full(ant_cnt, graph.start_node, dtype=np.int32)
+        # -1 until the ant takes its first edge
+        self.last_edge = np.full(ant_cnt, -1, dtype=np.int32)
+        self.has_food = np.zeros(ant_cnt, dtype=bool)
+        self.recently_acquired_food = np.zeros(ant_cnt, dtype=bool)
+        self.recently_deposited_food = np.zeros(ant_cnt, dtype=bool)
+        self.pheromone_increment = np.zeros(ant_cnt)
+
+        # visited nodes (without loops) and the edges the ant took from them,
+        # the first path_len items of each row are valid -- the path of the
+        # edges is shorter by one only between saving a node and sending the
+        # ant further
+        capacity = min(PATH_CAPACITY, max(graph.node_cnt, 1))
+        self.path = np.zeros((ant_cnt, capacity), dtype=np.int32)
+        self.path_edges = np.zeros((ant_cnt, capacity), dtype=np.int32)
+        self.path_len = np.zeros(ant_cnt, dtype=np.int32)
+
+        # position of each node in the path of each ant, it is valid only if
+        # the path really has the node at that position, so it never has to
+        # be cleared when a path is shortened
+        dtype = np.min_scalar_type(graph.node_cnt)
+        if ant_cnt * graph.node_cnt * dtype.itemsize <= NODE_POSITIONS_MEMORY_LIMIT:
+            self.node_positions = np.zeros((ant_cnt, graph.node_cnt), dtype=dtype)
+        else:
+            self.node_positions = None
+
+    def __len__(self):
+        return len(self.next_node)
+
+    def __getitem__(self, i):
+        return Ant(self, i)
+
+    def __iter__(self):
+        return (Ant(self, i) for i in range(len(self)))
+
+    @property
+    def path_capacity(self):
+        return self.path.shape[1]
+
+    # a path without loops never has more nodes than the graph
+    def ensure_path_capacity(self, length):
+        if length <= self.path_capacity:
+            return
+
+        capacity = min(max(length, 2 * self.path_capacity), self.graph.node_cnt)
+
+        for name in ['path', 'path_edges']:
+            old = getattr(self, name)
+            new = np.zeros((len(self), capacity), dtype=old.dtype)
+            new[:, :old.shape[1]] = old
+            setattr(self, name, new)
+
+    # position of the node in the path of the ant, or -1
+    def find_in_path(self, i, node):
+        path_len = self.path_len[i]
+
+        if self.node_positions is not None:
+            position = int(self.node_positions[i, node])
+            if position < path_len and self.path[i, position] == node:
+                return position
+            return -1
+
+        positions = np.flatnonzero(self.path[i, :path_len] == node)
+        return int(positions[0]) if len(positions) else -1
+
+    # find_in_path for many ants at once (an ant can be given more times,
+    # with different nodes)
+    def find_in_paths(self, ants, nodes):
+        path_lens = self.path_len[ants]
+
+        if self.node_positions is not None:
+            positions = self.node_positions[ants, nodes].astype(np.int64)
+            valid = (positions < path_lens) & (self.path[ants, np.minimum(positions, self.path_capacity - 1)] == nodes)
+            return np.where(valid, positions, -1)
+
+        width = int(path_lens.max()) if len(ants) else 0
+        if not width:
+            return np.full(len(ants), -1)
+
+        matches = (self.path[ants, :width] == nodes[:, None]) & (np.arange(width) < path_lens[:, None])
+        return np.where(matches.any(axis=1), np.argmax(matches, axis=1), -1)
+
+    # the next node of the ant is added to its path, if the path already has
+    # the node, the loop is removed first
+    def save_node_to_path(self, i):
+        node = self.next_node[i]
+        position = self.find_in_path(i, node)
+        path_len = position if position >= 0 else int(self.path_len[i])
+
+        self.ensure_path_capacity(path_len + 1)
+        self.path[i, path_len] = node
+        if self.node_positions is not None:
+            self.node_positions[i, node] = path_len
+        self.path_len[i] = path_len + 1
+
+    # save_node_to_path for many (distinct) ants at once
+    def save_nodes_to_paths(self, ants):
+        if not len(ants):
+            return
+
+        nodes = self.next_node[ants]
+        positions = self.find_in_paths(ants, nodes)
+        path_lens = np.where(positions >= 0, positions, self.path_len[ants])
+
+        self.ensure_path_capacity(int(path_lens.max()) + 1)
+        self.path[ants, path_lens] = nodes
+        if self.node_positions is not None:
+            self.node_positions[ants, nodes] = path_lens
+        self.path_len[ants] = path_lens + 1
+
+    # replaces the path of the ant by another path without loops (e.g. by a
+    # shortened one)
+    def set_path(self, i, path, path_edges):
+        path_len = len(path)
+        self.path[i, :path_len] = path
+        self.path_edges[i, :path_len] = path_edges
+        if self.node_positions is not None:
+            self.node_positions[i, path] = np.arange(path_len)
+        self.path_len[i] = path_len
+
+    # the ants start from scratch in the start node
+    def reset(self, ants):
+        start_node = self.graph.start_node
+        self.next_node[ants] = start_node
+        self.last_node[ants] = start_node
+        self.last_edge[ants] = -1
+        self.has_food[ants] = False
+        self.recently_acquired_food[ants] = False
+        self.recently_deposited_food[ants] = False
+        self.pheromone_increment[ants] = 0.0
+        self.path_len[ants] = 0
+
+    # ants which walk over the edge or have it in their paths
+    def find_ants_using_edge(self, edge):
+        width = int(self.path_len.max()) if len(self) else 0
+        in_path = ((self.path_edges[:, :width] == edge) & (np.arange(width) < self.path_len[:, None])).any(axis=1)
+        return np.flatnonzero(in_path | (self.last_edge == edge))
+
+    def get_arrays(self):
+        return {name: getattr(self, name) for name in ANT_ARRAYS}
+
+    # restores the state from get_arrays of a table with the same number of
+    # ants (and the same graph)
+    def set_arrays(self, arrays):
+        for name in ANT_ARRAYS:
+            setattr(self, name, arrays[name])
+
+        if self.node_positions is not None:
+            ants, positions = np.nonzero(np.arange(self.path_capacity) < self.path_len[:, None])
+            self.node_positions[ants, self.path[ants, positions]] = positions
+
+    def get_path(self, i):
+        return self.path[i, :self.path_len[i]].tolist()
+
+    def get_path_edges(self, i):
+        return self.path_edges[i, :self.path_len[i]].tolist()
+
+
+def ant_property(name):
+    return property(lambda ant: getattr(ant.table, name)[ant.id].item(),
+                    lambda ant, value: getattr(ant.table, name).__setitem__(ant.id, value))
+
+
+class Ant:
+    # view of one ant in the table, for code which works with single ants
+    def __init__(self, table, id):
+        self.table = table
+        self.id = id
+
+    next_node = ant_property('next_node')
+    last_node = ant_property('last_node')
+    has_food = ant_property('has_food')
+    recently_acquired_food = ant_property('recently_acquired_food')
+    recently_deposited_food = ant_property('recently_deposited_food')
+    pheromone_increment = ant_property('pheromone_increment')
+
+    @property
+    def last_edge(self):
+        edge = self.table.last_edge[self.id].item()
+        return None if edge < 0 else edge
+
+    @property
+    def path(self):
+        return self.table.get_path(self.id)
+
+    @property
+    def path_edges(self):
+        return self.table.get_path_edges(self.id)
@@ -0,0 +1,788 @@
+#!/usr/bin/env python3.8
+
+# ******************************* benchmark.py ******************************
+#  Course: Soft Computing (SFC) - FIT BUT
+#  Project name: Shortest path search simulation using ACO
+#  Author: Beranek Tomas (xberan46)
+#  Date: 26.11.2022
+#  Up2date sources: https://github.com/TomasBeranek/but-sfc-project
+# ***************************************************************************
+
+
+import argparse
+import concurrent.futures
+import heapq
+import json
+import math
+import multiprocessing as mp
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+from convergence import run_until_converged
+from graph import load_graph, read_graph_file, restructure_graph
+from options import INCREMENT_TYPES, STRATEGIES
+from queries import DEFAULT_PATIENCE, generate_queries, resolve_queries, run_queries
+from solver import ACOSolver
+from validation import check_graph_correctness
+
+
+# the GUI/headless application launched once per query by the queries benchmark
+ACO_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aco.py')
+
+# graphs/ examples, relative to this file
+EXAMPLE_GRAPHS = [os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'graphs', f'graph{i}.json')) for i in range(1, 4)]
+
+# ways of loading a graph compared by the loading benchmark
+LOADING_METHODS = ['json', 'stream', 'cache']
+
+# graphs of the solver benchmark -- files or specifications of generated graphs
+DEFAULT_BENCHMARK_GRAPHS = EXAMPLE_GRAPHS + ['grid:10x10', 'geometric:200', 'scale-free:200']
+
+# size of the area the generated graphs are placed in (the size of the GUI canvas)
+GRAPH_WIDTH = 1300
+GRAPH_HEIGHT = 700
+
+# average degree of nodes in generated random geometric graphs
+GEOMETRIC_DEGREE = 6
+
+# edges added with each node of generated scale-free graphs
+SCALE_FREE_EDGES = 2
+
+# changes of the graph after which the re-optimization is measured -- an
+# edge of the best found path is removed, a node of the best found path is
+# moved by PERTURBATION_DISTANCE, or a shortcut is added to the best found path
+PERTURBATIONS = ['remove-edge', 'move-node', 'add-edge']
+PERTURBATION_DISTANCE = 150
+
+# the GUI stack, which only a window needs
+GUI_MODULES = ['tkinter', 'PIL', 'Pmw', 'gui', 'render']
+
+# startup paths checked by the imports benchmark -- arguments of python
+# -X importtime (run in src/), modules the path mustn't import and the budget
+# of its total import time in seconds
+IMPORT_CHECKS = {
+    'cli': (['aco.py', '--help'], GUI_MODULES + ['numpy'], 0.1),
+    'validation': (['-c', 'import validation'], GUI_MODULES + ['numpy'], 0.05),
+    'headless': (['aco.py', '--headless', '-g', EXAMPLE_GRAPHS[0], '-a', '1', '-i', '1'], GUI_MODULES, 0.4)
+}
+
+
+def init_parser():
+    parser = argparse.ArgumentParser(description='Benchmarks of the ACO solver.')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    loading = subparsers.add_parser('loading', help='load time and peak memory of graph loading')
+    loading.add_argument('graph_files', nargs='*', help='JSON graph files (default: graphs/ examples)')
+    loading.add_argument('--edges', type=int, default=1000000, help='number of edges of the synthetic graph, 0 to skip it (default: 1000000)')
+    loading.add_argument('--nodes', type=int, default=200000, help='number of nodes of the synthetic graph (default: 200000)')
+    loading.add_argument('--seed', type=int, default=0, help='seed of the synthetic graph (default: 0)')
+
+    solver = subparsers.add_parser('solver', help='speed, memory and convergence of the headless solver, the results are written as JSON')
+    add_solver_arguments(solver)
+    solver.add_argument('--patience', type=int, default=None, help='a run stops when its best found path hasn\'t improved for PATIENCE iterations (default: run all the iterations)')
+
+    reoptimization = subparsers.add_parser('reoptimization', help='iterations and time to converge again after the graph changes, with the pheromone kept and from scratch, the results are written as JSON')
+    add_solver_arguments(reoptimization)
+    reoptimization.add_argument('--perturbation', choices=PERTURBATIONS, default='remove-edge', help='change of the graph after ITERATIONS iterations -- remove an edge of the best found path, move its node or add a shortcut to it (default: remove-edge)')
+
+    queries = subparsers.add_parser('queries', help='throughput of the multi-query solver (queries/s) compared to launching aco.py once per query, the results are written as JSON')
+    queries.add_argument('graph', help='JSON graph file or specification of a generated graph -- grid:ROWSxCOLS, geometric:NODES[xDEGREE], scale-free:NODES')
+    queries.add_argument('-n', '--queries', type=int, default=20, help='number of queries with start and end nodes drawn at random (default: 20)')
+    queries.add_argument('--query-seed', type=int, default=0, help='seed of the queries (default: 0)')
+    queries.add_argument('-a', '--ants', type=int, default=50, help='number of ants of each query (default: 50)')
+    queries.add_argument('-i', '--iterations', type=int, default=200, help='number of iterations of each query (default: 200)')
+    queries.add_argument('--patience', type=int, default=DEFAULT_PATIENCE, help=f'the multi-query solver is also measured with queries finished when their best paths haven\'t improved for PATIENCE iterations (default: {DEFAULT_PATIENCE})')
+    queries.add_argument('--workers', type=int, default=os.cpu_count(), help='number of worker processes, and of aco.py processes running at once (default: number of CPUs)')
+    queries.add_argument('--batched', action='store_true', help='select next nodes of all ants at once')
+    queries.add_argument('--graph-seed', type=int, default=0, help='seed of the generated graph (default: 0)')
+    queries.add_argument('-o', '--output', type=str, default=None, help='output JSON file (default: standard output)')
+
+    imports = subparsers.add_parser('imports', help='import time of the CLI, graph validation and headless startup paths, fails if a path imports the GUI stack (or NumPy where it isn\'t needed) or exceeds its budget')
+    imports.add_argument('--repeat', type=int, default=3, help='the shortest of REPEAT runs of each path is checked (default: 3)')
+
+    generate = subparsers.add_parser('generate', help='write a generated graph as a JSON graph file')
+    generate.add_argument('graph', help='specification of the graph -- grid:ROWSxCOLS, geometric:NODES[xDEGREE] or scale-free:NODES')
+    generate.add_argument('-o', '--output', type=str, required=True, help='output JSON graph file')
+    generate.add_argument('--seed', type=int, default=0, help='seed of the graph (default: 0)')
+
+    return parser
+
+
+def add_solver_arguments(parser):
+    parser.add_argument('graphs', nargs='*', help='JSON graph files or specifications of generated graphs -- grid:ROWSxCOLS, geometric:NODES[xDEGREE], scale-free:NODES (default: graphs/ examples, grid:10x10, geometric:200, scale-free:200)')
+    parser.add_argument('-a', '--ants', type=int, default=100, help='number of ants (default: 100)')
+    parser.add_argument('-i', '--iterations', type=int, default=1000, help='number of iterations of each run (default: 1000)')
+    parser.add_argument('--seeds', type=int, default=5, help='number of runs (with seeds 0..SEEDS-1) on each graph (default: 5)')
+    parser.add_argument('--tolerance', type=float, default=5, help='a path at most TOLERANCE %% longer than the optimum counts as found (default: 5)')
+    parser.add_argument('--alpha', type=float, default=1, help='influence of pheromones (default: 1)')
+    parser.add_argument('--beta', type=float, default=1, help='influence of edge length (default: 1)')
+    parser.add_argument('--evaporation', type=float, default=0.98, help='portion of pheromone kept after each iteration (default: 0.98)')
+    parser.add_argument('--increment-type', choices=INCREMENT_TYPES.keys(), default='constant', help='pheromone increment type (default: constant)')
+    parser.add_argument('--strategy', choices=STRATEGIES.keys(), default='as', help='pheromone update strategy (default: as)')
+    parser.add_argument('--candidates', type=int, default=None, metavar='K', help='ants at nodes with more than K neighbours select only among the K nearest ones (default: all the neighbours)')
+    parser.add_argument('--local-search', action='store_true', help='shorten the path of each ant which found food by shortcuts before it deposits pheromone')
+    parser.add_argument('--batched', action='store_true', help='select next nodes of all ants at once')
+    parser.add_argument('--graph-seed', type=int, default=0, help='seed of the generated graphs (default: 0)')
+    parser.add_argument('-o', '--output', type=str, default=None, help='output JSON file (default: standard output)')
+
+
+def create_graph(node_x, node_y, edges, start_node, end_node):
+    return {
+        'start_node_id': int(start_node),
+        'end_node_id': int(end_node),
+        'nodes': [{'id': i, 'x': x, 'y': y} for i, (x, y) in enumerate(zip(node_x, node_y))],
+        'edges': [{'from_node_id': int(a), 'to_node_id': int(b)} for a, b in edges]
+    }
+
+
+# start and end are placed to the opposite corners of the largest connected
+# component, so that there is always a path between them
+def select_start_end_nodes(node_x, node_y, edges):
+    node_cnt = len(node_x)
+    neighbours = [[] for _ in range(node_cnt)]
+    for a, b in edges:
+        neighbours[a].append(b)
+        neighbours[b].append(a)
+
+    components = np.full(node_cnt, -1)
+    for root in range(node_cnt):
+        if components[root] != -1:
+            continue
+        components[root] = root
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            for neighbour in neighbours[node]:
+                if components[neighbour] == -1:
+                    components[neighbour] = root
+                    stack.append(neighbour)
+
+    largest = np.flatnonzero(components == np.bincount(components).argmax())
+    corner_distance = np.asarray(node_x)[largest] + np.asarray(node_y)[largest]
+
+    return largest[corner_distance.argmin()], largest[corner_distance.argmax()]
+
+
+def generate_grid_graph(rows, cols, seed=None):
+    x_step = GRAPH_WIDTH / (cols + 1)
+    y_step = GRAPH_HEIGHT / (rows + 1)
+    node_x = [round((col + 1) * x_step) for row in range(rows) for col in range(cols)]
+    node_y = [round((row + 1) * y_step) for row in range(rows) for col in range(cols)]
+
+    edges = []
+    for row in range(rows):
+        for col in range(cols):
+            node = row * cols + col
+            if col + 1 < cols:
+                edges.append((node, node + 1))
+            if row + 1 < rows:
+                edges.append((node, node + cols))
+
+    return create_graph(node_x, node_y, edges, 0, rows * cols - 1)
+
+
+# nodes placed uniformly at random, connected if they are closer than a
+# radius giving the degree (GEOMETRIC_DEGREE by default) on average
+def generate_geometric_graph(node_cnt, degree=GEOMETRIC_DEGREE, seed=None):
+    rng = np.random.default_rng(seed)
+    node_x = rng.uniform(0, GRAPH_WIDTH, node_cnt).round(1)
+    node_y = rng.uniform(0, GRAPH_HEIGHT, node_cnt).round(1)
+    radius = math.sqrt(degree * GRAPH_WIDTH * GRAPH_HEIGHT / (math.pi * node_cnt))
+
+    # only nodes in a strip of the radius width have to be compared
+    order = np.argsort(node_x, kind='stable')
+    sorted_x = node_x[order]
+    edges = []
+
+    for i, node in enumerate(order.tolist()):
+        strip_end = np.searchsorted(sorted_x, sorted_x[i] + radius, side='right')
+        candidates = order[i + 1:strip_end]
+        distances = np.hypot(node_x[candidates] - node_x[node], node_y[candidates] - node_y[node])
+        # nodes at the same position would make an edge of zero length
+        close = (distances < radius) & (distances > 0)
+        edges.extend((node, neighbour) for neighbour in candidates[close].tolist())
+
+    start_node, end_node = select_start_end_nodes(node_x, node_y, edges)
+    return create_graph(node_x.tolist(), node_y.tolist(), edges, start_node, end_node)
+
+
+# Barabasi-Albert graph -- each new node is connected to SCALE_FREE_EDGES
+# existing nodes chosen with probability proportional to their degree,
+# the nodes are placed uniformly at random
+def generate_scale_free_graph(node_cnt, seed=None):
+    rng = np.random.default_rng(seed)
+    node_x = rng.integers(0, GRAPH_WIDTH, node_cnt)
+    node_y = rng.integers(0, GRAPH_HEIGHT, node_cnt)
+
+    # the initial nodes form a path
+    initial_cnt = min(SCALE_FREE_EDGES + 1, node_cnt)
+    edges = [(node, node + 1) for node in range(initial_cnt - 1)]
+    # every node is there once per its edge
+    edge_ends = [node for edge in edges for node in edge]
+
+    for node in range(initial_cnt, node_cnt):
+        targets = set()
+        while len(targets) < SCALE_FREE_EDGES:
+            targets.add(edge_ends[rng.integers(len(edge_ends))])
+
+        for target in sorted(targets):
+            edges.append((target, node))
+            edge_ends.extend((target, node))
+
+    # nodes at the same position would make an edge of zero length
+    lengths = np.hypot(*(np.array([[node_x[a] - node_x[b], node_y[a] - node_y[b]] for a, b in edges]).T))
+    edges = [edge for edge, length in zip(edges, lengths.tolist()) if length > 0]
+
+    start_node, end_node = select_start_end_nodes(node_x, node_y, edges)
+    return create_graph(node_x.tolist(), node_y.tolist(), edges, start_node, end_node)
+
+
+GRAPH_GENERATORS = {
+    'grid': lambda size, seed: generate_grid_graph(*map(int, size.split('x')), seed=seed),
+    'geometric': lambda size, seed: generate_geometric_graph(*map(int, size.split('x')), seed=seed),
+    'scale-free': lambda size, seed: generate_scale_free_graph(int(size), seed=seed)
+}
+
+
+def is_graph_spec(graph):
+    return graph.split(':')[0] in GRAPH_GENERATORS and not os.path.exists(graph)
+
+
+def generate_graph(spec, seed=None):
+    kind, _, size = spec.partition(':')
+    try:
+        return GRAPH_GENERATORS[kind](size, seed)
+    except (KeyError, ValueError):
+        raise ValueError(f'invalid graph specification \'{spec}\'')
+
+
+def load_benchmark_graph(graph, seed=None):
+    if is_graph_spec(graph):
+        graph = generate_graph(graph, seed)
+        check_graph_correctness(graph)
+        return restructure_graph(graph)
+
+    return load_graph(graph, use_cache=False)
+
+
+# length of the shortest path from start to end, the optimum the solver is
+# compared to, optionally without one of the edges
+def find_shortest_path_len(graph, excluded_edge=None):
+    distances = np.full(graph.node_cnt, np.inf)
+    distances[graph.start_node] = 0.0
+    queue = [(0.0, graph.start_node)]
+
+    indptr = graph.indptr.tolist()
+    indices = graph.indices.tolist()
+    lengths = graph.edge_length[graph.entry_edge]
+    if excluded_edge is not None:
+        lengths[graph.entry_edge == excluded_edge] = np.inf
+    lengths = lengths.tolist()
+
+    while queue:
+        distance, node = heapq.heappop(queue)
+
+        if node == graph.end_node:
+            return distance
+        if distance > distances[node]:
+            continue
+
+        for entry in range(indptr[node], indptr[node + 1]):
+            neighbour = indices[entry]
+            new_distance = distance + lengths[entry]
+            if new_distance < distances[neighbour]:
+                distances[neighbour] = new_distance
+                heapq.heappush(queue, (new_distance, neighbour))
+
+    return math.inf
+
+
+# random graph written in the same JSON format as the graphs/ examples, the
+# file is written piece by piece so even huge graphs don't need much memory
+def write_random_graph_file(file_path, node_cnt, edge_cnt, seed=None, width=1300, height=700, block_size=100000):
+    rng = np.random.default_rng(seed)
+
+    with open(file_path, 'w') as f:
+        f.write(f'{{\n  "start_node_id": 0,\n  "end_node_id": {node_cnt - 1},\n  "nodes":\n  [\n')
+
+        for block_start in range(0, node_cnt, block_size):
+            block_end = min(block_start + block_size, node_cnt)
+            xs = rng.integers(0, width, block_end - block_start).tolist()
+            ys = rng.integers(0, height, block_end - block_start).tolist()
+            f.write(',\n'.join(f'    {{"id": {i}, "x": {x}, "y": {y}}}' for i, x, y in zip(range(block_start, block_end), xs, ys)))
+            f.write(',\n' if block_end < node_cnt else '\n')
+
+        f.write('  ],\n  "edges":\n  [\n')
+
+        for block_start in range(0, edge_cnt, block_size):
+            block_end = min(block_start + block_size, edge_cnt)
+            from_ids = rng.integers(0, node_cnt, block_end - block_start)
+            # shifted by 1..N-1, so there are no self-loops
+            to_ids = (from_ids + rng.integers(1, node_cnt, block_end - block_start)) % node_cnt
+            f.write(',\n'.join(f'    {{"from_node_id": {a}, "to_node_id": {b}}}' for a, b in zip(from_ids.tolist(), to_ids.tolist())))
+            f.write(',\n' if block_end < edge_cnt else '\n')
+
+        f.write('  ]\n}\n')
+
+
+# peak resident set size of this process in bytes
+def get_peak_rss():
+    # ru_maxrss is inherited over exec, so a fresh process would report the
+    # peak of its parent, VmHWM (Linux only) starts from zero
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    # in KiB on Linux, in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def load_with_method(method, file_path):
+    if method == 'json':
+        # the original way -- the whole file is parsed into Python objects
+        with open(file_path, 'r') as f:
+            graph = json.load(f)
+        check_graph_correctness(graph)
+        return restructure_graph(graph)
+    elif method == 'stream':
+        return read_graph_file(file_path)
+    elif method == 'cache':
+        return load_graph(file_path)
+
+
+def run_measurement(function, args, results):
+    results.put(function(*args))
+
+
+# every measurement runs in a fresh process, so the peak memory of one
+# doesn't hide the peak memory of another
+def measure_in_fresh_process(function, *args):
+    context = mp.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=run_measurement, args=(function, args, results))
+    process.start()
+    result = results.get()
+    process.join()
+
+    if process.exitcode != 0:
+        raise RuntimeError('The measurement process failed!')
+
+    return result
+
+
+def measure_loading_process(method, file_path):
+    base_rss = get_peak_rss()
+
+    start_time = time.perf_counter()
+    graph = load_with_method(method, file_path)
+    load_time = time.perf_counter() - start_time
+
+    return load_time, base_rss, get_peak_rss(), graph.node_cnt, graph.edge_cnt
+
+
+def measure_loading(method, file_path):
+    load_time, base_rss, peak_rss, node_cnt, edge_cnt = measure_in_fresh_process(measure_loading_process, method, file_path)
+    return {'method': method, 'load_time': load_time, 'peak_rss': peak_rss, 'rss_increase': peak_rss - base_rss, 'nodes': node_cnt, 'edges': edge_cnt}
+
+
+def run_loading_benchmark(graph_files):
+    print(f'{"graph":<28} {"method":<8} {"nodes":>9} {"edges":>9} {"time [s]":>9} {"peak RSS [MiB]":>15} {"increase [MiB]":>15}')
+
+    for file_path in graph_files:
+        # the graph is measured as a copy, so the cache next to it is neither
+        # used nor removed, the cache has to exist before it is measured
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            copy_path = shutil.copy2(file_path, tmp_dir)
+            load_graph(copy_path)
+
+            for method in LOADING_METHODS:
+                result = measure_loading(method, copy_path)
+                print(f'{os.path.basename(file_path):<28} {method:<8} {result["nodes"]:>9} {result["edges"]:>9} {result["load_time"]:>9.3f} {result["peak_rss"] / 2**20:>15.1f} {result["rss_increase"] / 2**20:>15.1f}')
+
+
+# the run stops after the iterations, or earlier when the best found path
+# hasn't improved for the patience
+def measure_solver_run(graph, ants, iterations, seed, optimum, tolerance, solver_params, patience=None):
+    solver = ACOSolver(graph, ants, seed=seed, **solver_params)
+    target_len = optimum * (1 + tolerance / 100)
+    # (iteration, time) when a path within the tolerance was found
+    target_reached = []
+
+    def on_new_best_path(path, edges):
+        if not target_reached and solver.best_found_path_len <= target_len:
+            target_reached.append((solver.iteration_cnt + 1, time.perf_counter() - start_time))
+
+    solver.on_new_best_path = on_new_best_path
+
+    start_time = time.perf_counter()
+    stop_reason, _ = run_until_converged(solver, iterations, patience=patience)
+    elapsed_time = time.perf_counter() - start_time
+
+    best_path_len = solver.best_found_path_len
+    iterations = solver.iteration_cnt
+    found = bool(solver.best_found_path)
+    return {
+        'seed': seed,
+        'best_path_len': best_path_len if found else None,
+        # ratio of the best found path and the optimum, 1 is the optimum
+        'quality': best_path_len / optimum if found else None,
+        'iterations': iterations,
+        'stop_reason': stop_reason,
+        'elapsed_time': elapsed_time,
+        'iterations_per_s': iterations / elapsed_time,
+        # every ant walks over one edge in each iteration
+        'ant_moves_per_s': ants * iterations / elapsed_time,
+        'iterations_to_tolerance': target_reached[0][0] if target_reached else None,
+        'time_to_tolerance': target_reached[0][1] if target_reached else None
+    }
+
+
+def mean(values):
+    values = [value for value in values if value is not None]
+    return sum(values) / len(values) if values else None
+
+
+def measure_solver_process(graph_name, graph_seed, ants, iterations, seeds, tolerance, solver_params, patience=None):
+    graph = load_benchmark_graph(graph_name, graph_seed)
+    optimum = find_shortest_path_len(graph)
+
+    runs = [measure_solver_run(graph, ants, iterations, seed, optimum, tolerance, solver_params, patience) for seed in range(seeds)]
+    qualities = [run['quality'] for run in runs if run['quality'] is not None]
+
+    return {
+        'graph': graph_name,
+        'nodes': graph.node_cnt,
+        'edges': graph.edge_cnt,
+        # there is no path from start to end if the optimum is None
+        'optimum': optimum if math.isfinite(optimum) else None,
+        'peak_rss': get_peak_rss(),
+        'summary': {
+            'mean_quality': mean(qualities),
+            'best_quality': min(qualities, default=None),
+            'worst_quality': max(qualities, default=None),
+            # portion of runs which found a path within the tolerance
+            'success_rate': sum(run['iterations_to_tolerance'] is not None for run in runs) / len(runs),
+            'mean_iterations': mean([run['iterations'] for run in runs]),
+            'mean_iterations_per_s': mean([run['iterations_per_s'] for run in runs]),
+            'mean_ant_moves_per_s': mean([run['ant_moves_per_s'] for run in runs]),
+            'mean_iterations_to_tolerance': mean([run['iterations_to_tolerance'] for run in runs]),
+            'mean_time_to_tolerance': mean([run['time_to_tolerance'] for run in runs])
+        },
+        'runs': runs
+    }
+
+
+# changes the graph of the solver around its best found path, returns the
+# description of the change or None if the graph can't be changed that way
+def perturb_graph(solver, perturbation, rng):
+    graph = solver.graph
+    path = graph.get_node_indices(solver.best_found_path).tolist()
+    path_edges = solver.best_found_path_edges
+
+    if perturbation == 'remove-edge':
+        # the end has to stay reachable
+        for edge in rng.permutation(path_edges).tolist():
+            if math.isfinite(find_shortest_path_len(graph, excluded_edge=edge)):
+                try:
+                    solver.remove_edge(edge)
+                except ValueError:
+                    continue
+                return {'removed_edge': [int(graph.node_ids[graph.edge_from[edge]]), int(graph.node_ids[graph.edge_to[edge]])]}
+        return None
+
+    if perturbation == 'move-node':
+        inner_nodes = path[1:-1]
+        if not inner_nodes:
+            return None
+
+        node = int(rng.choice(inner_nodes))
+        angle = rng.uniform(0, 2 * math.pi)
+        x = min(max(graph.node_x[node] + PERTURBATION_DISTANCE * math.cos(angle), 0), GRAPH_WIDTH)
+        y = min(max(graph.node_y[node] + PERTURBATION_DISTANCE * math.sin(angle), 0), GRAPH_HEIGHT)
+        solver.move_node(node, x, y)
+        return {'moved_node': int(graph.node_ids[node]), 'x': x, 'y': y}
+
+    # the shortcut which saves the most of the best found path
+    distances = np.concatenate([[0.0], np.cumsum(graph.edge_length[path_edges])])
+    best_saving, best_pair = 0.0, None
+    for i in range(len(path)):
+        for j in range(i + 2, len(path)):
+            saving = distances[j] - distances[i] - math.hypot(graph.node_x[path[i]] - graph.node_x[path[j]], graph.node_y[path[i]] - graph.node_y[path[j]])
+            if saving > best_saving and graph.find_edge(path[i], path[j]) < 0:
+                best_saving, best_pair = saving, (path[i], path[j])
+
+    if best_pair is None:
+        return None
+
+    solver.add_edge(*best_pair)
+    return {'added_edge': [int(graph.node_ids[node]) for node in best_pair]}
+
+
+# runs the solver until its best found path is within the target length,
+# returns the number of iterations and the time it took (or None, None)
+def run_until_target(solver, iterations, target_len):
+    start_time = time.perf_counter()
+
+    for iteration in range(iterations + 1):
+        if solver.best_found_path_len <= target_len:
+            return iteration, time.perf_counter() - start_time
+        if iteration < iterations:
+            solver.step()
+
+    return None, None
+
+
+# the colony converges for ITERATIONS iterations, then the graph is changed
+# and the same colony (warm, with its pheromone) and a new colony (cold) have
+# ITERATIONS iterations to find a path within the tolerance again
+def measure_reoptimization_run(graph_name, graph_seed, ants, iterations, seed, perturbation, tolerance, solver_params):
+    graph = load_benchmark_graph(graph_name, graph_seed)
+    solver = ACOSolver(graph, ants, seed=seed, **solver_params)
+    solver.run(iterations)
+
+    change = perturb_graph(solver, perturbation, np.random.default_rng(seed)) if solver.best_found_path else None
+    if change is None:
+        return {'seed': seed, 'change': None}
+
+    optimum = find_shortest_path_len(graph)
+    target_len = optimum * (1 + tolerance / 100)
+
+    warm_iterations, warm_time = run_until_target(solver, iterations, target_len)
+
+    cold_solver = ACOSolver(graph, ants, seed=seed, **solver_params)
+    cold_iterations, cold_time = run_until_target(cold_solver, iterations, target_len)
+
+    return {
+        'seed': seed,
+        'change': change,
+        'optimum': optimum,
+        'warm_iterations_to_tolerance': warm_iterations,
+        'warm_time_to_tolerance': warm_time,
+        'cold_iterations_to_tolerance': cold_iterations,
+        'cold_time_to_tolerance': cold_time
+    }
+
+
+def measure_reoptimization_process(graph_name, graph_seed, ants, iterations, seeds, perturbation, tolerance, solver_params):
+    # every run changes its own copy of the graph
+    runs = [measure_reoptimization_run(graph_name, graph_seed, ants, iterations, seed, perturbation, tolerance, solver_params) for seed in range(seeds)]
+    changed_runs = [run for run in runs if run['change'] is not None]
+
+    def success_rate(key):
+        return sum(run[key] is not None for run in changed_runs) / len(changed_runs) if changed_runs else None
+
+    return {
+        'graph': graph_name,
+        'summary': {
+            # portion of runs in which the graph could be changed
+            'changed_rate': len(changed_runs) / len(runs),
+            'warm_success_rate': success_rate('warm_iterations_to_tolerance'),
+            'cold_success_rate': success_rate('cold_iterations_to_tolerance'),
+            'mean_warm_iterations_to_tolerance': mean([run['warm_iterations_to_tolerance'] for run in changed_runs]),
+            'mean_cold_iterations_to_tolerance': mean([run['cold_iterations_to_tolerance'] for run in changed_runs]),
+            'mean_warm_time_to_tolerance': mean([run['warm_time_to_tolerance'] for run in changed_runs]),
+            'mean_cold_time_to_tolerance': mean([run['cold_time_to_tolerance'] for run in changed_runs])
+        },
+        'runs': runs
+    }
+
+
+def get_version():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {'commit': commit, 'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform()}
+
+
+def get_solver_params(args):
+    return {
+        'alpha': args.alpha,
+        'beta': args.beta,
+        'evaporation': args.evaporation,
+        'increment_type': args.increment_type,
+        'strategy': args.strategy,
+        'candidate_cnt': args.candidates,
+        'local_search': args.local_search,
+        'mode': 'batched' if args.batched else 'reference'
+    }
+
+
+def run_solver_benchmark(args):
+    solver_params = get_solver_params(args)
+    results = {
+        'version': get_version(),
+        'parameters': {'ants': args.ants, 'iterations': args.iterations, 'patience': args.patience, 'seeds': args.seeds, 'tolerance': args.tolerance, 'graph_seed': args.graph_seed, **solver_params},
+        'graphs': []
+    }
+
+    for graph in args.graphs or DEFAULT_BENCHMARK_GRAPHS:
+        result = measure_in_fresh_process(measure_solver_process, graph, args.graph_seed, args.ants, args.iterations, args.seeds, args.tolerance, solver_params, args.patience)
+        results['graphs'].append(result)
+
+        summary = result['summary']
+        print(f'{os.path.basename(graph)}: quality {summary["mean_quality"]}, iterations to tolerance {summary["mean_iterations_to_tolerance"]} (success rate {summary["success_rate"]:.0%}), {summary["mean_iterations_per_s"]:.0f} iterations/s', file=sys.stderr)
+
+    return results
+
+
+def run_reoptimization_benchmark(args):
+    solver_params = get_solver_params(args)
+    results = {
+        'version': get_version(),
+        'parameters': {'ants': args.ants, 'iterations': args.iterations, 'seeds': args.seeds, 'tolerance': args.tolerance, 'graph_seed': args.graph_seed, 'perturbation': args.perturbation, **solver_params},
+        'graphs': []
+    }
+
+    for graph in args.graphs or DEFAULT_BENCHMARK_GRAPHS:
+        result = measure_in_fresh_process(measure_reoptimization_process, graph, args.graph_seed, args.ants, args.iterations, args.seeds, args.perturbation, args.tolerance, solver_params)
+        results['graphs'].append(result)
+
+        summary = result['summary']
+        print(f'{os.path.basename(graph)}: iterations to tolerance {summary["mean_warm_iterations_to_tolerance"]} warm, {summary["mean_cold_iterations_to_tolerance"]} cold', file=sys.stderr)
+
+    return results
+
+
+# every query in a new aco.py process, which loads the graph (from its
+# binary cache) and runs a single colony, WORKERS processes run at once
+def measure_per_process_queries(graph_file, queries, args):
+    commands = []
+    for query, (start_id, end_id) in enumerate(queries):
+        command = [sys.executable, ACO_SCRIPT, '--headless', '-g', graph_file, '-a', str(args.ants), '-i', str(args.iterations), '--start-node', str(start_id), '--end-node', str(end_id), '--seed', str(query)]
+        commands.append(command + ['--batched'] if args.batched else command)
+
+    start_time = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(args.workers) as executor:
+        list(executor.map(lambda command: subprocess.run(command, stdout=subprocess.DEVNULL, check=True), commands))
+
+    return time.perf_counter() - start_time
+
+
+def measure_multi_queries(graph, queries, args, patience):
+    start_time = time.perf_counter()
+    results = list(run_queries(graph, queries, args.ants, args.iterations, patience, args.workers, 0, mode='batched' if args.batched else 'reference'))
+    elapsed_time = time.perf_counter() - start_time
+
+    return elapsed_time, mean([result['iterations'] for result in results])
+
+
+def get_throughput(elapsed_time, query_cnt, iterations):
+    return {'elapsed_time': elapsed_time, 'queries_per_s': query_cnt / elapsed_time, 'mean_iterations': iterations}
+
+
+def run_queries_benchmark(args):
+    results = {
+        'version': get_version(),
+        'parameters': {'graph': args.graph, 'queries': args.queries, 'query_seed': args.query_seed, 'ants': args.ants, 'iterations': args.iterations, 'patience': args.patience, 'workers': args.workers, 'batched': args.batched, 'graph_seed': args.graph_seed}
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        graph_file = args.graph
+        if is_graph_spec(graph_file):
+            graph_file = os.path.join(tmp_dir, 'graph.json')
+            with open(graph_file, 'w') as f:
+                json.dump(generate_graph(args.graph, args.graph_seed), f)
+
+        # the cache of the graph is saved before aco.py runs, as it would be
+        # after its first run
+        graph = load_graph(graph_file)
+        queries = generate_queries(graph, args.queries, args.query_seed)
+
+        per_process_time = measure_per_process_queries(graph_file, queries, args)
+        results['per_process'] = get_throughput(per_process_time, len(queries), args.iterations)
+
+        # with all the iterations as in aco.py, and finished early
+        queries = resolve_queries(graph, queries)
+        multi_query_time, _ = measure_multi_queries(graph, queries, args, 0)
+        results['multi_query'] = get_throughput(multi_query_time, len(queries), args.iterations)
+        multi_query_time, iterations = measure_multi_queries(graph, queries, args, args.patience)
+        results['multi_query_patience'] = get_throughput(multi_query_time, len(queries), iterations)
+
+    print(f'{os.path.basename(args.graph)}: {results["per_process"]["queries_per_s"]:.2f} queries/s with aco.py per query, '
+          f'{results["multi_query"]["queries_per_s"]:.2f} queries/s with the multi-query solver, '
+          f'{results["multi_query_patience"]["queries_per_s"]:.2f} queries/s with patience {args.patience} ({iterations:.0f} iterations on average)', file=sys.stderr)
+
+    return results
+
+
+# self import times of the top-level packages imported by python -X importtime
+def measure_imports(arguments):
+    process = subprocess.run([sys.executable, '-X', 'importtime'] + arguments, cwd=os.path.dirname(ACO_SCRIPT), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+
+    import_times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        self_time, _, module = line[len('import time:'):].split('|')
+        # the first line is the header of the columns
+        if self_time.strip().isdigit():
+            package = module.strip().split('.')[0]
+            import_times[package] = import_times.get(package, 0) + int(self_time) / 1e6
+
+    return import_times
+
+
+def run_imports_benchmark(repeat):
+    passed = True
+    print(f'{"path":<11} {"time [ms]":>10} {"budget [ms]":>12}  forbidden imports')
+
+    for name, (arguments, forbidden_modules, budget) in IMPORT_CHECKS.items():
+        import_times = min((measure_imports(arguments) for _ in range(repeat)), key=lambda import_times: sum(import_times.values()))
+        total_time = sum(import_times.values())
+        forbidden = [module for module in forbidden_modules if module in import_times]
+
+        print(f'{name:<11} {total_time * 1000:>10.1f} {budget * 1000:>12.0f}  {", ".join(forbidden) or "-"}')
+        passed = passed and total_time <= budget and not forbidden
+
+    return passed
+
+
+def write_results(results, output):
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    parser = init_parser()
+    args = parser.parse_args()
+
+    if args.benchmark == 'loading':
+        graph_files = args.graph_files or EXAMPLE_GRAPHS
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            if args.edges:
+                synthetic_file = os.path.join(tmp_dir, f'random-{args.edges}.json')
+                write_random_graph_file(synthetic_file, args.nodes, args.edges, args.seed)
+                graph_files = graph_files + [synthetic_file]
+
+            run_loading_benchmark(graph_files)
+    elif args.benchmark == 'solver':
+        write_results(run_solver_benchmark(args), args.output)
+    elif args.benchmark == 'reoptimization':
+        write_results(run_reoptimization_benchmark(args), args.output)
+    elif args.benchmark == 'queries':
+        write_results(run_queries_benchmark(args), args.output)
+    elif args.benchmark == 'imports':
+        if not run_imports_benchmark(args.repeat):
+            sys.exit(1)
+    elif args.benchmark == 'generate':
+        with open(args.output, 'w') as f:
+            json.dump(generate_graph(args.graph, args.seed), f, indent=2)
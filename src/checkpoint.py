@@ -0,0 +1,199 @@
+# ******************************* checkpoint.py *****************************
+#  Course: Soft Computing (SFC) - FIT BUT
+#  Project name: Shortest path search simulation using ACO
+#  Author: Beranek Tomas (xberan46)
+#  Date: 26.11.2022
+#  Up2date sources: https://github.com/TomasBeranek/but-sfc-project
+# ***************************************************************************
+
+
+import hashlib
+import json
+import os
+import time
+import numpy as np
+
+from options import DEFAULT_CHECKPOINT_INTERVAL
+from simulation import AntSimulation
+from solver import ACOSolver, MIN_PHEROMONE_LEVEL, SOLVER_PARAMETERS
+
+
+# file starts with the magic and the length of the JSON header, the arrays
+# follow the header aligned to CHECKPOINT_ALIGNMENT bytes
+CHECKPOINT_MAGIC = b'ACOCKPT\0'
+CHECKPOINT_VERSION = 1
+CHECKPOINT_ALIGNMENT = 64
+
+
+def align(offset):
+    return -(-offset // CHECKPOINT_ALIGNMENT) * CHECKPOINT_ALIGNMENT
+
+
+# the checkpoint is written into a temporary file first, so a crash while
+# saving never destroys the last snapshot
+def write_checkpoint_file(path, metadata, arrays):
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    specs = []
+    offset = 0
+    for name, array in arrays.items():
+        specs.append({'name': name, 'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset})
+        offset = align(offset + array.nbytes)
+
+    header = json.dumps({'version': CHECKPOINT_VERSION, 'metadata': metadata, 'arrays': specs}).encode()
+    data_start = align(len(CHECKPOINT_MAGIC) + 8 + len(header))
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(CHECKPOINT_MAGIC)
+            f.write(len(header).to_bytes(8, 'little'))
+            f.write(header)
+
+            for spec, array in zip(specs, arrays.values()):
+                f.seek(data_start + spec['offset'])
+                f.write(array.data)
+
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# the arrays are memory-mapped copy-on-write, so nothing is read until it is
+# used and changes are never written back into the file
+def read_checkpoint_file(path):
+    with open(path, 'rb') as f:
+        if f.read(len(CHECKPOINT_MAGIC)) != CHECKPOINT_MAGIC:
+            raise ValueError(f'{path} is not a checkpoint file')
+
+        header_len = int.from_bytes(f.read(8), 'little')
+        header = json.loads(f.read(header_len))
+
+    if header['version'] != CHECKPOINT_VERSION:
+        raise ValueError(f'{path} has unsupported checkpoint version {header["version"]}')
+
+    data_start = align(len(CHECKPOINT_MAGIC) + 8 + header_len)
+    arrays = {}
+
+    for spec in header['arrays']:
+        dtype = np.dtype(spec['dtype'])
+        shape = tuple(spec['shape'])
+
+        # empty arrays can't be mapped
+        if not np.prod(shape):
+            arrays[spec['name']] = np.zeros(shape, dtype=dtype)
+        else:
+            arrays[spec['name']] = np.memmap(path, dtype=dtype, mode='c', offset=data_start + spec['offset'], shape=shape)
+
+    return header['metadata'], arrays
+
+
+# identifies the graph the state belongs to -- node IDs, edges (with the ones
+# removed at runtime) and lengths
+def get_graph_fingerprint(graph):
+    fingerprint = hashlib.sha1()
+
+    for array in [graph.node_ids, graph.edge_from, graph.edge_to, graph.edge_length, graph.edge_removed, np.array([graph.start_node, graph.end_node])]:
+        fingerprint.update(np.ascontiguousarray(array).data)
+
+    return fingerprint.hexdigest()
+
+
+def save_checkpoint(path, solver, simulation=None):
+    graph = solver.graph
+    metadata, arrays = solver.get_state()
+    metadata['graph'] = get_graph_fingerprint(graph)
+
+    # edges by node IDs, for warm starts on a changed graph
+    arrays['edge_from_ids'] = graph.node_ids[graph.edge_from]
+    arrays['edge_to_ids'] = graph.node_ids[graph.edge_to]
+
+    if simulation is not None:
+        metadata['simulation'], simulation_arrays = simulation.get_state()
+        arrays.update(simulation_arrays)
+
+    write_checkpoint_file(path, metadata, arrays)
+
+
+# pheromone of the edges of the graph taken from the saved edges between the
+# same nodes (in any direction), new edges get the minimal level
+def map_pheromone(graph, arrays):
+    saved_edges = np.sort(np.stack([arrays['edge_from_ids'], arrays['edge_to_ids']], axis=1), axis=1)
+    edges = np.sort(np.stack([graph.node_ids[graph.edge_from], graph.node_ids[graph.edge_to]], axis=1), axis=1)
+
+    _, groups = np.unique(np.concatenate([saved_edges, edges]), axis=0, return_inverse=True)
+    groups = groups.reshape(-1)
+
+    group_pheromone = np.full(groups.max() + 1 if len(groups) else 0, MIN_PHEROMONE_LEVEL)
+    group_pheromone[groups[:len(saved_edges)]] = arrays['pheromone']
+
+    return group_pheromone[groups[len(saved_edges):]]
+
+
+class Checkpoint:
+    # snapshot loaded from a file -- the solver (and the simulation) are
+    # resumed from it if it was saved on the same graph (and with the
+    # simulation), otherwise a new run is warm-started from its pheromone
+    def __init__(self, path):
+        self.path = path
+        self.metadata, self.arrays = read_checkpoint_file(path)
+
+    @property
+    def has_simulation(self):
+        return 'simulation' in self.metadata
+
+    def can_resume(self, graph, simulated):
+        return self.metadata['graph'] == get_graph_fingerprint(graph) and self.has_simulation == simulated
+
+    # returns the solver and the simulation (if simulated), both resumed or
+    # new with warm-started pheromone, and whether they were resumed
+    def restore(self, graph, ants, mode='reference', seed=None, simulated=False, ant_speed=400):
+        if self.can_resume(graph, simulated):
+            solver = ACOSolver.from_state(graph, self.metadata, self.arrays, mode)
+
+            simulation = None
+            if simulated:
+                simulation = AntSimulation(solver)
+                simulation.set_state(self.metadata['simulation'], self.arrays)
+
+            return solver, simulation, True
+
+        # the parameters are kept, the ants start from scratch
+        parameters = {name: self.metadata[name] for name in SOLVER_PARAMETERS}
+        solver = ACOSolver(graph, ants, mode=mode, seed=seed, **parameters)
+        solver.pheromone[:] = np.clip(map_pheromone(graph, self.arrays), solver.lower_bound, solver.upper_bound)
+        solver.pheromone_changed()
+
+        simulation = None
+        if simulated:
+            simulation = AntSimulation(solver, ant_speed)
+
+        return solver, simulation, False
+
+    def describe(self, resumed):
+        if resumed:
+            if self.has_simulation:
+                return f'Resumed from {self.path} at {self.metadata["simulation"]["time"]:.1f} simulated seconds'
+            return f'Resumed from {self.path} at iteration {self.metadata["iteration_cnt"]}'
+        return f'Warm-started from the pheromone in {self.path} (saved on a different graph or in a different mode)'
+
+
+class Checkpointer:
+    # saves snapshots of the solver (and the simulation) into the file at most
+    # once per interval
+    def __init__(self, path, solver, simulation=None, interval=DEFAULT_CHECKPOINT_INTERVAL):
+        self.path = path
+        self.solver = solver
+        self.simulation = simulation
+        self.interval = interval
+        self.last_save_time = time.perf_counter()
+
+    def save(self):
+        save_checkpoint(self.path, self.solver, self.simulation)
+        self.last_save_time = time.perf_counter()
+
+    def maybe_save(self):
+        if time.perf_counter() - self.last_save_time >= self.interval:
+            self.save()
@@ -0,0 +1,182 @@
+# ******************************* convergence.py ****************************
+#  Course: Soft Computing (SFC) - FIT BUT
+#  Project name: Shortest path search simulation using ACO
+#  Author: Beranek Tomas (xberan46)
+#  Date: 26.11.2022
+#  Up2date sources: https://github.com/TomasBeranek/but-sfc-project
+# ***************************************************************************
+
+
+import csv
+import time
+import numpy as np
+
+
+# reasons why a run stopped -- the budget of iterations or of (wall-clock)
+# time ran out, the best found path hasn't improved for the patience, the
+# pheromone stopped changing or the colony follows a single path
+STOP_REASONS = ['iterations', 'time-limit', 'patience', 'stable-pheromone', 'branching']
+
+# the pheromone and the branching factor are measured once per this many
+# iterations, the iterations, the time and the patience after every one
+DEFAULT_CHECK_INTERVAL = 10
+
+# the pheromone change and the branching factor have to stay under their
+# limits for this many checks in a row -- right after the first deposits,
+# only a single path has pheromone
+CONVERGED_CHECKS = 3
+
+# an edge of a node counts into its branching factor if its pheromone is at
+# least min + BRANCHING_LAMBDA * (max - min) of the pheromone of the edges of
+# the node
+BRANCHING_LAMBDA = 0.05
+
+# columns of a row of the convergence trace
+TRACE_COLUMNS = ['iteration', 'elapsed_time', 'best_path_len', 'pheromone_change', 'branching_factor']
+
+
+# mean lambda-branching factor of the nodes of the best found path -- as the
+# colony converges, only the edges to the previous and the next node of the
+# path keep pheromone, so it falls to 2 (1 at the start and end node)
+def get_branching_factor(solver):
+    graph = solver.graph
+    if not solver.best_found_path_edges:
+        return None
+
+    path_edges = solver.best_found_path_edges
+    nodes = np.unique(np.concatenate([graph.edge_from[path_edges], graph.edge_to[path_edges]]))
+
+    # the entries of the nodes next to each other, removed edges are ignored
+    starts = graph.indptr[nodes]
+    counts = graph.indptr[nodes + 1] - starts
+    offsets = np.cumsum(counts) - counts
+    entries = np.repeat(starts - offsets, counts) + np.arange(counts.sum())
+
+    edges = graph.entry_edge[entries]
+    removed = graph.edge_removed[edges]
+    levels = solver.pheromone[edges]
+    min_levels = np.minimum.reduceat(np.where(removed, np.inf, levels), offsets)
+    max_levels = np.maximum.reduceat(np.where(removed, -np.inf, levels), offsets)
+
+    thresholds = np.repeat(min_levels + BRANCHING_LAMBDA * (max_levels - min_levels), counts)
+    branches = np.add.reduceat((levels >= thresholds) & ~removed, offsets)
+    return float(branches.mean())
+
+
+# relative (L1) change of the pheromone since the last check, None if the
+# graph got new edges in the meantime
+def get_pheromone_change(pheromone, last_pheromone):
+    if len(pheromone) != len(last_pheromone):
+        return None
+    return float(np.abs(pheromone - last_pheromone).sum() / pheromone.sum())
+
+
+class ConvergenceMonitor:
+    # decides when the run of the solver stops and records the convergence
+    # trace, the criteria which are None are not checked -- iterations are
+    # counted from the creation of the monitor (a resumed solver runs the
+    # iterations again), the patience, the pheromone change and the
+    # branching factor count only after a path was found
+    def __init__(self, solver, iterations=None, time_limit=None, patience=None, min_pheromone_change=None, max_branching=None, check_interval=DEFAULT_CHECK_INTERVAL):
+        self.solver = solver
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.patience = patience
+        self.min_pheromone_change = min_pheromone_change
+        self.max_branching = max_branching
+        self.check_interval = check_interval
+
+        self.start_iteration = solver.iteration_cnt
+        self.start_time = time.perf_counter()
+        self.best_path_len = solver.best_found_path_len
+        self.improvement_iteration = self.start_iteration
+        self.last_pheromone = solver.pheromone.copy()
+
+        # checks in a row in which the pheromone changed too little and in
+        # which the branching factor was low enough
+        self.stable_checks = 0
+        self.branching_checks = 0
+
+        self.stop_reason = None
+        self.trace = []
+
+    @property
+    def iteration_cnt(self):
+        return self.solver.iteration_cnt - self.start_iteration
+
+    def record(self):
+        solver = self.solver
+        pheromone_change = get_pheromone_change(solver.pheromone, self.last_pheromone)
+        self.last_pheromone = solver.pheromone.copy()
+
+        found = bool(solver.best_found_path)
+        self.trace.append({
+            'iteration': solver.iteration_cnt,
+            'elapsed_time': time.perf_counter() - self.start_time,
+            'best_path_len': solver.best_found_path_len if found else None,
+            'pheromone_change': pheromone_change,
+            'branching_factor': get_branching_factor(solver)
+        })
+
+        return self.trace[-1]
+
+    # called after every iteration, returns the stop reason once the run
+    # should stop (and None until then)
+    def update(self):
+        solver = self.solver
+        found = bool(solver.best_found_path)
+
+        if solver.best_found_path_len < self.best_path_len:
+            self.best_path_len = solver.best_found_path_len
+            self.improvement_iteration = solver.iteration_cnt
+
+        if self.iterations is not None and self.iteration_cnt >= self.iterations:
+            self.stop_reason = 'iterations'
+        elif self.time_limit is not None and time.perf_counter() - self.start_time >= self.time_limit:
+            self.stop_reason = 'time-limit'
+        elif self.patience and found and solver.iteration_cnt - self.improvement_iteration >= self.patience:
+            self.stop_reason = 'patience'
+
+        if self.stop_reason is None and self.iteration_cnt % self.check_interval:
+            return None
+
+        row = self.record()
+
+        # before the first deposit, the pheromone doesn't change at all
+        deposited = found and solver.max_pheromone_level > solver.lower_bound
+        stable = deposited and self.min_pheromone_change is not None and row['pheromone_change'] is not None and row['pheromone_change'] < self.min_pheromone_change
+        branching = deposited and self.max_branching is not None and row['branching_factor'] <= self.max_branching
+        self.stable_checks = self.stable_checks + 1 if stable else 0
+        self.branching_checks = self.branching_checks + 1 if branching else 0
+
+        if self.stop_reason is None:
+            if self.stable_checks >= CONVERGED_CHECKS:
+                self.stop_reason = 'stable-pheromone'
+            elif self.branching_checks >= CONVERGED_CHECKS:
+                self.stop_reason = 'branching'
+
+        return self.stop_reason
+
+
+# runs the solver until one of the criteria stops it, returns the stop reason
+# and the convergence trace
+def run_until_converged(solver, iterations=None, time_limit=None, patience=None, min_pheromone_change=None, max_branching=None, check_interval=DEFAULT_CHECK_INTERVAL):
+    if iterations is None and time_limit is None:
+        raise ValueError('a run needs a budget of iterations or of time')
+
+    monitor = ConvergenceMonitor(solver, iterations, time_limit, patience, min_pheromone_change, max_branching, check_interval)
+    if iterations == 0:
+        monitor.stop_reason = 'iterations'
+
+    while monitor.stop_reason is None:
+        solver.step()
+        monitor.update()
+
+    return monitor.stop_reason, monitor.trace
+
+
+def write_trace(path, trace):
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=TRACE_COLUMNS)
+        writer.writeheader()
+        writer.writerows(trace)
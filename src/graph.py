@@ -0,0 +1,613 @@
+# ******************************* graph.py **********************************
+#  Course: Soft Computing (SFC) - FIT BUT
+#  Project name: Shortest path search simulation using ACO
+#  Author: Beranek Tomas (xberan46)
+#  Date: 26.11.2022
+#  Up2date sources: https://github.com/TomasBeranek/but-sfc-project
+# ***************************************************************************
+
+
+import array
+import copy
+import json
+import os
+import re
+import numpy as np
+
+from validation import print_graph_error
+
+
+# the JSON file is read in chunks of this many characters
+JSON_CHUNK_SIZE = 1024 * 1024
+
+# version of the binary cache format, caches of other versions are rebuilt
+GRAPH_CACHE_VERSION = 2
+
+# arrays which fully describe a CompactGraph (as stored in the binary cache)
+GRAPH_ARRAYS = ['node_ids', 'node_x', 'node_y', 'sorted_node_order', 'sorted_node_ids', 'edge_from', 'edge_to', 'edge_length', 'indptr', 'indices', 'entry_edge', 'from_entry', 'to_entry']
+
+
+class CompactGraph:
+    # nodes are referenced by dense indices 0..N-1 and edges by indices
+    # 0..E-1, all the data are stored in NumPy arrays indexed by them
+    def __init__(self, node_ids, node_x, node_y, edge_from_ids, edge_to_ids, start_node_id, end_node_id):
+        # maps dense indices back to the IDs from the input file
+        self.node_ids = np.asarray(node_ids, dtype=np.int64)
+        self.node_x = np.asarray(node_x, dtype=np.float64)
+        self.node_y = np.asarray(node_y, dtype=np.float64)
+
+        # sorted IDs are used to map IDs to dense indices
+        self.sorted_node_order = np.argsort(self.node_ids, kind='stable')
+        self.sorted_node_ids = self.node_ids[self.sorted_node_order]
+
+        self.start_node = self.get_node_index(start_node_id)
+        self.end_node = self.get_node_index(end_node_id)
+
+        edge_from = self.get_node_indices(edge_from_ids)
+        edge_to = self.get_node_indices(edge_to_ids)
+
+        # an edge can be defined more than once (in both directions), only
+        # its first definition is kept
+        edge_keys = np.minimum(edge_from, edge_to).astype(np.int64)
+        edge_keys *= len(self.node_ids)
+        edge_keys += np.maximum(edge_from, edge_to)
+        _, first_definitions = np.unique(edge_keys, return_index=True)
+        del edge_keys
+        first_definitions.sort()
+
+        self.edge_from = edge_from[first_definitions]
+        self.edge_to = edge_to[first_definitions]
+
+        # length (weight) of each edge
+        self.edge_length = np.hypot(self.node_x[self.edge_from] - self.node_x[self.edge_to], self.node_y[self.edge_from] - self.node_y[self.edge_to])
+        self.max_edge_len = float(self.edge_length.max()) if len(self.edge_length) else 0.0
+
+        # edges removed at runtime keep their indices, they are only taken
+        # out of the adjacency
+        self.edge_removed = np.zeros(self.edge_cnt, dtype=bool)
+
+        self.build_adjacency_arrays()
+
+    @property
+    def node_cnt(self):
+        return len(self.node_ids)
+
+    @property
+    def edge_cnt(self):
+        return len(self.edge_from)
+
+    def get_node_index(self, node_id):
+        return int(self.get_node_indices([node_id])[0])
+
+    def get_node_indices(self, node_ids):
+        positions = np.searchsorted(self.sorted_node_ids, node_ids)
+        return self.sorted_node_order[positions].astype(np.int32)
+
+    # index of the node with the ID, or -1 if there is none
+    def find_node_index(self, node_id):
+        position = int(np.searchsorted(self.sorted_node_ids, node_id))
+        if position < self.node_cnt and self.sorted_node_ids[position] == node_id:
+            return int(self.sorted_node_order[position])
+        return -1
+
+    # the same graph with other start and end nodes (given by their indices),
+    # all the arrays are shared with this graph
+    def with_endpoints(self, start_node, end_node):
+        graph = copy.copy(self)
+        graph.start_node = start_node
+        graph.end_node = end_node
+        return graph
+
+    def build_adjacency_arrays(self):
+        # compressed sparse row (CSR) adjacency -- neighbours of node i are
+        # indices[indptr[i]:indptr[i + 1]] and entry_edge holds the indices
+        # of the corresponding edges, every edge is there once per direction
+        sources = np.concatenate([self.edge_from, self.edge_to])
+        targets = np.concatenate([self.edge_to, self.edge_from])
+        edges = np.concatenate([np.arange(self.edge_cnt, dtype=np.int32)] * 2)
+
+        order = np.argsort(sources, kind='stable')
+        self.indices = targets[order]
+        self.entry_edge = edges[order]
+
+        # entries of each edge among the neighbours of its from and to nodes
+        entries = np.empty(len(order), dtype=np.int64)
+        entries[order] = np.arange(len(order))
+        self.from_entry = entries[:self.edge_cnt]
+        self.to_entry = entries[self.edge_cnt:]
+
+        self.indptr = np.zeros(self.node_cnt + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=self.node_cnt), out=self.indptr[1:])
+
+    def get_degree(self, node):
+        return int(self.indptr[node + 1] - self.indptr[node])
+
+    # entry of the edge among the neighbours of the node
+    def get_entry(self, node, edge):
+        if self.edge_from[edge] == node:
+            return int(self.from_entry[edge])
+        return int(self.to_entry[edge])
+
+    def get_entries(self, nodes, edges):
+        return np.where(self.edge_from[edges] == nodes, self.from_entry[edges], self.to_entry[edges])
+
+    # candidate lists -- edges to the candidate_cnt nearest neighbours of each
+    # of the nodes (of all if None), the shortest first (edges of the same
+    # length in the order of the neighbours), rows of nodes with fewer
+    # neighbours are padded with -1
+    def get_candidate_edges(self, candidate_cnt, nodes=None):
+        nodes = np.arange(self.node_cnt) if nodes is None else np.asarray(nodes, dtype=np.int64)
+        starts = self.indptr[nodes]
+        degrees = self.indptr[nodes + 1] - starts
+        offsets = np.cumsum(degrees) - degrees
+
+        rows = np.repeat(np.arange(len(nodes)), degrees)
+        ranks = np.arange(len(rows)) - offsets[rows]
+        edges = self.entry_edge[starts[rows] + ranks]
+
+        # rows stay in their order, only the edges of each row are sorted
+        edges = edges[np.lexsort((self.edge_length[edges], rows))]
+
+        candidate_edges = np.full((len(nodes), candidate_cnt), -1, dtype=np.int64)
+        kept = ranks < candidate_cnt
+        candidate_edges[rows[kept], ranks[kept]] = edges[kept]
+
+        return candidate_edges
+
+    # shortest path from the first to the last node of the path (without
+    # loops) over the nodes of the path in their order -- the path with the
+    # best combination of shortcuts, i.e. edges from a node of the path to any
+    # of the next ones, path_edges[k] leads from path[k] to path[k + 1],
+    # returns the nodes and the edges of the shortened path, or None if no
+    # shortcut makes it shorter
+    def shorten_path(self, path, path_edges):
+        path = np.asarray(path, dtype=np.int64)
+        starts = self.indptr[path]
+        degrees = self.indptr[path + 1] - starts
+        offsets = np.cumsum(degrees) - degrees
+
+        rows = np.repeat(np.arange(len(path)), degrees)
+        entries = starts[rows] + np.arange(len(rows)) - offsets[rows]
+        neighbours = self.indices[entries]
+        edges = self.entry_edge[entries]
+
+        # positions of the neighbours in the path, the nodes of the path are unique
+        order = np.argsort(path)
+        positions = order[np.minimum(np.searchsorted(path[order], neighbours), len(path) - 1)]
+        next_edges = np.append(path_edges, -1)
+        shortcut = (path[positions] == neighbours) & (positions > rows) & (edges != next_edges[rows])
+
+        if not shortcut.any():
+            return None
+
+        # the shortcuts by the positions they lead to
+        shortcut_order = np.lexsort((rows[shortcut], positions[shortcut]))
+        sources = rows[shortcut][shortcut_order].tolist()
+        targets = positions[shortcut][shortcut_order].tolist()
+        edges = edges[shortcut][shortcut_order].tolist()
+        edge_lengths = self.edge_length[edges].tolist()
+
+        path_edges = list(path_edges)
+        path_edge_lengths = self.edge_length[path_edges].tolist()
+
+        # distances of the nodes of the path from its first node and the
+        # nodes and the edges they are reached by
+        distances = [0.0]
+        previous = [-1]
+        previous_edges = [-1]
+        k = 0
+
+        for position in range(1, len(path)):
+            distances.append(distances[-1] + path_edge_lengths[position - 1])
+            previous.append(position - 1)
+            previous_edges.append(path_edges[position - 1])
+
+            while k < len(targets) and targets[k] == position:
+                distance = distances[sources[k]] + edge_lengths[k]
+                if distance < distances[position]:
+                    distances[position] = distance
+                    previous[position] = sources[k]
+                    previous_edges[position] = edges[k]
+                k += 1
+
+        kept = [len(path) - 1]
+        shortened_edges = []
+        while kept[-1]:
+            shortened_edges.append(previous_edges[kept[-1]])
+            kept.append(previous[kept[-1]])
+
+        if shortened_edges[::-1] == path_edges:
+            return None
+
+        return path[kept[::-1]].tolist(), shortened_edges[::-1]
+
+    def get_arrays(self):
+        arrays = {name: getattr(self, name) for name in GRAPH_ARRAYS}
+        arrays['start_node'] = np.array(self.start_node)
+        arrays['end_node'] = np.array(self.end_node)
+        return arrays
+
+    # creates the graph from arrays returned by get_arrays, without building
+    # anything again
+    @classmethod
+    def from_arrays(cls, arrays):
+        graph = cls.__new__(cls)
+
+        for name in GRAPH_ARRAYS:
+            setattr(graph, name, arrays[name])
+
+        graph.start_node = int(arrays['start_node'])
+        graph.end_node = int(arrays['end_node'])
+        graph.max_edge_len = float(graph.edge_length.max()) if len(graph.edge_length) else 0.0
+        graph.edge_removed = np.zeros(graph.edge_cnt, dtype=bool)
+
+        return graph
+
+    # changes of the graph at runtime (nodes are given by their indices) --
+    # only the entries of the affected nodes are inserted into or deleted
+    # from the adjacency arrays, the entries after them just move by one
+
+    # the edge between the nodes, or -1
+    def find_edge(self, node1, node2):
+        start = self.indptr[node1]
+        entries = np.flatnonzero(self.indices[start:self.indptr[node1 + 1]] == node2)
+        return int(self.entry_edge[start + entries[0]]) if len(entries) else -1
+
+    # the entry is added as the last neighbour of the node
+    def insert_entry(self, node, neighbour, edge):
+        entry = int(self.indptr[node + 1])
+        self.indices = np.insert(self.indices, entry, neighbour)
+        self.entry_edge = np.insert(self.entry_edge, entry, edge)
+        self.indptr[node + 1:] += 1
+        self.from_entry[self.from_entry >= entry] += 1
+        self.to_entry[self.to_entry >= entry] += 1
+        return entry
+
+    def delete_entry(self, node, entry):
+        self.indices = np.delete(self.indices, entry)
+        self.entry_edge = np.delete(self.entry_edge, entry)
+        self.indptr[node + 1:] -= 1
+        self.from_entry[self.from_entry > entry] -= 1
+        self.to_entry[self.to_entry > entry] -= 1
+
+    def update_edge_lengths(self, edges):
+        old_max_len = float(self.edge_length[edges].max()) if len(edges) else 0.0
+        self.edge_length[edges] = np.hypot(self.node_x[self.edge_from[edges]] - self.node_x[self.edge_to[edges]], self.node_y[self.edge_from[edges]] - self.node_y[self.edge_to[edges]])
+
+        # the longest edge has to be searched for only if it got shorter
+        if old_max_len >= self.max_edge_len:
+            self.update_max_edge_len()
+        elif len(edges):
+            self.max_edge_len = max(self.max_edge_len, float(self.edge_length[edges].max()))
+
+    def update_max_edge_len(self):
+        lengths = self.edge_length[~self.edge_removed]
+        self.max_edge_len = float(lengths.max()) if len(lengths) else 0.0
+
+    # returns the index of the new edge and its entries in the order they
+    # were inserted, an edge removed before gets its old index back
+    def add_edge(self, from_node, to_node):
+        if from_node == to_node:
+            raise ValueError('Edges cannot start and end in the same node!')
+        if self.find_edge(from_node, to_node) >= 0:
+            raise ValueError('Edge already exists!')
+
+        removed = np.flatnonzero(self.edge_removed & (((self.edge_from == from_node) & (self.edge_to == to_node)) | ((self.edge_from == to_node) & (self.edge_to == from_node))))
+
+        if len(removed):
+            edge = int(removed[0])
+            self.edge_removed[edge] = False
+        else:
+            edge = self.edge_cnt
+            self.edge_from = append_item(self.edge_from, from_node)
+            self.edge_to = append_item(self.edge_to, to_node)
+            self.edge_length = append_item(self.edge_length, 0.0)
+            self.edge_removed = append_item(self.edge_removed, False)
+            self.from_entry = append_item(self.from_entry, -1)
+            self.to_entry = append_item(self.to_entry, -1)
+
+        entries = []
+        for node, neighbour, edge_entries in [(self.edge_from[edge], self.edge_to[edge], self.from_entry), (self.edge_to[edge], self.edge_from[edge], self.to_entry)]:
+            entry = self.insert_entry(node, neighbour, edge)
+            edge_entries[edge] = entry
+            entries.append(entry)
+
+        self.update_edge_lengths(np.array([edge]))
+
+        return edge, entries
+
+    # returns the deleted entries of the edge in the order they were deleted
+    def remove_edge(self, edge):
+        if self.edge_removed[edge]:
+            raise ValueError('Edge is already removed!')
+
+        entries = []
+        for node, edge_entries in [(self.edge_from[edge], self.from_entry), (self.edge_to[edge], self.to_entry)]:
+            entry = int(edge_entries[edge])
+            edge_entries[edge] = -1
+            self.delete_entry(node, entry)
+            entries.append(entry)
+
+        self.edge_removed[edge] = True
+        if self.edge_length[edge] >= self.max_edge_len:
+            self.update_max_edge_len()
+
+        return entries
+
+    # returns the edges whose length changed
+    def move_node(self, node, x, y):
+        self.node_x[node] = x
+        self.node_y[node] = y
+
+        edges = self.entry_edge[self.indptr[node]:self.indptr[node + 1]].astype(np.int64)
+        self.update_edge_lengths(edges)
+
+        return edges
+
+
+def append_item(array, value):
+    return np.append(array, np.array([value], dtype=array.dtype))
+
+
+def restructure_graph(graph):
+    nodes = graph["nodes"]
+    edges = graph["edges"]
+
+    return CompactGraph([node["id"] for node in nodes],
+                        [node["x"] for node in nodes],
+                        [node["y"] for node in nodes],
+                        [edge["from_node_id"] for edge in edges],
+                        [edge["to_node_id"] for edge in edges],
+                        graph["start_node_id"],
+                        graph["end_node_id"])
+
+
+class JSONStreamReader:
+    # reads a JSON document from a file piece by piece -- containers are
+    # walked token by token and only the values inside them are decoded, so
+    # the whole document never has to be in memory
+    def __init__(self, file, chunk_size=JSON_CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+        # position of the buffer in the file
+        self.offset = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+        self.whitespace = re.compile(r'\s*')
+
+    def read_chunk(self):
+        chunk = self.file.read(self.chunk_size)
+        self.buffer = self.buffer[self.position:] + chunk
+        self.offset += self.position
+        self.position = 0
+        self.eof = not chunk
+
+    # returns the next non-whitespace character without consuming it, or ''
+    # at the end of the file
+    def peek(self):
+        while True:
+            self.position = self.whitespace.match(self.buffer, self.position).end()
+
+            if self.position < len(self.buffer) or self.eof:
+                return self.buffer[self.position:self.position + 1]
+
+            self.read_chunk()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f'expected \'{char}\'' if self.peek() else f'expected \'{char}\', but the file ended')
+        self.position += 1
+
+    def read_value(self):
+        self.peek()
+
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                # the value can continue in the next chunk
+                if self.eof:
+                    raise
+                self.read_chunk()
+                continue
+
+            # a number can be cut at the end of the chunk as well
+            if end == len(self.buffer) and not self.eof:
+                self.read_chunk()
+                continue
+
+            self.position = end
+            return value
+
+    # yields keys of an object, the caller has to read (or walk) the value
+    # of each key before asking for the next one
+    def iter_object(self):
+        self.expect('{')
+        if self.peek() == '}':
+            self.position += 1
+            return
+
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise ValueError('object key is not a string')
+            self.expect(':')
+
+            yield key
+
+            if self.peek() == ',':
+                self.position += 1
+            else:
+                self.expect('}')
+                return
+
+    # yields the items of an array in lists -- as many complete items as
+    # there are in the buffer are decoded at once
+    def iter_array(self):
+        self.expect('[')
+        if self.peek() == ']':
+            self.position += 1
+            return
+
+        # (absolute) position up to which the items are decoded one by one
+        single_items_end = -1
+
+        while True:
+            # the buffer is decoded up to the comma before the last item (the
+            # last item can be cut), that is the last comma before the last
+            # character which starts an item -- the result is valid only if
+            # the comma separates items of this array (not of a nested one)
+            self.peek()
+            last_item = self.buffer.rfind(self.buffer[self.position:self.position + 1], self.position + 1)
+            split = self.buffer.rfind(',', self.position, last_item)
+
+            if split > self.position and self.offset + self.position > single_items_end:
+                try:
+                    items = self.decoder.decode(f'[{self.buffer[self.position:split]}]')
+                except json.JSONDecodeError:
+                    items = None
+                    single_items_end = self.offset + split
+
+                if items is not None:
+                    self.position = split + 1
+                    yield items
+                    continue
+
+            yield [self.read_value()]
+
+            if self.peek() == ',':
+                self.position += 1
+            else:
+                self.expect(']')
+                return
+
+
+# on_error gets the message of an invalid graph and mustn't return
+def read_graph_file(file_path, on_error=print_graph_error):
+    # nodes and edges are streamed straight into compact typed arrays
+    node_ids = array.array('q')
+    node_x = array.array('d')
+    node_y = array.array('d')
+    edge_from_ids = array.array('q')
+    edge_to_ids = array.array('q')
+    start_node_id = None
+    end_node_id = None
+
+    with open(file_path, 'r') as f:
+        reader = JSONStreamReader(f)
+
+        try:
+            for key in reader.iter_object():
+                if key == 'nodes':
+                    for nodes in reader.iter_array():
+                        node_ids.extend([node['id'] for node in nodes])
+                        node_x.extend([node['x'] for node in nodes])
+                        node_y.extend([node['y'] for node in nodes])
+                elif key == 'edges':
+                    for edges in reader.iter_array():
+                        edge_from_ids.extend([edge['from_node_id'] for edge in edges])
+                        edge_to_ids.extend([edge['to_node_id'] for edge in edges])
+                elif key == 'start_node_id':
+                    start_node_id = reader.read_value()
+                elif key == 'end_node_id':
+                    end_node_id = reader.read_value()
+                else:
+                    reader.read_value()
+
+            if reader.peek():
+                raise ValueError('extra data after the graph')
+        except KeyError as e:
+            on_error(f'Invalid graph file, missing key {e}!')
+        except (TypeError, ValueError, OverflowError) as e:
+            # JSONDecodeError is a ValueError as well
+            on_error(f'Invalid graph file ({e})!')
+
+    node_ids = np.frombuffer(node_ids, dtype=np.int64)
+    edge_from_ids = np.frombuffer(edge_from_ids, dtype=np.int64)
+    edge_to_ids = np.frombuffer(edge_to_ids, dtype=np.int64)
+
+    # the same checks as check_graph_correctness, but over the arrays
+    repeated = np.ones(len(node_ids), dtype=bool)
+    repeated[np.unique(node_ids, return_index=True)[1]] = False
+    if repeated.any():
+        # the first node with an already used ID in the order of the file
+        on_error(f'Multiple nodes have the same ID (ID: {node_ids[np.argmax(repeated)]})!')
+
+    # JSON true and false are parsed as bool, which is a subclass of int
+    def is_node_id(node_id):
+        return isinstance(node_id, int) and not isinstance(node_id, bool) and node_id in node_ids
+
+    if not is_node_id(start_node_id):
+        on_error('Start node has invalid ID!')
+
+    if not is_node_id(end_node_id):
+        on_error('End node has invalid ID!')
+
+    invalid_from = ~np.isin(edge_from_ids, node_ids)
+    invalid_to = ~np.isin(edge_to_ids, node_ids)
+    self_loops = edge_from_ids == edge_to_ids
+    invalid_edges = np.flatnonzero(self_loops | invalid_from | invalid_to)
+
+    if len(invalid_edges):
+        # the first invalid edge in the order of the file
+        edge = invalid_edges[0]
+
+        if self_loops[edge]:
+            on_error('Edges cannot start and end in the same node!')
+        if invalid_from[edge]:
+            on_error(f'Edge is connected to a non-existing node (ID: {edge_from_ids[edge]})!')
+        on_error(f'Edge is connected to a non-existing node (ID: {edge_to_ids[edge]})!')
+
+    return CompactGraph(node_ids, node_x, node_y, edge_from_ids, edge_to_ids, start_node_id, end_node_id)
+
+
+def get_cache_path(file_path):
+    return os.path.splitext(file_path)[0] + '.cache.npz'
+
+
+# the cache is valid for the file with the same size and modification time
+def get_file_signature(file_path):
+    stat = os.stat(file_path)
+    return np.array([GRAPH_CACHE_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+def load_graph_cache(file_path):
+    try:
+        with np.load(get_cache_path(file_path)) as cache:
+            if not np.array_equal(cache['signature'], get_file_signature(file_path)):
+                return None
+            return CompactGraph.from_arrays({name: cache[name] for name in cache.files})
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def save_graph_cache(file_path, graph):
+    cache_path = get_cache_path(file_path)
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+
+    # the cache is only an optimization, the graph is fine without it
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, signature=get_file_signature(file_path), **graph.get_arrays())
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# loads the graph from the binary cache if the JSON file hasn't changed since
+# the cache was saved, otherwise streams the JSON file and saves the cache
+def load_graph(file_path, use_cache=True, on_error=print_graph_error):
+    if use_cache:
+        graph = load_graph_cache(file_path)
+        if graph is not None:
+            return graph
+
+    graph = read_graph_file(file_path, on_error)
+
+    if use_cache:
+        save_graph_cache(file_path, graph)
+
+    return graph
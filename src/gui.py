@@ -0,0 +1,692 @@
+# ******************************* gui.py ************************************
+#  Course: Soft Computing (SFC) - FIT BUT
+#  Project name: Shortest path search simulation using ACO
+#  Author: Beranek Tomas (xberan46)
+#  Date: 26.11.2022
+#  Up2date sources: https://github.com/TomasBeranek/but-sfc-project
+# ***************************************************************************
+
+
+import os
+import tkinter as tk
+import tkinter.ttk as ttk
+import numpy as np
+from PIL import Image, ImageTk
+
+from checkpoint import Checkpoint, Checkpointer
+from options import INCREMENT_TYPES, STRATEGIES
+from profiling import PhaseTimers, SOLVER_PHASE_METHODS, call_profiled
+from render import EdgeRenderer, FrameTimer, SpriteAtlas
+from simulation import AntSimulation
+from solver import ACOSolver, MIN_PHEROMONE_LEVEL
+
+
+# just because some dependencies are missing on Merlin server
+RUNNING_ON_MERLIN = False
+
+# snapshots of the simulation are drawn at most MAX_FPS times per second
+MAX_FPS = 30
+
+# speed of ants slider is in pixels per 1/ANT_SPEED_SCALE s (25 ms)
+ANT_SPEED_SCALE = 40
+
+# simulation can take at most this portion of a frame, the rest of simulated
+# time is dropped (the simulation slows down instead of freezing the GUI)
+SIMULATION_FRAME_PORTION = 0.8
+
+# root of the app
+ROOT = None
+
+# main frame
+FRAME = None
+
+# GUI state of the simulation
+LAST_FRAME_TIME = None
+FRAME_TIMER = FrameTimer()
+PHASE_TIMERS = PhaseTimers()
+CHECKPOINTER = None
+
+# GUI controls values
+ALPHA = None
+BETA = None
+ALPHA_LABEL = None
+BETA_LABEL = None
+INCREMENT_TYPE = None
+STRATEGY = None
+EVAPORATION_PER_SECOND = None
+EVAPORATION_LABEL = None
+SPEED_LABEL = None
+ANT_SPEED = None
+SIMULATION_SPEED = None
+SIMULATION_SPEED_LABEL = None
+FRAME_TIME_LABEL = None
+SHOW_PHASE_TIMES = None
+PHASE_TIMES_LABEL = None
+
+
+# radius of the node circles
+NODE_RADIUS = 25
+
+def create_circle(x, y, r, canvas, fill='#3e3e3e', activefill='#4e4e4e'):
+    return canvas.create_oval(x - r, y - r, x + r, y + r, fill=fill, outline='#2c2c2c', width=5, activefill=activefill, tags='node')
+
+def calculate_alpha_beta(x):
+    # x can alpha or beta, but they are calculated in a same way from slider value
+    return (x - 100) / 100
+
+def calculate_image_angle(graph, from_node, to_node):
+    path_vector_x = graph.node_x[to_node] - graph.node_x[from_node]
+    # flip Y axis, since positive y is at the bottom in windows
+    path_vector_y = -1 *(graph.node_y[to_node] - graph.node_y[from_node])
+
+    # calculate angle in degrees of edge from from_node to to_node
+    path_vector = complex(path_vector_x, path_vector_y)
+    angle = np.angle(path_vector, deg=True)
+
+    # correction -- in numpy 0.0 angle points up, we want 0.0 point right
+    return angle - 90
+
+
+def update_ant_image(frame, i, angle, has_food):
+    ant_img_tk = frame.sprite_atlas.get(angle, has_food)
+
+    # the ant already has the right rotation
+    if ant_img_tk is frame.ant_sprites[i]:
+        return
+
+    frame.ant_sprites[i] = ant_img_tk
+    frame.canvas.itemconfig(frame.ant_object_ids[i], image=ant_img_tk)
+
+
+def highlight_best_path(frame, path, edges):
+    print(f'New best path with length {frame.solver.best_found_path_len}: ', end='')
+    print(path)
+    paint_best_path(frame, edges)
+
+
+def paint_best_path(frame, edges):
+    # clear all highlighting (removed edges have no lines)
+    for edge in np.flatnonzero(~frame.graph.edge_removed).tolist():
+        frame.canvas.itemconfigure(frame.line_border_object_ids[edge], fill='white')
+
+    # highlight the best path
+    for edge in edges:
+        line_border_id = frame.line_border_object_ids[edge]
+        frame.canvas.itemconfigure(line_border_id, fill='#2ba8fc')
+
+
+def update_solver_parameters(solver):
+    global ALPHA, BETA, EVAPORATION_PER_SECOND, INCREMENT_TYPE, STRATEGY
+
+    solver.alpha = calculate_alpha_beta(ALPHA.get())
+    solver.beta = calculate_alpha_beta(BETA.get())
+    solver.evaporation = EVAPORATION_PER_SECOND.get()/100
+
+    for increment_type, label in INCREMENT_TYPES.items():
+        if INCREMENT_TYPE.get() == label:
+            solver.increment_type = increment_type
+
+    # the strategy keeps its own state, so it is replaced only when it changes
+    for strategy, label in STRATEGIES.items():
+        if STRATEGY.get() == label and strategy != solver.strategy:
+            solver.set_strategy(strategy)
+
+
+def render_ants(frame):
+    simulation = frame.simulation
+
+    # positions are interpolated only now, when they are drawn
+    x, y = simulation.get_positions()
+
+    ants = simulation.ants
+    ant_states = zip(ants.last_node.tolist(), ants.next_node.tolist(), ants.has_food.tolist())
+
+    for i, (ant_x, ant_y, rendered_state) in enumerate(zip(x.tolist(), y.tolist(), ant_states)):
+        frame.canvas.coords(frame.ant_object_ids[i], ant_x, ant_y)
+
+        # rotate ant towards next node when it starts walking over a new edge
+        if rendered_state != frame.ant_rendered_states[i]:
+            frame.ant_rendered_states[i] = rendered_state
+            last_node, next_node, has_food = rendered_state
+
+            if last_node != next_node:
+                PHASE_TIMERS.enter('rotation')
+                angle = calculate_image_angle(frame.graph, last_node, next_node)
+                update_ant_image(frame, i, angle, has_food)
+                PHASE_TIMERS.exit()
+
+
+def frame_event():
+    global ROOT, FRAME, LAST_FRAME_TIME, FRAME_TIMER, PHASE_TIMERS, CHECKPOINTER, SHOW_PHASE_TIMES, ANT_SPEED, SIMULATION_SPEED
+    frame_duration = 1 / MAX_FPS
+
+    # the solver phases are timed only while their times are shown
+    if SHOW_PHASE_TIMES.get() != PHASE_TIMERS.is_instrumented:
+        if SHOW_PHASE_TIMES.get():
+            PHASE_TIMERS.instrument(FRAME.solver, SOLVER_PHASE_METHODS)
+        else:
+            PHASE_TIMERS.restore()
+
+    FRAME_TIMER.start()
+    PHASE_TIMERS.start_tick()
+    frame_start = FRAME_TIMER.frame_start
+    real_time = frame_start - LAST_FRAME_TIME if LAST_FRAME_TIME else frame_duration
+    LAST_FRAME_TIME = frame_start
+
+    # GUI is only a viewer, the solver gets current values of the controls
+    update_solver_parameters(FRAME.solver)
+    FRAME.simulation.set_ant_speed(ANT_SPEED.get() * ANT_SPEED_SCALE)
+
+    # simulate the time elapsed since the last frame (possibly sped up)
+    FRAME.simulation.advance(real_time * SIMULATION_SPEED.get(), deadline=frame_start + SIMULATION_FRAME_PORTION * frame_duration)
+
+    with PHASE_TIMERS.phase('render'):
+        # draw the current snapshot of the simulation
+        render_ants(FRAME)
+
+        # update color of paths whose pheromone level changed enough
+        FRAME.edge_renderer.render(FRAME.solver.pheromone, FRAME.solver.max_pheromone_level)
+
+    PHASE_TIMERS.stop_tick()
+    frame_time = FRAME_TIMER.stop()
+    update_frame_time_label(FRAME.edge_renderer.repainted_cnt, FRAME.simulation.time)
+    update_phase_times_label()
+
+    if CHECKPOINTER is not None:
+        CHECKPOINTER.maybe_save()
+
+    ROOT.after(max(1, int(1000 * (frame_duration - frame_time))), frame_event)
+
+
+class ACOFrame(tk.Frame):
+    def __init__(self, parent, graph, ants, seed=None, checkpoint=None, candidate_cnt=None, local_search=False):
+        tk.Frame.__init__(self, parent)
+
+        # create canvas into which a graph will be displayed
+        self.canvas = tk.Canvas(self, bg='white', highlightthickness=0)
+        self.canvas.pack(fill='both', expand=True)
+
+        # python3.6 on Merlin does not have Pmw
+        if not RUNNING_ON_MERLIN:
+            # for tooltips
+            self.balloon = Pmw.Balloon()
+
+        # save ant with food image for later use
+        ant_food_img_path = os.path.dirname(os.path.realpath(__file__)) + '/../gui_images/ant_image_low_res_with_food.png'
+        self.ant_food_img = Image.open(ant_food_img_path)
+
+        # display ants
+        ant_img_path = os.path.dirname(os.path.realpath(__file__)) + '/../gui_images/ant_image_low_res.png'
+        self.ant_img = Image.open(ant_img_path)
+
+        # all rotations of both images are prepared in advance
+        self.sprite_atlas = SpriteAtlas(self.ant_img, self.ant_food_img)
+        print(f'Sprite atlas: {2 * self.sprite_atlas.rotation_cnt} sprites rotated by {self.sprite_atlas.angle_step} degrees, {self.sprite_atlas.memory_size / 1024:.0f} KiB')
+        ant_img_tk = self.sprite_atlas.get(0, False)
+
+        start_node_x = graph.node_x[graph.start_node]
+        start_node_y = graph.node_y[graph.start_node]
+
+        # draw edges borders before ants, so that ants are in higher canvas level
+        self.draw_edges_border(graph)
+
+        # headless solver which runs the ACO itself and simulation of ants
+        # walking in simulated time, the frame only shows their snapshots
+        if checkpoint is not None:
+            self.solver, self.simulation, resumed = checkpoint.restore(graph, ants, seed=seed, simulated=True)
+            print(checkpoint.describe(resumed))
+        else:
+            self.solver = ACOSolver(graph, ants, seed=seed, candidate_cnt=candidate_cnt, local_search=local_search)
+            self.simulation = AntSimulation(self.solver)
+        self.solver.on_new_best_path = lambda path, edges: highlight_best_path(self, path, edges)
+
+        # canvas image, current sprite and drawn state of each ant
+        self.ant_object_ids = []
+        self.ant_sprites = []
+        self.ant_rendered_states = []
+
+        for _ in range(len(self.solver.ants)):
+            self.ant_object_ids.append(self.canvas.create_image(start_node_x, start_node_y, image=ant_img_tk, tags='ant'))
+            self.ant_sprites.append(ant_img_tk)
+            self.ant_rendered_states.append(None)
+
+        # display graph over ants
+        self.draw_edges(graph)
+        self.draw_nodes(graph)
+
+        # repaints only the edges whose colour changed
+        self.edge_renderer = EdgeRenderer(self.canvas, self.line_object_ids, MIN_PHEROMONE_LEVEL)
+
+        self.graph = graph
+        self.bind_graph_editing()
+
+        # a resumed solver may already have a best path
+        if self.solver.best_found_path:
+            highlight_best_path(self, self.solver.best_found_path, self.solver.best_found_path_edges)
+
+
+    def draw_nodes(self, graph):
+        # canvas circle of each node and the node of each circle
+        self.node_object_ids = []
+        self.node_by_object_id = {}
+
+        for node in range(graph.node_cnt):
+            id = graph.node_ids[node]
+            x = graph.node_x[node]
+            y = graph.node_y[node]
+
+            if node == graph.start_node:
+                circle = create_circle(x, y, NODE_RADIUS, self.canvas, fill='green', activefill='darkgreen')
+                # python3.6 on Merlin does not have Pmw
+                if not RUNNING_ON_MERLIN:
+                    self.balloon.tagbind(self.canvas, circle, f'START ID: {id}')
+            elif node == graph.end_node:
+                circle = create_circle(x, y, NODE_RADIUS, self.canvas, fill='yellow', activefill='orange')
+                # python3.6 on Merlin does not have Pmw
+                if not RUNNING_ON_MERLIN:
+                    self.balloon.tagbind(self.canvas, circle, f'END ID: {id}')
+            else:
+                circle = create_circle(x, y, NODE_RADIUS, self.canvas)
+                # python3.6 on Merlin does not have Pmw
+                if not RUNNING_ON_MERLIN:
+                    self.balloon.tagbind(self.canvas, circle, f'ID: {id}')
+
+            self.node_object_ids.append(circle)
+            self.node_by_object_id[circle] = node
+
+    def draw_edges(self, graph):
+        # canvas line of each edge
+        self.line_object_ids = []
+
+        for start, end in zip(graph.edge_from, graph.edge_to):
+            x1 = graph.node_x[start]
+            y1 = graph.node_y[start]
+            x2 = graph.node_x[end]
+            y2 = graph.node_y[end]
+
+            line = self.canvas.create_line(x1, y1, x2, y2, fill='#2c2c2c', width=7, tags='edge')
+            self.line_object_ids.append(line)
+
+    def draw_edges_border(self, graph):
+        # canvas line of each edge border
+        self.line_border_object_ids = []
+
+        for start, end in zip(graph.edge_from, graph.edge_to):
+            x1 = graph.node_x[start]
+            y1 = graph.node_y[start]
+            x2 = graph.node_x[end]
+            y2 = graph.node_y[end]
+
+            line_border = self.canvas.create_line(x1, y1, x2, y2, fill='white', width=13, tags='edge_border')
+            self.line_border_object_ids.append(line_border)
+
+    # the graph can be changed while the colony runs -- a node is moved by
+    # dragging it, right-clicking two nodes adds or removes the edge between
+    # them
+    def bind_graph_editing(self):
+        self.dragged_node = None
+        self.selected_node = None
+
+        self.canvas.bind('<ButtonPress-1>', self.on_left_press)
+        self.canvas.bind('<B1-Motion>', self.on_drag)
+        self.canvas.bind('<ButtonRelease-1>', self.on_left_release)
+        self.canvas.bind('<ButtonPress-3>', self.on_right_press)
+
+    # node under the mouse (nodes are at the highest canvas level)
+    def get_current_node(self):
+        items = self.canvas.find_withtag('current')
+        return self.node_by_object_id.get(items[0]) if items else None
+
+    def on_left_press(self, event):
+        self.dragged_node = self.get_current_node()
+
+    def on_drag(self, event):
+        if self.dragged_node is not None:
+            self.move_node(self.dragged_node, event.x, event.y)
+
+    def on_left_release(self, event):
+        self.dragged_node = None
+
+    def on_right_press(self, event):
+        node = self.get_current_node()
+
+        if self.selected_node is not None:
+            self.canvas.itemconfigure(self.node_object_ids[self.selected_node], outline='#2c2c2c')
+            if node is not None and node != self.selected_node:
+                self.toggle_edge(self.selected_node, node)
+            self.selected_node = None
+        elif node is not None:
+            self.canvas.itemconfigure(self.node_object_ids[node], outline='#2ba8fc')
+            self.selected_node = node
+
+    def move_node(self, node, x, y):
+        graph = self.graph
+        self.solver.move_node(node, x, y)
+        self.canvas.coords(self.node_object_ids[node], x - NODE_RADIUS, y - NODE_RADIUS, x + NODE_RADIUS, y + NODE_RADIUS)
+
+        for edge in graph.entry_edge[graph.indptr[node]:graph.indptr[node + 1]].tolist():
+            coords = self.get_edge_coords(edge)
+            self.canvas.coords(self.line_object_ids[edge], *coords)
+            self.canvas.coords(self.line_border_object_ids[edge], *coords)
+
+    def toggle_edge(self, node1, node2):
+        graph = self.graph
+        edge = graph.find_edge(node1, node2)
+        node_ids = f'{graph.node_ids[node1]} and {graph.node_ids[node2]}'
+
+        try:
+            if edge >= 0:
+                self.solver.remove_edge(edge)
+                self.canvas.delete(self.line_object_ids[edge], self.line_border_object_ids[edge])
+                self.edge_renderer.remove_line(edge)
+                print(f'Edge between nodes {node_ids} removed')
+            else:
+                edge = self.solver.add_edge(node1, node2)
+                self.create_edge_lines(edge)
+                print(f'Edge between nodes {node_ids} added')
+        except ValueError as error:
+            print(error)
+            return
+
+        paint_best_path(self, self.solver.best_found_path_edges)
+
+    def get_edge_coords(self, edge):
+        graph = self.graph
+        start = graph.edge_from[edge]
+        end = graph.edge_to[edge]
+        return graph.node_x[start], graph.node_y[start], graph.node_x[end], graph.node_y[end]
+
+    def create_edge_lines(self, edge):
+        coords = self.get_edge_coords(edge)
+        line_border = self.canvas.create_line(*coords, fill='white', width=13, tags='edge_border')
+        line = self.canvas.create_line(*coords, fill='#2c2c2c', width=7, tags='edge')
+
+        # borders are under the ants, lines are over them and under the nodes
+        self.canvas.tag_lower(line_border, 'ant' if self.ant_object_ids else 'edge')
+        self.canvas.tag_lower(line, 'node')
+
+        if edge == len(self.line_object_ids):
+            self.line_object_ids.append(line)
+            self.line_border_object_ids.append(line_border)
+        else:
+            self.line_object_ids[edge] = line
+            self.line_border_object_ids[edge] = line_border
+
+        self.edge_renderer.set_line(edge, line)
+
+
+def create_strategy_dropdown(root):
+    global STRATEGY
+
+    strategy_options = list(STRATEGIES.values())
+    STRATEGY = tk.StringVar()
+
+    label = tk.Label(root, text="Pheromone update strategy", bg="white")
+    label.place(x=1095, y=20)
+
+    drop = ttk.Combobox(root, state="readonly", textvariable=STRATEGY, values=strategy_options, width=21)
+    drop.set(strategy_options[0])
+    drop.place(x=1100, y=50)
+
+
+def create_increment_type_dropdown(root):
+    global INCREMENT_TYPE
+
+    # dropdown menu options
+    increment_options = list(INCREMENT_TYPES.values())
+
+    # datatype of menu text
+    INCREMENT_TYPE = tk.StringVar()
+
+    # create label
+    label = tk.Label(root, text="Pheromone increment type", bg="white")
+    label.place(x=1095, y=80)
+
+    # create dropdown menu
+    drop = ttk.Combobox(root, state="readonly", textvariable=INCREMENT_TYPE, values=increment_options, width=21)
+    drop.set(increment_options[0])
+    # drop.bind("<<ComboboxSelected>>", lambda e: frame.focus_force())
+    drop.place(x=1100, y=110)
+
+    # create style for all comboboxes
+    combostyle = ttk.Style()
+    combostyle.theme_create('combostyle', parent='alt',
+                             settings = {'TCombobox':
+                                         {'configure':
+                                          {'selectbackground': '#777777',
+                                           'fieldbackground': 'white',
+                                           'background': 'white'
+                                           }}}
+                             )
+    combostyle.theme_use('combostyle')
+
+
+def update_evaporation_slider_label(event):
+    global EVAPORATION_PER_SECOND, EVAPORATION_LABEL
+
+    val = EVAPORATION_PER_SECOND.get()/100
+    EVAPORATION_LABEL.config(text='{0:.2f}'.format(val))
+
+
+def create_evaporation_slider(root):
+    global EVAPORATION_PER_SECOND, EVAPORATION_LABEL
+
+    # create label
+    label = tk.Label(root, text="Evaporation coeff (per s)", bg="white")
+    label.place(x=1095, y=150)
+
+    # create label with slider value
+    EVAPORATION_LABEL = tk.Label(root, text="0.98", bg="white")
+    EVAPORATION_LABEL.place(x=1260, y=180)
+
+    EVAPORATION_PER_SECOND = tk.DoubleVar()
+    slider = ttk.Scale(root, from_=0, to=100, variable=EVAPORATION_PER_SECOND, length=150, command=update_evaporation_slider_label)
+    slider.set(98)
+    slider.place(x=1100, y=180)
+
+
+def update_speed_slider_label(event):
+    global ANT_SPEED, SPEED_LABEL
+
+    SPEED_LABEL.config(text=str(ANT_SPEED.get()))
+
+
+def create_speed_slider(root):
+    global ANT_SPEED, SPEED_LABEL
+
+    # create label
+    label = tk.Label(root, text="Speed of ants", bg="white")
+    label.place(x=1095, y=220)
+
+    # create label with slider value
+    SPEED_LABEL = tk.Label(root, text="10", bg="white")
+    SPEED_LABEL.place(x=1260, y=250)
+
+    ANT_SPEED = tk.IntVar()
+    slider = ttk.Scale(root, from_=0, to=100, variable=ANT_SPEED, length=150, command=update_speed_slider_label)
+    slider.set(10)
+    slider.place(x=1100, y=250)
+
+
+def update_alpha_slider_label(event):
+    global ALPHA, ALPHA_LABEL
+
+    alpha = calculate_alpha_beta(ALPHA.get())
+    ALPHA_LABEL.config(text=('%0.2f' % alpha).rjust(5))
+
+
+def create_alpha_slider(root):
+    global ALPHA, ALPHA_LABEL
+
+    # create label
+    label = tk.Label(root, text="Alpha (pheromones)", bg="white")
+    label.place(x=1095, y=290)
+
+    # create label with slider value
+    ALPHA_LABEL = tk.Label(root, text="1", bg="white")
+    ALPHA_LABEL.place(x=1257, y=320)
+
+    ALPHA = tk.IntVar()
+    slider = ttk.Scale(root, from_=0, to=200, variable=ALPHA, length=150, command=update_alpha_slider_label)
+    slider.set(200)
+    slider.place(x=1100, y=320)
+
+
+def update_beta_slider_label(event):
+    global BETA, BETA_LABEL
+
+    beta = calculate_alpha_beta(BETA.get())
+    BETA_LABEL.config(text=('%0.2f' % beta).rjust(5))
+
+
+def create_beta_slider(root):
+    global BETA, BETA_LABEL
+
+    # create label
+    label = tk.Label(root, text="Beta (edge length)", bg="white")
+    label.place(x=1095, y=360)
+
+    # create label with slider value
+    BETA_LABEL = tk.Label(root, text="1", bg="white")
+    BETA_LABEL.place(x=1257, y=390)
+
+    BETA = tk.IntVar()
+    slider = ttk.Scale(root, from_=0, to=200, variable=BETA, length=150, command=update_beta_slider_label)
+    slider.set(200)
+    slider.place(x=1100, y=390)
+
+
+def update_simulation_speed_slider_label(event):
+    global SIMULATION_SPEED, SIMULATION_SPEED_LABEL
+
+    SIMULATION_SPEED_LABEL.config(text=str(SIMULATION_SPEED.get()) + 'x')
+
+
+def create_simulation_speed_slider(root):
+    global SIMULATION_SPEED, SIMULATION_SPEED_LABEL
+
+    # create label
+    label = tk.Label(root, text="Simulation speed", bg="white")
+    label.place(x=1095, y=430)
+
+    # create label with slider value
+    SIMULATION_SPEED_LABEL = tk.Label(root, text="1x", bg="white")
+    SIMULATION_SPEED_LABEL.place(x=1260, y=460)
+
+    SIMULATION_SPEED = tk.IntVar()
+    slider = ttk.Scale(root, from_=1, to=50, variable=SIMULATION_SPEED, length=150, command=update_simulation_speed_slider_label)
+    slider.set(1)
+    slider.place(x=1100, y=460)
+
+
+def update_frame_time_label(repainted_cnt, simulated_time):
+    global FRAME_TIMER, FRAME_TIME_LABEL
+
+    frame_time = FRAME_TIMER.average_frame_time * 1000
+    FRAME_TIME_LABEL.config(text=f'Frame time: {frame_time:.1f} ms\nRepainted edges: {repainted_cnt}\nSimulated time: {simulated_time:.1f} s')
+
+
+def create_frame_time_label(root):
+    global FRAME_TIME_LABEL
+
+    FRAME_TIME_LABEL = tk.Label(root, text="Frame time: -", bg="white", justify='left')
+    FRAME_TIME_LABEL.place(x=1095, y=500)
+
+
+def update_phase_times_label():
+    global PHASE_TIMERS, SHOW_PHASE_TIMES, PHASE_TIMES_LABEL
+
+    if not SHOW_PHASE_TIMES.get():
+        PHASE_TIMES_LABEL.config(text='')
+        return
+
+    lines = [f'{phase.capitalize()}: {phase_time * 1000:.2f} ms' for phase, phase_time in PHASE_TIMERS.average_times.items()]
+    PHASE_TIMES_LABEL.config(text='\n'.join(lines))
+
+
+def create_phase_times_overlay(root):
+    global SHOW_PHASE_TIMES, PHASE_TIMES_LABEL
+
+    SHOW_PHASE_TIMES = tk.BooleanVar(value=False)
+    checkbox = tk.Checkbutton(root, text='Show phase times', variable=SHOW_PHASE_TIMES, bg='white', highlightthickness=0)
+    checkbox.place(x=1095, y=550)
+
+    PHASE_TIMES_LABEL = tk.Label(root, text='', bg='white', justify='left')
+    PHASE_TIMES_LABEL.place(x=1095, y=575)
+
+
+# controls show the parameters of a resumed solver (as far as their ranges
+# allow), since the solver gets the values of the controls in every frame
+def set_controls(solver, simulation):
+    global ALPHA, BETA, EVAPORATION_PER_SECOND, INCREMENT_TYPE, STRATEGY, ANT_SPEED
+
+    ALPHA.set(round(solver.alpha * 100 + 100))
+    update_alpha_slider_label(None)
+    BETA.set(round(solver.beta * 100 + 100))
+    update_beta_slider_label(None)
+    EVAPORATION_PER_SECOND.set(solver.evaporation * 100)
+    update_evaporation_slider_label(None)
+    INCREMENT_TYPE.set(INCREMENT_TYPES[solver.increment_type])
+    STRATEGY.set(STRATEGIES[solver.strategy])
+    ANT_SPEED.set(round(simulation.ant_speed / ANT_SPEED_SCALE))
+    update_speed_slider_label(None)
+
+
+def create_controls(root):
+    create_strategy_dropdown(root)
+    create_increment_type_dropdown(root)
+    create_evaporation_slider(root)
+    create_speed_slider(root)
+    create_alpha_slider(root)
+    create_beta_slider(root)
+    create_simulation_speed_slider(root)
+    create_frame_time_label(root)
+    create_phase_times_overlay(root)
+
+
+# opens the window with the simulation of the colony on the graph and runs
+# it until the window is closed
+def run_gui(args, graph):
+    global ROOT, FRAME, CHECKPOINTER, RUNNING_ON_MERLIN, Pmw
+
+    RUNNING_ON_MERLIN = args.merlin
+
+    root = tk.Tk()
+    ROOT = root
+
+    # python3.6 on Merlin does not have Pmw
+    if not RUNNING_ON_MERLIN:
+        import Pmw
+        Pmw.initialise(root)
+
+    # set window size
+    root.geometry('1300x700')
+    root.resizable(False, False)
+
+    # set title
+    root.title('ACO simulation')
+
+    # set icon
+    img_path = os.path.dirname(os.path.realpath(__file__)) + '/../gui_images/ant_icon.png'
+    img = ImageTk.PhotoImage(Image.open(img_path))
+    root.tk.call('wm', 'iconphoto', root._w,img)
+
+    # create frame with graph
+    FRAME = ACOFrame(root, graph, args.ants, args.seed, Checkpoint(args.resume) if args.resume else None, args.candidates, args.local_search)
+    FRAME.pack(fill="both", expand=True)
+
+    # create GUI controls
+    create_controls(root)
+    if args.resume:
+        set_controls(FRAME.solver, FRAME.simulation)
+
+    if args.checkpoint:
+        CHECKPOINTER = Checkpointer(args.checkpoint, FRAME.solver, FRAME.simulation, args.checkpoint_interval)
+
+    # start window loop
+    root.after(0, frame_event)
+    call_profiled(args.profile, root.mainloop)
+
+    # the last snapshot when the window is closed
+    if CHECKPOINTER is not None:
+        CHECKPOINTER.save()
@@ -0,0 +1,32 @@
+# ******************************* options.py ********************************
+#  Course: Soft Computing (SFC) - FIT BUT
+#  Project name: Shortest path search simulation using ACO
+#  Author: Beranek Tomas (xberan46)
+#  Date: 26.11.2022
+#  Up2date sources: https://github.com/TomasBeranek/but-sfc-project
+# ***************************************************************************
+
+
+# choices and defaults of the command line options, kept apart from the
+# solver, so parsing the arguments (or --help) doesn't import NumPy
+
+
+# pheromone increment types -- CLI names and their labels in GUI dropdown
+INCREMENT_TYPES = {
+    'constant': '1 (constant)',
+    'path-cost': '1/P (P - cost of path)',
+    'max-edge': 'C/P (C - max edge cost)',
+    'best-path': 'Pb/P (Pb - best path cost)'
+}
+
+# pheromone update strategies -- CLI names and their labels in GUI dropdown
+STRATEGIES = {
+    'as': 'Ant System',
+    'elitist': 'Elitist Ant System',
+    'rank': 'Rank-based Ant System',
+    'mmas': 'Max-Min Ant System',
+    'acs': 'Ant Colony System'
+}
+
+# snapshots are saved at most once per this many (wall-clock) seconds
+DEFAULT_CHECKPOINT_INTERVAL = 60
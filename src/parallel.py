@@ -0,0 +1,193 @@
+# ******************************* parallel.py *******************************
+#  Course: Soft Computing (SFC) - FIT BUT
+#  Project name: Shortest path search simulation using ACO
+#  Author: Beranek Tomas (xberan46)
+#  Date: 26.11.2022
+#  Up2date sources: https://github.com/TomasBeranek/but-sfc-project
+# ***************************************************************************
+
+
+import multiprocessing as mp
+import sys
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+from solver import ACOSolver
+
+
+# portion of the averaged pheromone of all colonies mixed into each colony
+# when pheromone matrices are merged
+MERGE_WEIGHT = 0.5
+
+
+class SharedArrays:
+    # NumPy arrays placed in shared memory, the owner creates them from
+    # specs {name: (shape, dtype)} and other processes attach to them by the
+    # names of the memory blocks
+    def __init__(self, specs, block_names=None):
+        self.specs = specs
+        self.blocks = {}
+        self.arrays = {}
+
+        for name, (shape, dtype) in specs.items():
+            size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+
+            if block_names is None:
+                block = shared_memory.SharedMemory(create=True, size=size)
+            else:
+                block = shared_memory.SharedMemory(name=block_names[name])
+
+            self.blocks[name] = block
+            self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    @property
+    def block_names(self):
+        return {name: block.name for name, block in self.blocks.items()}
+
+    def close(self):
+        # arrays must not be used after the memory is closed
+        self.arrays = {}
+        for block in self.blocks.values():
+            block.close()
+
+    def unlink(self):
+        for block in self.blocks.values():
+            block.unlink()
+
+
+def get_shared_specs(graph, workers):
+    return {
+        # pheromone matrix -- one row per colony, used directly by the solvers
+        'pheromone': ((workers, graph.edge_cnt), np.float64),
+        # best path of each colony -- node indices and edges
+        'best_path_len': ((workers,), np.float64),
+        'best_path_node_cnt': ((workers,), np.int64),
+        'best_path': ((workers, graph.node_cnt + 1), np.int32),
+        'best_path_edges': ((workers, graph.node_cnt), np.int32),
+        # duration of the colony run in seconds
+        'elapsed_time': ((workers,), np.float64),
+    }
+
+
+def publish_best_path(shared, worker, solver):
+    shared['best_path_len'][worker] = solver.best_found_path_len
+
+    if solver.best_found_path_edges:
+        path = solver.graph.get_node_indices(solver.best_found_path)
+        shared['best_path_node_cnt'][worker] = len(path)
+        shared['best_path'][worker, :len(path)] = path
+        shared['best_path_edges'][worker, :len(path) - 1] = solver.best_found_path_edges
+
+
+def adopt_best_path(shared, solver):
+    # the lowest index wins in case of a tie, so all colonies adopt the same path
+    best_worker = int(np.argmin(shared['best_path_len']))
+    best_path_len = float(shared['best_path_len'][best_worker])
+
+    if best_path_len < solver.best_found_path_len:
+        node_cnt = int(shared['best_path_node_cnt'][best_worker])
+        path = shared['best_path'][best_worker, :node_cnt]
+
+        solver.best_found_path_len = best_path_len
+        solver.best_found_path = solver.graph.node_ids[path].tolist()
+        solver.best_found_path_edges = shared['best_path_edges'][best_worker, :node_cnt - 1].tolist()
+
+        # the strategy reacts as if the colony found the path itself (MMAS
+        # derives its pheromone bounds from it)
+        solver.update_strategy.on_new_best_path()
+
+
+def run_colony(worker, graph, ants, solver_params, iterations, exchange_interval, merge_pheromone, seed_sequence, block_names, specs, barrier):
+    shared = SharedArrays(specs, block_names)
+    solver = None
+
+    try:
+        solver = ACOSolver(graph, ants, seed=seed_sequence, **solver_params)
+
+        # the colony keeps its pheromone directly in the shared memory, so
+        # nothing has to be pickled during the exchange
+        shared['pheromone'][worker] = solver.pheromone
+        solver.pheromone = shared['pheromone'][worker]
+
+        start_time = time.perf_counter()
+
+        for iteration in range(1, iterations + 1):
+            solver.step()
+
+            if iteration % exchange_interval == 0 and iteration < iterations:
+                publish_best_path(shared, worker, solver)
+                barrier.wait()
+
+                adopt_best_path(shared, solver)
+
+                if merge_pheromone:
+                    merged_pheromone = (1 - MERGE_WEIGHT) * solver.pheromone + MERGE_WEIGHT * shared['pheromone'].mean(axis=0)
+
+                # no colony can write its row before all of them read the matrix
+                barrier.wait()
+
+                if merge_pheromone:
+                    solver.pheromone[:] = merged_pheromone
+                    solver.pheromone_changed()
+
+        shared['elapsed_time'][worker] = time.perf_counter() - start_time
+        publish_best_path(shared, worker, solver)
+    except BaseException:
+        # don't let other colonies wait for this one forever
+        barrier.abort()
+        raise
+    finally:
+        # the solver holds a view of the shared memory, it must be released first
+        del solver
+        shared.close()
+
+
+# island model -- each worker process runs an independent colony and every
+# exchange_interval iterations the colonies share the best found path (and
+# optionally merge their pheromone matrices), the result is deterministic
+# for a given seed and number of workers
+def run_islands(graph, ants, iterations, workers, exchange_interval=100, merge_pheromone=False, seed=None, **solver_params):
+    specs = get_shared_specs(graph, workers)
+    shared = SharedArrays(specs)
+    shared['best_path_len'][:] = sys.maxsize
+    shared['best_path_node_cnt'][:] = 0
+
+    seed_sequences = np.random.SeedSequence(seed).spawn(workers)
+    barrier = mp.Barrier(workers)
+
+    processes = [mp.Process(target=run_colony, args=(worker, graph, ants, solver_params, iterations, exchange_interval, merge_pheromone, seed_sequences[worker], shared.block_names, specs, barrier)) for worker in range(workers)]
+
+    try:
+        for process in processes:
+            process.start()
+
+        for process in processes:
+            process.join()
+
+        if any(process.exitcode != 0 for process in processes):
+            raise RuntimeError('Some of the colony processes failed!')
+
+        best_worker = int(np.argmin(shared['best_path_len']))
+        best_path_len = float(shared['best_path_len'][best_worker])
+        node_cnt = int(shared['best_path_node_cnt'][best_worker])
+        best_path = graph.node_ids[shared['best_path'][best_worker, :node_cnt]].tolist()
+        elapsed_time = float(shared['elapsed_time'].max())
+    finally:
+        shared.close()
+        shared.unlink()
+
+    return best_path, best_path_len, elapsed_time
+
+
+# time of a single colony doing the same number of iterations as one island
+def measure_single_colony(graph, ants, iterations, seed=None, **solver_params):
+    solver = ACOSolver(graph, ants, seed=seed, **solver_params)
+
+    start_time = time.perf_counter()
+    solver.run(iterations)
+
+    return time.perf_counter() - start_time
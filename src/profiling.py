@@ -0,0 +1,194 @@
+# ******************************* profiling.py ******************************
+#  Course: Soft Computing (SFC) - FIT BUT
+#  Project name: Shortest path search simulation using ACO
+#  Author: Beranek Tomas (xberan46)
+#  Date: 26.11.2022
+#  Up2date sources: https://github.com/TomasBeranek/but-sfc-project
+# ***************************************************************************
+
+
+import csv
+import time
+from contextlib import contextmanager
+
+
+# phases of one tick (GUI frame or headless iteration) which are timed, only
+# the solver phases in headless mode
+SOLVER_PHASES = ['selection', 'deposit', 'evaporation']
+PHASES = SOLVER_PHASES + ['render', 'rotation']
+
+# methods of the solver timed as phases
+SOLVER_PHASE_METHODS = {
+    'get_next_node': 'selection',
+    'select_next_nodes': 'selection',
+    'apply_deposits': 'deposit',
+    'calculate_pheromone_increments': 'deposit',
+    'calculate_pheromone_increments_many': 'deposit',
+    'evaporate_pheromone_trails': 'evaporation'
+}
+
+# weight of the last tick in the averaged phase times
+PHASE_TIME_SMOOTHING = 0.05
+
+# number of functions printed from the cProfile statistics
+PROFILE_PRINTED_FUNCTIONS = 25
+
+
+class PhaseTimers:
+    # time spent in each phase during a tick -- phases can be nested (e.g.
+    # the evaporation applies the pending deposits first), the time of a
+    # nested phase is counted only to that phase, so the phases of a tick
+    # never add up to more than the tick
+    #
+    # the timed methods are replaced only on the instrumented objects and
+    # only while the timers are needed, so they cost nothing otherwise
+    def __init__(self, phases=PHASES):
+        self.phases = phases
+        self.tick_cnt = 0
+        self.tick_start = None
+        self.tick_times = dict.fromkeys(phases, 0.0)
+        self.average_times = dict.fromkeys(phases + ['total', 'other'], 0.0)
+
+        # phases being timed (the innermost last) and when the time of the
+        # innermost one was last added
+        self.stack = []
+        self.mark = None
+
+        # (object, method name) of the instrumented methods
+        self.instrumented = []
+
+    def enter(self, phase):
+        now = time.perf_counter()
+        if self.stack:
+            self.tick_times[self.stack[-1]] += now - self.mark
+
+        self.stack.append(phase)
+        self.mark = now
+
+    def exit(self):
+        now = time.perf_counter()
+        self.tick_times[self.stack.pop()] += now - self.mark
+        self.mark = now
+
+    @contextmanager
+    def phase(self, phase):
+        self.enter(phase)
+        try:
+            yield
+        finally:
+            self.exit()
+
+    # the function timed as the phase -- enter and exit are inlined, since
+    # the function can be called for every ant
+    def timed(self, phase, function):
+        perf_counter = time.perf_counter
+        stack = self.stack
+        tick_times = self.tick_times
+
+        def timed_function(*args):
+            start = perf_counter()
+            if stack:
+                tick_times[stack[-1]] += start - self.mark
+            stack.append(phase)
+            self.mark = start
+
+            try:
+                return function(*args)
+            finally:
+                end = perf_counter()
+                tick_times[stack.pop()] += end - self.mark
+                self.mark = end
+
+        return timed_function
+
+    # methods are given as {method name: phase}
+    def instrument(self, obj, methods):
+        for name, phase in methods.items():
+            setattr(obj, name, self.timed(phase, getattr(obj, name)))
+            self.instrumented.append((obj, name))
+
+    # the instrumented objects get their original methods back
+    def restore(self):
+        for obj, name in self.instrumented:
+            delattr(obj, name)
+
+        self.instrumented = []
+
+    @property
+    def is_instrumented(self):
+        return bool(self.instrumented)
+
+    def start_tick(self):
+        for phase in self.phases:
+            self.tick_times[phase] = 0.0
+
+        self.tick_start = time.perf_counter()
+
+    # returns the times of the finished tick (in seconds) with its total time
+    # and the time not spent in any phase
+    def stop_tick(self):
+        times = dict(self.tick_times)
+        times['total'] = time.perf_counter() - self.tick_start
+        times['other'] = max(times['total'] - sum(self.tick_times.values()), 0.0)
+
+        for phase, phase_time in times.items():
+            if self.tick_cnt:
+                self.average_times[phase] += PHASE_TIME_SMOOTHING * (phase_time - self.average_times[phase])
+            else:
+                self.average_times[phase] = phase_time
+
+        self.tick_cnt += 1
+
+        return times
+
+
+class PhaseTimesWriter:
+    # CSV with one row of phase times (in milliseconds) per tick
+    def __init__(self, file, phases):
+        self.columns = ['total'] + phases + ['other']
+        self.writer = csv.writer(file)
+        self.writer.writerow(['tick'] + [f'{column}_ms' for column in self.columns])
+        self.tick_cnt = 0
+
+    def write(self, times):
+        self.writer.writerow([self.tick_cnt] + [f'{times[column] * 1000:.4f}' for column in self.columns])
+        self.tick_cnt += 1
+
+
+# runs the ticks with the solver instrumented and writes their phase times
+# into the CSV file
+def run_timed_ticks(solver, ticks, path, phases=SOLVER_PHASES):
+    timers = PhaseTimers(phases)
+    timers.instrument(solver, SOLVER_PHASE_METHODS)
+
+    try:
+        with open(path, 'w', newline='') as file:
+            writer = PhaseTimesWriter(file, phases)
+
+            for tick in ticks:
+                timers.start_tick()
+                tick()
+                writer.write(timers.stop_tick())
+    finally:
+        timers.restore()
+
+    return timers
+
+
+# calls the function under cProfile if the path is given, the statistics are
+# saved into the file (for pstats, snakeviz, ...) and the top is printed
+def call_profiled(path, function, *args):
+    if path is None:
+        return function(*args)
+
+    # pstats alone takes longer to import than the rest of the CLI
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(function, *args)
+    finally:
+        profiler.dump_stats(path)
+        print(f'Profile saved to {path}, top {PROFILE_PRINTED_FUNCTIONS} functions by cumulative time:')
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(PROFILE_PRINTED_FUNCTIONS)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3.8
+
+# ******************************* queries.py ********************************
+#  Course: Soft Computing (SFC) - FIT BUT
+#  Project name: Shortest path search simulation using ACO
+#  Author: Beranek Tomas (xberan46)
+#  Date: 26.11.2022
+#  Up2date sources: https://github.com/TomasBeranek/but-sfc-project
+# ***************************************************************************
+
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+import numpy as np
+
+from convergence import run_until_converged
+from graph import GRAPH_ARRAYS, CompactGraph, load_graph
+from options import INCREMENT_TYPES, STRATEGIES
+from parallel import SharedArrays
+from solver import ACOSolver
+
+
+# a query is finished when its best found path hasn't improved for this many
+# iterations (or after the maximal number of iterations)
+DEFAULT_PATIENCE = 200
+
+# the graph (and the heuristic) attached to the shared memory by a worker
+# process, the same for all the queries it solves
+WORKER_SHARED = None
+WORKER_GRAPH = None
+WORKER_HEURISTIC = None
+
+
+def init_parser():
+    parser = argparse.ArgumentParser(description='Many shortest path queries (start and end node pairs) over one graph -- the graph is loaded once and shared by worker processes, each query is solved by its own colony and the results are written as JSON lines as soon as the queries finish.')
+
+    parser.add_argument('-g', '--graph-file', required=True, type=str, help='input JSON file with a graph definition, its start and end nodes are ignored')
+    parser.add_argument('-q', '--queries', type=str, default=None, metavar='FILE', help='file with one query per line -- IDs of the start and end node separated by whitespace or a comma (# starts a comment)')
+    parser.add_argument('--random', type=int, default=None, metavar='N', help='solve N queries with start and end nodes drawn at random instead')
+    parser.add_argument('--query-seed', type=int, default=0, help='seed of the random queries (default: 0)')
+    parser.add_argument('-a', '--ants', type=int, default=50, help='number of ants of each query (default: 50)')
+    parser.add_argument('-i', '--iterations', type=int, default=1000, help='maximal number of iterations of each query (default: 1000)')
+    parser.add_argument('--patience', type=int, default=DEFAULT_PATIENCE, help=f'a query is finished when its best found path hasn\'t improved for PATIENCE iterations, 0 to always run all the iterations (default: {DEFAULT_PATIENCE})')
+    parser.add_argument('--time-limit', type=float, default=None, metavar='SECONDS', help='a query is finished after SECONDS of solving (default: no limit)')
+    parser.add_argument('--min-pheromone-change', type=float, default=None, metavar='CHANGE', help='a query is finished when its pheromone changed by less than CHANGE (relative) over the last check interval (default: not checked)')
+    parser.add_argument('--max-branching', type=float, default=None, metavar='FACTOR', help='a query is finished when the mean lambda-branching factor of the nodes of its best path falls to FACTOR (2 when fully converged, default: not checked)')
+    parser.add_argument('--trace', action='store_true', help='add the convergence trace of each query to its result')
+    parser.add_argument('--alpha', type=float, default=1, help='influence of pheromones (default: 1)')
+    parser.add_argument('--beta', type=float, default=1, help='influence of edge length (default: 1)')
+    parser.add_argument('--evaporation', type=float, default=0.98, help='portion of pheromone kept after each iteration (default: 0.98)')
+    parser.add_argument('--increment-type', choices=INCREMENT_TYPES.keys(), default='constant', help='pheromone increment type (default: constant)')
+    parser.add_argument('--strategy', choices=STRATEGIES.keys(), default='as', help='pheromone update strategy (default: as)')
+    parser.add_argument('--local-search', action='store_true', help='shorten the path of each ant which found food by shortcuts before it deposits pheromone')
+    parser.add_argument('--batched', action='store_true', help='select next nodes of all ants at once')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the colonies, the same seed gives the same results regardless of the number of workers')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of worker processes (default: number of CPUs)')
+    parser.add_argument('-o', '--output', type=str, default=None, help='output file with the JSON lines (default: standard output)')
+    parser.add_argument('--no-graph-cache', action='store_true', help='always read the JSON graph file, don\'t use or save its binary cache')
+
+    return parser
+
+
+# pairs of node IDs
+def read_queries(file_path):
+    queries = []
+
+    with open(file_path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.split('#')[0].replace(',', ' ').split()
+            if not line:
+                continue
+
+            try:
+                start_id, end_id = map(int, line)
+            except ValueError:
+                raise ValueError(f'{file_path}:{line_number}: a query must be two node IDs')
+
+            queries.append((start_id, end_id))
+
+    return queries
+
+
+# pairs of IDs of different nodes drawn at random
+def generate_queries(graph, query_cnt, seed=None):
+    rng = np.random.default_rng(seed)
+    starts = rng.integers(graph.node_cnt, size=query_cnt)
+    ends = (starts + rng.integers(1, graph.node_cnt, size=query_cnt)) % graph.node_cnt
+
+    return list(zip(graph.node_ids[starts].tolist(), graph.node_ids[ends].tolist()))
+
+
+# pairs of node IDs to pairs of node indices
+def resolve_queries(graph, queries):
+    resolved = []
+
+    for start_id, end_id in queries:
+        start_node = graph.find_node_index(start_id)
+        end_node = graph.find_node_index(end_id)
+
+        if start_node < 0 or end_node < 0:
+            raise ValueError(f'query {start_id} {end_id} has an unknown node ID')
+        if start_node == end_node:
+            raise ValueError(f'query {start_id} {end_id} has the same start and end node')
+
+        resolved.append((start_node, end_node))
+
+    return resolved
+
+
+# the arrays of the graph and the heuristic of the edges are immutable while
+# the queries are solved, so they are placed in the shared memory only once
+def get_graph_specs(graph):
+    specs = {name: (getattr(graph, name).shape, getattr(graph, name).dtype) for name in GRAPH_ARRAYS}
+    specs['heuristic'] = ((graph.edge_cnt,), np.float64)
+    return specs
+
+
+def share_graph(graph, beta):
+    specs = get_graph_specs(graph)
+    shared = SharedArrays(specs)
+
+    for name in GRAPH_ARRAYS:
+        shared[name][:] = getattr(graph, name)
+    shared['heuristic'][:] = (1 / graph.edge_length)**beta
+
+    return shared, specs
+
+
+# initializer of a worker process
+def attach_graph(block_names, specs):
+    global WORKER_SHARED, WORKER_GRAPH, WORKER_HEURISTIC
+
+    WORKER_SHARED = SharedArrays(specs, block_names)
+
+    arrays = {name: WORKER_SHARED[name] for name in GRAPH_ARRAYS}
+    arrays['start_node'] = 0
+    arrays['end_node'] = 0
+    WORKER_GRAPH = CompactGraph.from_arrays(arrays)
+    WORKER_HEURISTIC = WORKER_SHARED['heuristic']
+
+
+# the colony of the query runs until its best found path hasn't improved for
+# patience iterations (after it found one), until it converges by the other
+# stopping criteria, or for all the iterations
+def solve_query(job):
+    query, start_node, end_node, ants, iterations, patience, seed, solver_params, stopping, trace = job
+    graph = WORKER_GRAPH.with_endpoints(start_node, end_node)
+    start_time = time.perf_counter()
+
+    solver = ACOSolver(graph, ants, seed=seed, **solver_params)
+    solver.set_heuristic(WORKER_HEURISTIC)
+
+    stop_reason, convergence_trace = run_until_converged(solver, iterations, patience=patience, **stopping)
+
+    found = bool(solver.best_found_path)
+    result = {
+        'query': query,
+        'start_node_id': int(graph.node_ids[start_node]),
+        'end_node_id': int(graph.node_ids[end_node]),
+        'path': solver.best_found_path if found else None,
+        'path_len': solver.best_found_path_len if found else None,
+        'iterations': solver.iteration_cnt,
+        'stop_reason': stop_reason,
+        'elapsed_time': time.perf_counter() - start_time
+    }
+
+    if trace:
+        result['trace'] = convergence_trace
+
+    return result
+
+
+# solves the queries (pairs of node indices) in a pool of worker processes
+# and yields the results in the order the queries finish, every query gets
+# its own seed spawned from the seed, so the results don't depend on the
+# number of workers -- stopping are the other criteria of
+# convergence.run_until_converged
+def run_queries(graph, queries, ants, iterations, patience=DEFAULT_PATIENCE, workers=None, seed=None, stopping=None, trace=False, **solver_params):
+    shared, specs = share_graph(graph, solver_params.get('beta', 1))
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(queries))
+
+    jobs = [(query, start_node, end_node, ants, iterations, patience, seed_sequences[query], solver_params, stopping or {}, trace) for query, (start_node, end_node) in enumerate(queries)]
+
+    try:
+        with mp.get_context('spawn').Pool(workers, initializer=attach_graph, initargs=(shared.block_names, specs)) as pool:
+            yield from pool.imap_unordered(solve_query, jobs)
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+if __name__ == '__main__':
+    parser = init_parser()
+    args = parser.parse_args()
+
+    if (args.queries is None) == (args.random is None):
+        parser.error('give either --queries or --random')
+
+    graph = load_graph(args.graph_file, use_cache=not args.no_graph_cache)
+
+    try:
+        queries = read_queries(args.queries) if args.queries else generate_queries(graph, args.random, args.query_seed)
+        queries = resolve_queries(graph, queries)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+
+    solver_params = {
+        'alpha': args.alpha,
+        'beta': args.beta,
+        'evaporation': args.evaporation,
+        'increment_type': args.increment_type,
+        'strategy': args.strategy,
+        'local_search': args.local_search,
+        'mode': 'batched' if args.batched else 'reference'
+    }
+
+    stopping = {
+        'time_limit': args.time_limit,
+        'min_pheromone_change': args.min_pheromone_change,
+        'max_branching': args.max_branching
+    }
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    start_time = time.perf_counter()
+
+    try:
+        for done_cnt, result in enumerate(run_queries(graph, queries, args.ants, args.iterations, args.patience, args.workers, args.seed, stopping, args.trace, **solver_params), 1):
+            print(json.dumps(result), file=output, flush=True)
+            print(f'\r{done_cnt}/{len(queries)} queries', end='', file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed_time = time.perf_counter() - start_time
+    print(f'\n{len(queries)} queries in {elapsed_time:.2f} s ({len(queries) / elapsed_time:.1f} queries/s)', file=sys.stderr)
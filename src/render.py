@@ -0,0 +1,125 @@
+# ******************************* render.py *********************************
+#  Course: Soft Computing (SFC) - FIT BUT
+#  Project name: Shortest path search simulation using ACO
+#  Author: Beranek Tomas (xberan46)
+#  Date: 26.11.2022
+#  Up2date sources: https://github.com/TomasBeranek/but-sfc-project
+# ***************************************************************************
+
+
+import time
+import numpy as np
+from PIL import ImageTk
+
+
+# number of distinct edge colours -- an edge is repainted only when its
+# pheromone level moves it to a different bucket
+COLOR_BUCKETS = 64
+
+# ants are rotated in steps of SPRITE_ANGLE_STEP degrees, the step is made
+# coarser if the pre-rotated sprites wouldn't fit into SPRITE_MEMORY_LIMIT bytes
+SPRITE_ANGLE_STEP = 5
+SPRITE_MEMORY_LIMIT = 8 * 1024 * 1024
+
+# weight of the last frame in the averaged frame time
+FRAME_TIME_SMOOTHING = 0.05
+
+
+class EdgeRenderer:
+    def __init__(self, canvas, line_object_ids, min_pheromone_level):
+        self.canvas = canvas
+        self.line_object_ids = np.asarray(line_object_ids)
+        self.min_pheromone_level = min_pheromone_level
+
+        # bucket each line was painted with, -1 means the initial colour
+        self.line_buckets = np.full(len(self.line_object_ids), -1, dtype=np.int64)
+        self.bucket_colors = ['#%0.2X2c2c' % (bucket * 255 // (COLOR_BUCKETS - 1)) for bucket in range(COLOR_BUCKETS)]
+
+        # number of lines repainted in the last frame
+        self.repainted_cnt = 0
+
+    # line of a new edge, or a new line of an edge
+    def set_line(self, edge, line_object_id):
+        if edge == len(self.line_object_ids):
+            self.line_object_ids = np.append(self.line_object_ids, line_object_id)
+            self.line_buckets = np.append(self.line_buckets, -1)
+        else:
+            self.line_object_ids[edge] = line_object_id
+            self.line_buckets[edge] = -1
+
+    # the line of a removed edge is deleted, its pheromone stays at the minimal
+    # level (the lowest bucket), so it is never repainted
+    def remove_line(self, edge):
+        self.line_buckets[edge] = 0
+
+    # the highest pheromone level can be given if it is already known
+    def render(self, pheromone, highest_pheromone_level=None):
+        if highest_pheromone_level is None:
+            highest_pheromone_level = pheromone.max()
+        self.repainted_cnt = 0
+
+        # all the edges are pheromone free
+        if highest_pheromone_level == self.min_pheromone_level:
+            return
+
+        # in range <0,1> and then quantized into buckets
+        pheromone_range = highest_pheromone_level - self.min_pheromone_level
+        buckets = ((pheromone - self.min_pheromone_level) / pheromone_range * (COLOR_BUCKETS - 1)).astype(np.int64)
+
+        changed = np.flatnonzero(buckets != self.line_buckets)
+        if not len(changed):
+            return
+
+        self.line_buckets[changed] = buckets[changed]
+        self.repainted_cnt = len(changed)
+
+        # when the range shifts most of the lines change at once, so all the
+        # commands are sent to Tk in a single script instead of one call per line
+        canvas_path = str(self.canvas)
+        commands = [f'{canvas_path} itemconfigure {line_id} -fill {self.bucket_colors[bucket]}' for line_id, bucket in zip(self.line_object_ids[changed].tolist(), buckets[changed].tolist())]
+        self.canvas.tk.eval('\n'.join(commands))
+
+
+class FrameTimer:
+    # measures how long it takes to simulate and draw one frame
+    def __init__(self):
+        self.frame_start = None
+        self.average_frame_time = 0.0
+
+    def start(self):
+        self.frame_start = time.perf_counter()
+
+    def stop(self):
+        frame_time = time.perf_counter() - self.frame_start
+
+        if self.average_frame_time:
+            self.average_frame_time += FRAME_TIME_SMOOTHING * (frame_time - self.average_frame_time)
+        else:
+            self.average_frame_time = frame_time
+
+        return frame_time
+
+
+class SpriteAtlas:
+    # ant images pre-rotated at startup and shared by all the ants, so that
+    # turning an ant is just a lookup
+    def __init__(self, ant_img, ant_food_img, angle_step=SPRITE_ANGLE_STEP, memory_limit=SPRITE_MEMORY_LIMIT):
+        # RGBA pixels of one rotation of both images
+        rotation_size = 4 * (ant_img.width * ant_img.height + ant_food_img.width * ant_food_img.height)
+
+        while (360 // angle_step) * rotation_size > memory_limit and angle_step < 360:
+            angle_step *= 2
+
+        self.angle_step = angle_step
+        self.rotation_cnt = 360 // angle_step
+        self.memory_size = self.rotation_cnt * rotation_size
+
+        self.sprites = [ImageTk.PhotoImage(ant_img.rotate(i * angle_step)) for i in range(self.rotation_cnt)]
+        self.food_sprites = [ImageTk.PhotoImage(ant_food_img.rotate(i * angle_step)) for i in range(self.rotation_cnt)]
+
+    def get(self, angle, has_food):
+        rotation = int(round(angle / self.angle_step)) % self.rotation_cnt
+
+        if has_food:
+            return self.food_sprites[rotation]
+        return self.sprites[rotation]
@@ -0,0 +1,137 @@
+# ******************************* rng.py ************************************
+#  Course: Soft Computing (SFC) - FIT BUT
+#  Project name: Shortest path search simulation using ACO
+#  Author: Beranek Tomas (xberan46)
+#  Date: 26.11.2022
+#  Up2date sources: https://github.com/TomasBeranek/but-sfc-project
+# ***************************************************************************
+
+
+import numpy as np
+
+
+# random numbers are drawn from each stream in blocks of this size
+RANDOM_BLOCK_SIZE = 32
+
+# columns of the saved states of the generators -- whether the generator was
+# created, 128bit PCG64 state and increment split into 64bit halves and the
+# buffered 32bit number
+STATE_CREATED, STATE_HIGH, STATE_LOW, INC_HIGH, INC_LOW, HAS_UINT32, UINTEGER = range(7)
+STATE_COLUMNS = 7
+
+
+def get_pcg64_state(row):
+    row = [int(value) for value in row]
+    return {
+        'bit_generator': 'PCG64',
+        'state': {'state': row[STATE_HIGH] << 64 | row[STATE_LOW], 'inc': row[INC_HIGH] << 64 | row[INC_LOW]},
+        'has_uint32': row[HAS_UINT32],
+        'uinteger': row[UINTEGER]
+    }
+
+
+def get_pcg64_state_row(state):
+    mask = (1 << 64) - 1
+    pcg_state = state['state']
+    return [1, pcg_state['state'] >> 64, pcg_state['state'] & mask, pcg_state['inc'] >> 64, pcg_state['inc'] & mask, state['has_uint32'], state['uinteger']]
+
+
+# SeedSequence from RandomStreams.get_seed
+def get_seed_sequence(seed):
+    return np.random.SeedSequence(seed['entropy'], spawn_key=tuple(seed['spawn_key']), pool_size=seed['pool_size'])
+
+
+class RandomStreams:
+    # independent streams of random numbers in <0, 1) -- one per ant, so the
+    # numbers an ant gets don't depend on what the other ants do (or in
+    # which order they are processed), the streams are spawned from a single
+    # seed (or a SeedSequence, e.g. one spawned for a colony)
+    def __init__(self, seed, stream_cnt, block_size=RANDOM_BLOCK_SIZE):
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+
+        self.block_size = block_size
+
+        # generators are created when the streams are used for the first time
+        self.generators = [None] * stream_cnt
+
+        # states of the generators restored by set_arrays, they are set when
+        # the generators are created
+        self.restored_states = None
+
+        # the last drawn block of each stream and the position of the next
+        # number in it, a block at the position block_size is used up
+        self.blocks = np.empty((stream_cnt, block_size))
+        self.positions = np.full(stream_cnt, block_size, dtype=np.int64)
+
+    @property
+    def stream_cnt(self):
+        return len(self.generators)
+
+    # the same generator as seed_sequence.spawn(stream_cnt)[stream] would give
+    def get_generator(self, stream):
+        if self.generators[stream] is None:
+            seed_sequence = np.random.SeedSequence(self.seed_sequence.entropy, spawn_key=self.seed_sequence.spawn_key + (stream,), pool_size=self.seed_sequence.pool_size)
+            self.generators[stream] = np.random.Generator(np.random.PCG64(seed_sequence))
+
+            if self.restored_states is not None and self.restored_states[stream, STATE_CREATED]:
+                self.generators[stream].bit_generator.state = get_pcg64_state(self.restored_states[stream])
+
+        return self.generators[stream]
+
+    def draw_block(self, stream):
+        self.get_generator(stream).random(out=self.blocks[stream])
+        self.positions[stream] = 0
+
+    # the next number of the given stream
+    def random(self, stream):
+        if self.positions[stream] == self.block_size:
+            self.draw_block(stream)
+
+        position = self.positions[stream]
+        self.positions[stream] = position + 1
+
+        return float(self.blocks[stream, position])
+
+    # seed of the streams in a JSON serializable form
+    def get_seed(self):
+        return {
+            'entropy': self.seed_sequence.entropy,
+            'spawn_key': list(self.seed_sequence.spawn_key),
+            'pool_size': self.seed_sequence.pool_size
+        }
+
+    # state of all the streams in arrays, the streams which haven't drawn any
+    # number yet have no generator state
+    def get_arrays(self):
+        states = np.zeros((self.stream_cnt, STATE_COLUMNS), dtype=np.uint64)
+
+        for stream, generator in enumerate(self.generators):
+            if generator is not None:
+                states[stream] = get_pcg64_state_row(generator.bit_generator.state)
+            elif self.restored_states is not None:
+                states[stream] = self.restored_states[stream]
+
+        return {'rng_states': states, 'rng_blocks': self.blocks, 'rng_positions': self.positions}
+
+    # restores the state from get_arrays of streams with the same seed, the
+    # generators are still created lazily
+    def set_arrays(self, arrays):
+        self.generators = [None] * len(arrays['rng_states'])
+        self.restored_states = arrays['rng_states']
+        self.blocks = arrays['rng_blocks']
+        self.positions = arrays['rng_positions']
+
+    # the next numbers of the given (distinct) streams at once
+    def random_many(self, streams):
+        streams = np.asarray(streams, dtype=np.int64)
+
+        for stream in streams[self.positions[streams] == self.block_size].tolist():
+            self.draw_block(stream)
+
+        positions = self.positions[streams]
+        self.positions[streams] = positions + 1
+
+        return self.blocks[streams, positions]
@@ -0,0 +1,503 @@
+#!/usr/bin/env python3.8
+
+# ******************************* service.py ********************************
+#  Course: Soft Computing (SFC) - FIT BUT
+#  Project name: Shortest path search simulation using ACO
+#  Author: Beranek Tomas (xberan46)
+#  Date: 26.11.2022
+#  Up2date sources: https://github.com/TomasBeranek/but-sfc-project
+# ***************************************************************************
+
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import hashlib
+import json
+import math
+import multiprocessing as mp
+import os
+import signal
+import sys
+import time
+import numpy as np
+
+from convergence import run_until_converged
+from graph import get_file_signature, load_graph
+from options import INCREMENT_TYPES, STRATEGIES
+from solver import ACOSolver
+from validation import raise_graph_error
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# requests for the same graph which come within BATCH_WINDOW seconds are
+# solved together by one worker (at most MAX_BATCH of them)
+DEFAULT_BATCH_WINDOW = 0.005
+DEFAULT_MAX_BATCH = 16
+
+# number of restructured graphs kept by each worker process
+DEFAULT_GRAPH_CACHE_SIZE = 4
+
+# latencies of this many last requests give the reported percentiles
+LATENCY_WINDOW = 10000
+
+# parameters of a solve request, the same as the GUI controls, and their
+# default values
+SOLVE_PARAMETERS = {
+    'alpha': 1.0,
+    'beta': 1.0,
+    'evaporation': 0.98,
+    'increment_type': 'constant',
+    'strategy': 'as',
+    'ants': 50,
+    'iterations': 1000,
+    'time_limit': None,
+    'patience': None,
+    'min_pheromone_change': None,
+    'max_branching': None,
+    'trace': False,
+    'seed': None,
+    'start_node_id': None,
+    'end_node_id': None
+}
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}
+
+# graphs cached by a worker process -- file hash to graph, the least
+# recently used one is dropped first
+WORKER_GRAPHS = collections.OrderedDict()
+WORKER_GRAPH_CACHE_SIZE = DEFAULT_GRAPH_CACHE_SIZE
+
+
+def init_parser():
+    parser = argparse.ArgumentParser(description='Local service solving shortest path requests -- graphs stay loaded in worker processes, so a request pays neither the imports nor the graph loading.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve = subparsers.add_parser('serve', help='run the service')
+    add_address_arguments(serve)
+    serve.add_argument('--workers', type=int, default=os.cpu_count(), help='number of worker processes (default: number of CPUs)')
+    serve.add_argument('--graph-cache', type=int, default=DEFAULT_GRAPH_CACHE_SIZE, help=f'number of graphs kept by each worker (default: {DEFAULT_GRAPH_CACHE_SIZE})')
+    serve.add_argument('--batch-window', type=float, default=DEFAULT_BATCH_WINDOW, metavar='SECONDS', help=f'requests for the same graph within the window are solved together (default: {DEFAULT_BATCH_WINDOW})')
+    serve.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH, help=f'maximal number of requests solved together (default: {DEFAULT_MAX_BATCH})')
+
+    client = subparsers.add_parser('client', help='send solve requests to the service and report their latency')
+    add_address_arguments(client)
+    client.add_argument('-g', '--graph-file', required=True, type=str, help='JSON file with a graph definition')
+    client.add_argument('-n', '--requests', type=int, default=100, help='number of requests (default: 100)')
+    client.add_argument('-c', '--concurrency', type=int, default=4, help='number of requests sent at once (default: 4)')
+    client.add_argument('-a', '--ants', type=int, default=SOLVE_PARAMETERS['ants'], help=f'number of ants (default: {SOLVE_PARAMETERS["ants"]})')
+    client.add_argument('-i', '--iterations', type=int, default=100, help='number of iterations (default: 100)')
+    client.add_argument('--time-limit', type=float, default=None, metavar='SECONDS', help='time budget of each request (default: none)')
+    client.add_argument('--patience', type=int, default=None, help='a request is finished when its best found path hasn\'t improved for PATIENCE iterations (default: run all the iterations)')
+    client.add_argument('--alpha', type=float, default=SOLVE_PARAMETERS['alpha'], help='influence of pheromones (default: 1)')
+    client.add_argument('--beta', type=float, default=SOLVE_PARAMETERS['beta'], help='influence of edge length (default: 1)')
+    client.add_argument('--evaporation', type=float, default=SOLVE_PARAMETERS['evaporation'], help='portion of pheromone kept after each iteration (default: 0.98)')
+    client.add_argument('--increment-type', choices=INCREMENT_TYPES.keys(), default=SOLVE_PARAMETERS['increment_type'], help='pheromone increment type (default: constant)')
+
+    return parser
+
+
+def add_address_arguments(parser):
+    parser.add_argument('--host', type=str, default=DEFAULT_HOST, help=f'host of the HTTP service (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'port of the HTTP service (default: {DEFAULT_PORT})')
+    parser.add_argument('--socket', type=str, default=None, metavar='PATH', help='use the Unix socket instead of the host and port')
+
+
+def get_percentiles(latencies):
+    if not latencies:
+        return {'p50_latency': None, 'p99_latency': None}
+
+    p50, p99 = np.percentile(latencies, [50, 99]).tolist()
+    return {'p50_latency': p50, 'p99_latency': p99}
+
+
+# JSON true and false are parsed as bool, which is a subclass of int
+def is_integer(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# values of the parameters of a solve request, missing ones get the
+# defaults, raises ValueError for invalid ones
+def parse_solve_request(request):
+    if not isinstance(request, dict) or not isinstance(request.get('graph'), str):
+        raise ValueError('request must be a JSON object with the graph file path in "graph"')
+
+    unknown = set(request) - set(SOLVE_PARAMETERS) - {'graph'}
+    if unknown:
+        raise ValueError(f'unknown parameters: {", ".join(sorted(unknown))}')
+
+    params = dict(SOLVE_PARAMETERS)
+    params.update({name: value for name, value in request.items() if name != 'graph'})
+
+    for name in ['alpha', 'beta', 'evaporation']:
+        if not is_number(params[name]):
+            raise ValueError(f'{name} must be a number')
+
+    for name in ['ants', 'iterations']:
+        if not is_integer(params[name]) or params[name] < 1:
+            raise ValueError(f'{name} must be a positive integer')
+
+    if params['increment_type'] not in INCREMENT_TYPES:
+        raise ValueError(f'increment_type must be one of {", ".join(INCREMENT_TYPES)}')
+
+    if params['strategy'] not in STRATEGIES:
+        raise ValueError(f'strategy must be one of {", ".join(STRATEGIES)}')
+
+    if params['time_limit'] is not None and not is_number(params['time_limit']):
+        raise ValueError('time_limit must be a number of seconds')
+
+    if params['patience'] is not None and (not is_integer(params['patience']) or params['patience'] < 1):
+        raise ValueError('patience must be a positive integer')
+
+    for name in ['min_pheromone_change', 'max_branching']:
+        if params[name] is not None and not is_number(params[name]):
+            raise ValueError(f'{name} must be a number')
+
+    if not isinstance(params['trace'], bool):
+        raise ValueError('trace must be a boolean')
+
+    for name in ['seed', 'start_node_id', 'end_node_id']:
+        if params[name] is not None and (not is_integer(params[name]) or params[name] < 0):
+            raise ValueError(f'{name} must be a non-negative integer')
+
+    return request['graph'], params
+
+
+# initializer of a worker process
+def init_worker(graph_cache_size):
+    global WORKER_GRAPH_CACHE_SIZE
+    WORKER_GRAPH_CACHE_SIZE = graph_cache_size
+
+
+# does nothing, makes the pool start a worker process
+def warm_up():
+    return os.getpid()
+
+
+# returns the graph and whether it was cached already
+def get_worker_graph(graph_file, graph_hash):
+    if graph_hash in WORKER_GRAPHS:
+        WORKER_GRAPHS.move_to_end(graph_hash)
+        return WORKER_GRAPHS[graph_hash], True
+
+    graph = load_graph(graph_file, on_error=raise_graph_error)
+    WORKER_GRAPHS[graph_hash] = graph
+    if len(WORKER_GRAPHS) > WORKER_GRAPH_CACHE_SIZE:
+        WORKER_GRAPHS.popitem(last=False)
+
+    return graph, False
+
+
+# the colony runs for the iterations, until the time limit or until it
+# converges, whichever comes first
+def solve_request(graph, params):
+    start_node = graph.start_node if params['start_node_id'] is None else graph.find_node_index(params['start_node_id'])
+    end_node = graph.end_node if params['end_node_id'] is None else graph.find_node_index(params['end_node_id'])
+    if start_node < 0 or end_node < 0:
+        return {'error': 'start_node_id and end_node_id must be IDs of nodes of the graph'}
+    if start_node == end_node:
+        return {'error': 'start_node_id and end_node_id must be different nodes'}
+
+    start_time = time.perf_counter()
+    solver_params = {name: params[name] for name in ['alpha', 'beta', 'evaporation', 'increment_type', 'strategy']}
+    solver = ACOSolver(graph.with_endpoints(start_node, end_node), params['ants'], seed=params['seed'], mode='batched', **solver_params)
+
+    stop_reason, trace = run_until_converged(solver, params['iterations'], params['time_limit'], params['patience'], params['min_pheromone_change'], params['max_branching'])
+
+    found = bool(solver.best_found_path)
+    result = {
+        'path': solver.best_found_path if found else None,
+        'path_len': solver.best_found_path_len if found else None,
+        'iterations': solver.iteration_cnt,
+        'stop_reason': stop_reason,
+        'solve_time': time.perf_counter() - start_time
+    }
+
+    if params['trace']:
+        result['trace'] = trace
+
+    return result
+
+
+# runs in a worker process, all the requests of the batch are on the same
+# graph, an invalid graph fails only the requests of the batch
+def solve_batch(graph_file, graph_hash, batch):
+    try:
+        graph, cached = get_worker_graph(graph_file, graph_hash)
+    except ValueError as error:
+        return [{'error': f'{graph_file}: {error}'} for _ in batch]
+
+    results = []
+    for params in batch:
+        # an error of a request fails only the request
+        try:
+            result = solve_request(graph, params)
+        except Exception as error:
+            result = {'error': str(error)}
+        results.append(dict(result, graph_cached=cached, batch_size=len(batch)))
+
+    return results
+
+
+class SolverService:
+    # requests are grouped by the hash of the graph file, a group is sent to
+    # the process pool when its window ends or when it is full -- split among
+    # the workers, so they don't wait while one of them solves the whole group
+    def __init__(self, executor, workers, batch_window=DEFAULT_BATCH_WINDOW, max_batch=DEFAULT_MAX_BATCH):
+        self.executor = executor
+        self.workers = workers
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+
+        # graph hash to the file path, the waiting requests (with their
+        # futures) and the handle of the timer ending the window
+        self.batches = {}
+
+        # file path to its signature and hash, the file is hashed again only
+        # when it changes
+        self.file_hashes = {}
+
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.request_cnt = 0
+        self.batch_cnt = 0
+
+    def get_graph_hash(self, graph_file):
+        graph_file = os.path.abspath(graph_file)
+        signature = get_file_signature(graph_file).tolist()
+
+        if graph_file not in self.file_hashes or self.file_hashes[graph_file][0] != signature:
+            file_hash = hashlib.sha1()
+            with open(graph_file, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    file_hash.update(chunk)
+            self.file_hashes[graph_file] = signature, file_hash.hexdigest()
+
+        return graph_file, self.file_hashes[graph_file][1]
+
+    async def solve(self, graph_file, params):
+        graph_file, graph_hash = self.get_graph_hash(graph_file)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        if graph_hash not in self.batches:
+            timer = loop.call_later(self.batch_window, self.dispatch, graph_hash)
+            self.batches[graph_hash] = (graph_file, [], timer)
+
+        requests = self.batches[graph_hash][1]
+        requests.append((params, future))
+        if len(requests) >= self.max_batch:
+            self.dispatch(graph_hash)
+
+        return await future
+
+    def dispatch(self, graph_hash):
+        graph_file, requests, timer = self.batches.pop(graph_hash)
+        timer.cancel()
+        self.batch_cnt += 1
+
+        # every worker loads the graph only once, then it is in its cache
+        chunk_size = math.ceil(len(requests) / self.workers)
+        for i in range(0, len(requests), chunk_size):
+            asyncio.ensure_future(self.run_batch(graph_file, graph_hash, requests[i:i + chunk_size]))
+
+    async def run_batch(self, graph_file, graph_hash, requests):
+        loop = asyncio.get_running_loop()
+
+        try:
+            results = await loop.run_in_executor(self.executor, solve_batch, graph_file, graph_hash, [params for params, _ in requests])
+        except Exception as error:
+            for _, future in requests:
+                future.set_exception(error)
+            return
+
+        for (_, future), result in zip(requests, results):
+            future.set_result(result)
+
+    def get_stats(self):
+        return {'requests': self.request_cnt, 'batches': self.batch_cnt, **get_percentiles(list(self.latencies))}
+
+    async def route(self, method, path, body):
+        if method == 'GET' and path == '/stats':
+            return 200, self.get_stats()
+
+        if method == 'POST' and path == '/solve':
+            try:
+                graph_file, params = parse_solve_request(json.loads(body or b'null'))
+            except ValueError as error:
+                return 400, {'error': str(error)}
+
+            try:
+                result = await self.solve(graph_file, params)
+            except OSError as error:
+                return 400, {'error': str(error)}
+
+            return (400 if 'error' in result else 200), result
+
+        return 404, {'error': f'unknown request {method} {path}'}
+
+    # one request per connection
+    async def handle_connection(self, reader, writer):
+        start_time = time.perf_counter()
+
+        try:
+            method, path, body = await read_http_message(reader)
+            status, response = await self.route(method, path, body)
+        except (ValueError, asyncio.IncompleteReadError) as error:
+            method = path = None
+            status, response = 400, {'error': str(error)}
+        except Exception as error:
+            method = path = None
+            status, response = 500, {'error': repr(error)}
+
+        await write_http_response(writer, status, response)
+
+        if path == '/solve' and status == 200:
+            self.request_cnt += 1
+            self.latencies.append(time.perf_counter() - start_time)
+
+
+# returns the method, the path and the body of an HTTP request
+async def read_http_message(reader):
+    request_line = (await reader.readline()).decode('latin-1').split()
+    if len(request_line) != 3:
+        raise ValueError('invalid HTTP request line')
+
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return request_line[0], request_line[1], body
+
+
+async def write_http_response(writer, status, response):
+    body = json.dumps(response).encode()
+    writer.write(f'HTTP/1.1 {status} {HTTP_REASONS[status]}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body)
+
+    try:
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(args):
+    executor = concurrent.futures.ProcessPoolExecutor(args.workers, mp_context=mp.get_context('spawn'), initializer=init_worker, initargs=(args.graph_cache,))
+    service = SolverService(executor, args.workers, args.batch_window, args.max_batch)
+
+    # the workers are started (and import everything) before the first request
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*[loop.run_in_executor(executor, warm_up) for _ in range(args.workers)])
+
+    if args.socket:
+        server = await asyncio.start_unix_server(service.handle_connection, path=args.socket)
+        address = args.socket
+    else:
+        server = await asyncio.start_server(service.handle_connection, args.host, args.port)
+        address = f'http://{args.host}:{args.port}'
+
+    print(f'Serving on {address} with {args.workers} workers', file=sys.stderr)
+
+    # terminated service cleans up as if it was interrupted
+    loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        executor.shutdown()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+# sends an HTTP request to the service, returns the status and the JSON response
+async def send_request(args, method, path, request=None):
+    if args.socket:
+        reader, writer = await asyncio.open_unix_connection(args.socket)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+
+    body = b'' if request is None else json.dumps(request).encode()
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: {args.host}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'.encode() + body)
+    await writer.drain()
+
+    status_line = (await reader.readline()).decode('latin-1').split()
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    response = json.loads(await reader.readexactly(int(headers['content-length'])))
+    writer.close()
+
+    return int(status_line[1]), response
+
+
+# sends the requests (with seeds 0..N-1), at most concurrency of them at once
+async def run_client(args):
+    request = {
+        'graph': os.path.abspath(args.graph_file),
+        'alpha': args.alpha,
+        'beta': args.beta,
+        'evaporation': args.evaporation,
+        'increment_type': args.increment_type,
+        'ants': args.ants,
+        'iterations': args.iterations,
+        'time_limit': args.time_limit,
+        'patience': args.patience
+    }
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    failures = []
+
+    async def send(seed):
+        async with semaphore:
+            start_time = time.perf_counter()
+            status, response = await send_request(args, 'POST', '/solve', dict(request, seed=seed))
+
+            if status == 200:
+                latencies.append(time.perf_counter() - start_time)
+            else:
+                failures.append(response.get('error'))
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*[send(seed) for seed in range(args.requests)])
+    elapsed_time = time.perf_counter() - start_time
+
+    _, stats = await send_request(args, 'GET', '/stats')
+
+    client_percentiles = get_percentiles(latencies)
+    print(f'{len(latencies)} requests in {elapsed_time:.2f} s ({len(latencies) / elapsed_time:.1f} requests/s), {len(failures)} failed')
+    if failures:
+        print(f'First failure: {failures[0]}')
+    if latencies:
+        print(f'Client latency: p50 {client_percentiles["p50_latency"] * 1000:.1f} ms, p99 {client_percentiles["p99_latency"] * 1000:.1f} ms')
+    if stats['p50_latency'] is not None:
+        print(f'Service latency: p50 {stats["p50_latency"] * 1000:.1f} ms, p99 {stats["p99_latency"] * 1000:.1f} ms ({stats["requests"]} requests in {stats["batches"]} batches since the start)')
+
+
+if __name__ == '__main__':
+    parser = init_parser()
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        try:
+            asyncio.run(serve(args))
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+    else:
+        asyncio.run(run_client(args))
@@ -0,0 +1,177 @@
+# ******************************* simulation.py *****************************
+#  Course: Soft Computing (SFC) - FIT BUT
+#  Project name: Shortest path search simulation using ACO
+#  Author: Beranek Tomas (xberan46)
+#  Date: 26.11.2022
+#  Up2date sources: https://github.com/TomasBeranek/but-sfc-project
+# ***************************************************************************
+
+
+import heapq
+import math
+import time
+import numpy as np
+
+
+# one ant leaves the start every RELEASE_INTERVAL simulated seconds
+RELEASE_INTERVAL = 0.025
+
+# pheromone evaporates every EVAPORATION_INTERVAL simulated seconds
+EVAPORATION_INTERVAL = 1
+
+# how often the deadline is checked while processing events
+DEADLINE_CHECK_EVENTS = 64
+
+# scalar state of the simulation saved with the state of the solver
+SIMULATION_STATE = ['time', 'evaporation_cnt', 'released_cnt', 'arrival_cnt', 'ant_speed', 'speed_change_time', 'speed_change_distance']
+
+# ants need at least some distance to walk over an edge (even over an edge
+# between two nodes at the same position), so that simulated time goes on
+MIN_EDGE_DISTANCE = 1e-6
+
+
+class AntSimulation:
+    # discrete-event simulation of ants walking over the graph in simulated
+    # time -- only arrivals of ants to nodes are processed (in order given by
+    # a priority queue), positions are interpolated only when they are drawn
+    #
+    # all ants walk at the same speed, so arrivals are scheduled by the
+    # walked distance, which makes them independent of speed changes
+    def __init__(self, solver, ant_speed=400):
+        self.solver = solver
+        self.graph = solver.graph
+        self.ants = solver.ants
+        ant_cnt = len(self.ants)
+
+        self.time = 0.0
+        self.evaporation_cnt = 0
+        self.released_cnt = 0
+        self.arrival_cnt = 0
+
+        # distance walked by any moving ant is (time - speed_change_time) *
+        # ant_speed + speed_change_distance
+        self.ant_speed = ant_speed
+        self.speed_change_time = 0.0
+        self.speed_change_distance = 0.0
+
+        # walked distances when ants left their last nodes and when they will
+        # arrive to their next nodes
+        self.departure_distances = np.zeros(ant_cnt)
+        self.arrival_distances = np.zeros(ant_cnt)
+
+        # priority queue of (arrival distance, ant index)
+        self.arrivals = []
+
+    # pixels per simulated second
+    def set_ant_speed(self, ant_speed):
+        if ant_speed != self.ant_speed:
+            self.speed_change_distance = self.get_distance(self.time)
+            self.speed_change_time = self.time
+            self.ant_speed = ant_speed
+
+    def get_distance(self, time):
+        return self.speed_change_distance + (time - self.speed_change_time) * self.ant_speed
+
+    def get_next_arrival_time(self):
+        if not self.arrivals or self.ant_speed == 0:
+            return math.inf
+        return self.speed_change_time + (self.arrivals[0][0] - self.speed_change_distance) / self.ant_speed
+
+    def get_next_release_time(self):
+        if self.released_cnt == len(self.ants):
+            return math.inf
+        return self.released_cnt * RELEASE_INTERVAL
+
+    # ant arrived to its next node, the solver sends it further
+    def process_arrival(self, i, distance):
+        self.solver.move_ant(i)
+        self.arrival_cnt += 1
+
+        arrival_distance = distance + max(float(self.graph.edge_length[self.ants.last_edge[i]]), MIN_EDGE_DISTANCE)
+        self.departure_distances[i] = distance
+        self.arrival_distances[i] = arrival_distance
+        heapq.heappush(self.arrivals, (arrival_distance, i))
+
+    # simulates given number of seconds, if the deadline (time.perf_counter)
+    # is reached the rest of the simulated time is dropped
+    def advance(self, duration, deadline=None):
+        end_time = self.time + duration
+        event_cnt = 0
+
+        while True:
+            arrival_time = self.get_next_arrival_time()
+            release_time = self.get_next_release_time()
+            evaporation_time = (self.evaporation_cnt + 1) * EVAPORATION_INTERVAL
+
+            # events at the same time -- arrivals, releases, evaporation
+            if arrival_time <= end_time and arrival_time <= release_time and arrival_time <= evaporation_time:
+                distance, i = heapq.heappop(self.arrivals)
+                self.process_arrival(i, distance)
+                event_time = arrival_time
+            elif release_time <= end_time and release_time <= evaporation_time:
+                # ant leaves the start as if it arrived there
+                self.process_arrival(self.released_cnt, self.get_distance(release_time))
+                self.released_cnt += 1
+                event_time = release_time
+            elif evaporation_time <= end_time:
+                self.solver.evaporate_pheromone_trails()
+                self.evaporation_cnt += 1
+                event_time = evaporation_time
+            else:
+                break
+
+            event_cnt += 1
+            if deadline is not None and event_cnt % DEADLINE_CHECK_EVENTS == 0 and time.perf_counter() > deadline:
+                end_time = max(self.time, event_time)
+                break
+
+        self.time = end_time
+
+        # the pheromone is up to date between the calls
+        self.solver.apply_deposits()
+
+    def run(self, duration):
+        self.advance(duration)
+
+        return self.solver.best_found_path, self.solver.best_found_path_len
+
+    # the state of the simulation as JSON serializable metadata and arrays,
+    # the queue of arrivals is saved as it is, so the ants with the same
+    # arrival distance arrive in the same order after it is restored
+    def get_state(self):
+        metadata = {name: getattr(self, name) for name in SIMULATION_STATE}
+        arrays = {
+            'departure_distances': self.departure_distances,
+            'arrival_distances': self.arrival_distances,
+            'arrival_queue_distances': np.array([distance for distance, _ in self.arrivals], dtype=np.float64),
+            'arrival_queue_ants': np.array([i for _, i in self.arrivals], dtype=np.int64)
+        }
+
+        return metadata, arrays
+
+    def set_state(self, metadata, arrays):
+        for name in SIMULATION_STATE:
+            setattr(self, name, metadata[name])
+
+        self.departure_distances = arrays['departure_distances']
+        self.arrival_distances = arrays['arrival_distances']
+        self.arrivals = list(zip(arrays['arrival_queue_distances'].tolist(), arrays['arrival_queue_ants'].tolist()))
+
+    # positions of all ants at the current time
+    def get_positions(self):
+        graph = self.graph
+        released = np.arange(len(self.ants)) < self.released_cnt
+
+        from_nodes = self.ants.last_node
+        to_nodes = self.ants.next_node
+
+        # ants waiting in the start haven't walked anything yet
+        walked = self.get_distance(self.time) - self.departure_distances
+        progress = np.zeros(len(self.ants))
+        np.divide(walked, self.arrival_distances - self.departure_distances, out=progress, where=released)
+        np.clip(progress, 0.0, 1.0, out=progress)
+
+        x = graph.node_x[from_nodes] + (graph.node_x[to_nodes] - graph.node_x[from_nodes]) * progress
+        y = graph.node_y[from_nodes] + (graph.node_y[to_nodes] - graph.node_y[from_nodes]) * progress
+
+        return x, y
@@ -0,0 +1,837 @@
+# ******************************* solver.py *********************************
+#  Course: Soft Computing (SFC) - FIT BUT
+#  Project name: Shortest path search simulation using ACO
+#  Author: Beranek Tomas (xberan46)
+#  Date: 26.11.2022
+#  Up2date sources: https://github.com/TomasBeranek/but-sfc-project
+# ***************************************************************************
+
+
+import sys
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+import numpy as np
+
+from ants import AntTable
+from rng import RandomStreams, get_seed_sequence
+from strategies import STRATEGY_CLASSES
+
+
+# ACO settings
+MIN_PHEROMONE_LEVEL = 0.001
+
+# parameters of the solver saved with its state
+SOLVER_PARAMETERS = ['alpha', 'beta', 'evaporation', 'increment_type', 'strategy', 'max_pheromone', 'candidate_cnt', 'local_search']
+
+
+# roulette selection over cumulative weights of the neighbours -- returns
+# the index of the first neighbour whose cumulative weight reaches the
+# threshold (scaled to the total weight), the excluded neighbour is skipped
+def select_neighbour(cumulative_weights, threshold, excluded=None, excluded_weight=0.0):
+    last = len(cumulative_weights) - 1
+
+    if excluded is None:
+        neighbour = bisect_left(cumulative_weights, threshold * cumulative_weights[-1])
+        # rounding errors can keep the target slightly above the total weight
+        return min(neighbour, last)
+
+    target = threshold * (cumulative_weights[-1] - excluded_weight)
+
+    if excluded > 0 and target <= cumulative_weights[excluded - 1]:
+        return bisect_left(cumulative_weights, target, 0, excluded)
+
+    # the cumulative weights after the excluded neighbour include its weight
+    neighbour = bisect_left(cumulative_weights, target + excluded_weight, excluded + 1)
+    if neighbour <= last:
+        return neighbour
+
+    return last if excluded != last else last - 1
+
+
+# vectorized bisect_left -- for each key the first index in <lo, hi) whose
+# value is not lower than the key, or hi
+def bisect_left_many(values, keys, lo, hi):
+    lo = lo.copy()
+    hi = hi.copy()
+
+    while True:
+        active = lo < hi
+        if not active.any():
+            return lo
+
+        middle = (lo + hi) // 2
+        go_right = active & (values[np.minimum(middle, len(values) - 1)] < keys)
+        lo = np.where(go_right, middle + 1, lo)
+        hi = np.where(active & ~go_right, middle, hi)
+
+
+class ACOSolver:
+    # the solver does not know anything about GUI, all the parameters are
+    # plain numbers, so it can run on a server without a display
+    def __init__(self, graph, ants, alpha=1, beta=1, evaporation=0.98, increment_type='constant', strategy='as', mode='reference', seed=None, max_pheromone=None, candidate_cnt=None, local_search=False):
+        self.graph = graph
+        self.alpha = alpha
+        self.beta = beta
+        # portion of pheromone which is kept after one evaporation
+        self.evaporation = evaporation
+        self.increment_type = increment_type
+        # 'reference' moves ants one by one, 'batched' selects next nodes of
+        # all ants at once, both give the same result for the same seed
+        self.mode = mode
+
+        self.iteration_cnt = 0
+        self.best_found_path_len = sys.maxsize
+        # IDs of nodes (as in the input file) and indices of edges
+        self.best_found_path = []
+        self.best_found_path_edges = []
+
+        # called with (path, edges) whenever a new best path is found
+        self.on_new_best_path = None
+
+        # pheromone level of each edge, kept in <lower_bound, upper_bound> --
+        # <MIN_PHEROMONE_LEVEL, max_pheromone> unless the strategy changes them
+        self.pheromone = np.full(graph.edge_cnt, MIN_PHEROMONE_LEVEL, dtype=np.float64)
+        self.max_pheromone = np.inf if max_pheromone is None else max_pheromone
+        self.lower_bound = MIN_PHEROMONE_LEVEL
+        self.upper_bound = self.max_pheromone
+
+        # the highest pheromone level of all edges -- kept up to date by the
+        # deposits and the evaporation, so it never has to be searched for
+        self.max_pheromone_level = MIN_PHEROMONE_LEVEL
+
+        # deposits waiting to be added to the pheromone all at once
+        self.deposit_edges = []
+        self.deposit_increments = []
+
+        self.ants = AntTable(graph, ants)
+
+        # every ant draws random numbers from its own stream
+        self.random_streams = RandomStreams(seed, ants)
+
+        # transition weights Qij of all the entries of the CSR adjacency and
+        # their cumulative sums over the neighbours of each node -- a node is
+        # recomputed only when it is needed and the pheromone of some of its
+        # edges changed since the last time (it is dirty)
+        self.transition_weights = np.zeros(len(graph.indices))
+        self.cumulative_weights = np.zeros(len(graph.indices))
+        self.dirty_nodes = np.ones(graph.node_cnt, dtype=bool)
+
+        # alpha and beta the weights were computed with and the heuristic
+        # part of the weights -- (1/length)**beta of each edge
+        self.weights_alpha = None
+        self.weights_beta = None
+        self.heuristic = None
+
+        # ants at nodes with more than candidate_cnt neighbours select only
+        # among the candidate_cnt nearest ones (if it isn't None)
+        self.candidate_cnt = candidate_cnt
+        self.candidate_edges = graph.get_candidate_edges(candidate_cnt) if candidate_cnt else None
+
+        # paths of the ants which found food are shortened by shortcuts
+        # before they deposit
+        self.local_search = local_search
+
+        # pheromone update strategy (Ant System, MMAS, ACS, ...)
+        self.strategy = strategy
+        self.update_strategy = STRATEGY_CLASSES[strategy](self)
+
+    # the pheromone is kept between the bounds of the new strategy, the best
+    # found path is kept too
+    def set_strategy(self, strategy):
+        self.strategy = strategy
+        self.update_strategy = STRATEGY_CLASSES[strategy](self)
+        self.set_pheromone_bounds(MIN_PHEROMONE_LEVEL, self.max_pheromone)
+
+        if self.best_found_path:
+            self.update_strategy.on_new_best_path()
+
+    def set_pheromone_bounds(self, lower_bound, upper_bound):
+        self.apply_deposits()
+        self.lower_bound = lower_bound
+        self.upper_bound = upper_bound
+
+        np.clip(self.pheromone, lower_bound, upper_bound, out=self.pheromone)
+        self.pheromone_changed()
+
+    # all the weights are invalidated when alpha or beta change (they can be
+    # changed from outside at any time), the heuristic only when beta changes
+    def check_transition_parameters(self):
+        if self.beta != self.weights_beta:
+            self.heuristic = (1 / self.graph.edge_length)**self.beta
+
+        if self.alpha != self.weights_alpha or self.beta != self.weights_beta:
+            self.weights_alpha = self.alpha
+            self.weights_beta = self.beta
+            self.dirty_nodes[:] = True
+
+    # heuristic computed for the current beta elsewhere, e.g. shared by the
+    # solvers of many queries on the same graph -- it is replaced by a new
+    # one only when beta changes
+    def set_heuristic(self, heuristic):
+        self.heuristic = heuristic
+        self.weights_beta = self.beta
+        self.dirty_nodes[:] = True
+
+    # pheromone of the given edges (of all if None) changed
+    def invalidate_transition_weights(self, edges=None):
+        if edges is None:
+            self.dirty_nodes[:] = True
+        else:
+            self.dirty_nodes[self.graph.edge_from[edges]] = True
+            self.dirty_nodes[self.graph.edge_to[edges]] = True
+
+    def update_node_transition_weights(self, node):
+        graph = self.graph
+        start = graph.indptr[node]
+        end = graph.indptr[node + 1]
+        edges = graph.entry_edge[start:end]
+
+        weights = self.pheromone[edges]**self.alpha * self.heuristic[edges]
+        self.transition_weights[start:end] = weights
+        self.cumulative_weights[start:end] = np.cumsum(weights)
+        self.dirty_nodes[node] = False
+
+    # the same as update_node_transition_weights for all the dirty nodes of
+    # the given ones, nodes of the same degree are computed at once
+    def update_transition_weights(self, nodes):
+        graph = self.graph
+        nodes = np.unique(nodes[self.dirty_nodes[nodes]])
+        if not len(nodes):
+            return
+
+        starts = graph.indptr[nodes]
+        degrees = graph.indptr[nodes + 1] - starts
+
+        for degree in np.unique(degrees).tolist():
+            entries = starts[degrees == degree][:, None] + np.arange(degree)
+            edges = graph.entry_edge[entries]
+
+            weights = self.pheromone[edges]**self.alpha * self.heuristic[edges]
+            self.transition_weights[entries] = weights
+            self.cumulative_weights[entries] = np.cumsum(weights, axis=1)
+
+        self.dirty_nodes[nodes] = False
+
+    # returns the node selected by the given ant and the edge leading to it
+    def get_next_node(self, i):
+        graph = self.graph
+        curr_node = int(self.ants.next_node[i])
+        start = int(graph.indptr[curr_node])
+        end = int(graph.indptr[curr_node + 1])
+
+        if end - start > 1:
+            self.check_transition_parameters()
+
+            # ant can't go back to the last node, unless it is at start
+            excluded_edge = -1
+            excluded = None
+            if curr_node != graph.start_node:
+                excluded_edge = int(self.ants.last_edge[i])
+                excluded = graph.get_entry(curr_node, excluded_edge) - start
+
+            # with the exploitation probability of the strategy the ant takes
+            # the best neighbour instead of the roulette selection
+            exploitation = self.update_strategy.exploitation
+            exploiting = exploitation and self.random_streams.random(i) < exploitation
+            threshold = None if exploiting else self.random_streams.random(i)
+
+            # ant at a node with more neighbours than candidates selects among
+            # the candidates, among all the neighbours only if all the
+            # candidates are excluded or in its path
+            entry = -1
+            if not exploiting and self.candidate_edges is not None and end - start > self.candidate_cnt:
+                entry = self.select_candidate_entry(i, curr_node, excluded_edge, threshold)
+
+            if entry >= 0:
+                start = entry
+            else:
+                if self.dirty_nodes[curr_node]:
+                    self.update_node_transition_weights(curr_node)
+
+                if exploiting:
+                    start += self.select_best_neighbour(i, start, end, excluded)
+                elif excluded is not None:
+                    start += select_neighbour(self.cumulative_weights[start:end].tolist(), threshold, excluded, float(self.transition_weights[start + excluded]))
+                else:
+                    start += select_neighbour(self.cumulative_weights[start:end].tolist(), threshold)
+
+        return int(graph.indices[start]), int(graph.entry_edge[start])
+
+    # vectorized select_neighbour -- roulette selection over all the
+    # neighbours of the nodes, returns the selected entries (the excluded
+    # entry is -1 for none)
+    def select_neighbour_entries(self, curr_nodes, starts, ends, excluded, thresholds):
+        self.update_transition_weights(curr_nodes)
+
+        excluding = excluded >= 0
+        excluded_weights = np.where(excluding, self.transition_weights[excluded], 0.0)
+
+        # the same cases as in select_neighbour
+        targets = thresholds * (self.cumulative_weights[ends - 1] - excluded_weights)
+        before_excluded = excluding & (excluded > starts) & (targets <= self.cumulative_weights[excluded - 1])
+        after_excluded = excluding & ~before_excluded
+
+        lo = np.where(after_excluded, excluded + 1, starts)
+        hi = np.where(before_excluded, excluded, ends)
+        keys = np.where(after_excluded, targets + excluded_weights, targets)
+        entries = bisect_left_many(self.cumulative_weights, keys, lo, hi)
+
+        # rounding errors can keep the target slightly above the total weight
+        last_allowed = np.where(excluded == ends - 1, ends - 2, ends - 1)
+        return np.where(entries == ends, last_allowed, entries)
+
+    # roulette selection among the candidates of the node (its nearest
+    # neighbours) -- the weights of a few candidates are computed right away
+    # instead of the cached weights of all the neighbours, returns the
+    # selected entry, or -1 if all the candidates are excluded or in the path
+    # of the ant already (the ant would be stuck among the nearest neighbours
+    # of each other otherwise, e.g. if food isn't a candidate of any node)
+    def select_candidate_entry(self, i, node, excluded_edge, threshold):
+        graph = self.graph
+        edges = self.candidate_edges[node]
+        weights = (self.pheromone[edges]**self.alpha * self.heuristic[edges]).tolist()
+        neighbours = (graph.edge_from[edges] + graph.edge_to[edges] - node).tolist()
+        edges = edges.tolist()
+
+        selectable = False
+        for position, edge in enumerate(edges):
+            if edge == excluded_edge:
+                weights[position] = 0.0
+            elif not selectable and weights[position] > 0:
+                selectable = self.ants.find_in_path(i, neighbours[position]) < 0
+
+        if not selectable:
+            return -1
+
+        # zero weights are skipped, so the excluded candidate is never selected
+        cumulative_weights = list(accumulate(weights))
+        position = bisect_right(cumulative_weights, threshold * cumulative_weights[-1])
+
+        # rounding errors can keep the target at the total weight
+        if position == len(edges):
+            position = max(position for position, weight in enumerate(weights) if weight > 0)
+
+        return graph.get_entry(node, edges[position])
+
+    # select_candidate_entry for many ants at once
+    def select_candidate_entries(self, ants, curr_nodes, excluded_edges, thresholds):
+        graph = self.graph
+        edges = self.candidate_edges[curr_nodes]
+        weights = self.pheromone[edges]**self.alpha * self.heuristic[edges]
+        weights[edges == excluded_edges[:, None]] = 0.0
+
+        neighbours = graph.edge_from[edges] + graph.edge_to[edges] - curr_nodes[:, None]
+        visited = self.ants.find_in_paths(np.repeat(ants, self.candidate_cnt), neighbours.ravel()) >= 0
+        has_unvisited = (np.where(visited.reshape(edges.shape), 0.0, weights) > 0).any(axis=1)
+
+        cumulative_weights = np.cumsum(weights, axis=1)
+        totals = cumulative_weights[:, -1]
+        positions = np.count_nonzero(cumulative_weights <= (thresholds * totals)[:, None], axis=1)
+
+        last_positions = self.candidate_cnt - 1 - np.argmax(weights[:, ::-1] > 0, axis=1)
+        positions = np.where(positions == self.candidate_cnt, last_positions, positions)
+
+        entries = graph.get_entries(curr_nodes, edges[np.arange(len(edges)), positions])
+        return np.where(has_unvisited, entries, -1)
+
+    # the neighbour with the highest transition weight (the first of them)
+    # which isn't in the path of the ant yet, greedy ants would walk in loops
+    # otherwise -- if all the neighbours are in the path, any of them but the
+    # excluded one
+    def select_best_neighbour(self, i, start, end, excluded=None):
+        weights = self.transition_weights[start:end].copy()
+        if excluded is not None:
+            weights[excluded] = -np.inf
+
+        visited = [self.ants.find_in_path(i, node) >= 0 for node in self.graph.indices[start:end].tolist()]
+        unvisited_weights = np.where(visited, -np.inf, weights)
+        if (unvisited_weights > -np.inf).any():
+            weights = unvisited_weights
+
+        return int(np.argmax(weights))
+
+    # select_best_neighbour for many (distinct) ants at once, returns the
+    # selected entries -- the excluded entry is -1 for none
+    def select_best_entries(self, ants, starts, ends, excluded):
+        graph = self.graph
+        degrees = ends - starts
+        offsets = np.cumsum(degrees) - degrees
+        ranges = np.repeat(np.arange(len(ants)), degrees)
+
+        entries = starts[ranges] + np.arange(len(ranges)) - offsets[ranges]
+        weights = np.where(entries == excluded[ranges], -np.inf, self.transition_weights[entries])
+
+        visited = self.ants.find_in_paths(ants[ranges], graph.indices[entries]) >= 0
+        unvisited_weights = np.where(visited, -np.inf, weights)
+        has_unvisited = np.maximum.reduceat(unvisited_weights, offsets) > -np.inf
+        weights = np.where(has_unvisited[ranges], unvisited_weights, weights)
+
+        # the first of the highest weights of each range
+        best_weights = np.maximum.reduceat(weights, offsets)
+        best = np.flatnonzero(weights == best_weights[ranges])
+        _, first = np.unique(ranges[best], return_index=True)
+
+        return entries[best[first]]
+
+    # vectorized get_next_node for all the given (distinct) ants at once,
+    # returns arrays of the selected nodes and edges
+    def select_next_nodes(self, ants):
+        graph = self.graph
+        curr_nodes = self.ants.next_node[ants].astype(np.int64)
+
+        starts = graph.indptr[curr_nodes]
+        ends = graph.indptr[curr_nodes + 1]
+
+        # ant at a node with a single neighbour has no choice (no random number is drawn)
+        selected_entries = starts.copy()
+        choosing = ends - starts > 1
+
+        if choosing.any():
+            choosing_ants = ants[choosing]
+
+            # the exploiting ants take the best neighbours, only the others
+            # draw the thresholds of the roulette selection
+            exploitation = self.update_strategy.exploitation
+            if exploitation:
+                exploiting = self.random_streams.random_many(choosing_ants) < exploitation
+                thresholds = np.zeros(len(choosing_ants))
+                thresholds[~exploiting] = self.random_streams.random_many(choosing_ants[~exploiting])
+            else:
+                exploiting = np.zeros(len(choosing_ants), dtype=bool)
+                thresholds = self.random_streams.random_many(choosing_ants)
+
+            curr_nodes = curr_nodes[choosing]
+            starts = starts[choosing]
+            ends = ends[choosing]
+
+            self.check_transition_parameters()
+
+            # ant can't go back to the last node, unless it is at start
+            excluding = curr_nodes != graph.start_node
+            excluded_edges = np.where(excluding, self.ants.last_edge[choosing_ants], -1)
+            excluded = np.where(excluding, graph.get_entries(curr_nodes, excluded_edges), -1)
+
+            entries = np.full(len(choosing_ants), -1, dtype=np.int64)
+
+            # the same cases as in get_next_node
+            if self.candidate_edges is not None:
+                selecting = ~exploiting & (ends - starts > self.candidate_cnt)
+                if selecting.any():
+                    entries[selecting] = self.select_candidate_entries(choosing_ants[selecting], curr_nodes[selecting], excluded_edges[selecting], thresholds[selecting])
+
+            if exploiting.any():
+                self.update_transition_weights(curr_nodes[exploiting])
+                entries[exploiting] = self.select_best_entries(choosing_ants[exploiting], starts[exploiting], ends[exploiting], excluded[exploiting])
+
+            selecting = entries < 0
+            if selecting.any():
+                entries[selecting] = self.select_neighbour_entries(curr_nodes[selecting], starts[selecting], ends[selecting], excluded[selecting], thresholds[selecting])
+
+            selected_entries[choosing] = entries
+
+        return graph.indices[selected_entries], graph.entry_edge[selected_entries]
+
+    def add_pheromones_to_edge(self, i):
+        self.deposit_edges.append(int(self.ants.last_edge[i]))
+        self.deposit_increments.append(float(self.ants.pheromone_increment[i]))
+
+    # adds all the waiting deposits with a single scatter-add, np.add.at adds
+    # them in the given order, so the result is the same as if they were added
+    # one by one (and clamping after each of them gives the same result too)
+    def apply_deposits(self):
+        if not self.deposit_edges:
+            return
+
+        edges = np.array(self.deposit_edges, dtype=np.int64)
+        np.add.at(self.pheromone, edges, self.deposit_increments)
+        self.deposit_edges = []
+        self.deposit_increments = []
+        self.invalidate_transition_weights(edges)
+
+        deposited = self.pheromone[edges]
+        if deposited.max() > self.upper_bound:
+            np.minimum(deposited, self.upper_bound, out=deposited)
+            self.pheromone[edges] = deposited
+
+        self.max_pheromone_level = max(self.max_pheromone_level, float(deposited.max()))
+
+    # for the case the pheromone is changed from outside of the solver
+    def pheromone_changed(self):
+        self.max_pheromone_level = float(self.pheromone.max()) if len(self.pheromone) else self.lower_bound
+        self.invalidate_transition_weights()
+
+    def set_best_found_path(self, i, path_len):
+        graph = self.graph
+        path = self.ants.get_path(i) + [graph.end_node]
+        edges = self.ants.get_path_edges(i)
+
+        self.best_found_path_len = path_len
+        self.best_found_path = graph.node_ids[path].tolist()
+        self.best_found_path_edges = edges
+
+        self.update_strategy.on_new_best_path()
+
+        if self.on_new_best_path:
+            self.on_new_best_path(self.best_found_path, edges)
+
+    # increments of the tours of the given lengths, for the increment type and
+    # the best found path lengths (numbers or arrays)
+    def get_increments(self, tour_lens, best_path_lens):
+        if self.increment_type == 'constant':
+            return 1
+        elif self.increment_type == 'path-cost':
+            return 1/tour_lens
+        elif self.increment_type == 'max-edge':
+            return self.graph.max_edge_len/tour_lens
+        elif self.increment_type == 'best-path':
+            return best_path_lens/tour_lens
+
+    # the ant which just found food walks back (and deposits) on the path
+    # shortened by the best combination of shortcuts
+    def shorten_ant_path(self, i):
+        shortened = self.graph.shorten_path(self.ants.get_path(i) + [self.graph.end_node], self.ants.get_path_edges(i))
+
+        if shortened is not None:
+            path, path_edges = shortened
+            self.ants.set_path(i, path[:-1], path_edges)
+
+    # function runs only immediately after picking up food
+    def calculate_pheromone_increments(self, i):
+        graph = self.graph
+
+        if self.local_search:
+            self.shorten_ant_path(i)
+
+        # get lengths for each edge
+        entire_length = sum(graph.edge_length[self.ants.get_path_edges(i)].tolist())
+
+        if entire_length < self.best_found_path_len:
+            self.set_best_found_path(i, entire_length)
+
+        increment = self.get_increments(entire_length, self.best_found_path_len)
+
+        weights = self.update_strategy.weigh_tours([entire_length], [self.best_found_path_len])
+        if weights is not None:
+            increment *= weights[0]
+
+        self.ants.pheromone_increment[i] = increment
+        self.update_strategy.on_tours_finished(1)
+
+    # calculate_pheromone_increments for many ants at once, as if it was
+    # called for them one by one in the given order
+    def calculate_pheromone_increments_many(self, ants):
+        graph = self.graph
+
+        if self.local_search:
+            for i in ants.tolist():
+                self.shorten_ant_path(i)
+
+        path_lens = self.ants.path_len[ants]
+        width = int(path_lens.max())
+
+        # the lengths are summed in the same order as in calculate_pheromone_increments
+        edge_lengths = np.where(np.arange(width) < path_lens[:, None], graph.edge_length[self.ants.path_edges[ants, :width]], 0.0)
+        entire_lengths = np.cumsum(edge_lengths, axis=1)[:, -1]
+
+        # the best found path length after each of the ants
+        best_path_lens = np.minimum.accumulate(np.concatenate([[self.best_found_path_len], entire_lengths]))[1:]
+
+        if best_path_lens[-1] < self.best_found_path_len:
+            best = int(np.argmax(entire_lengths == best_path_lens[-1]))
+            self.set_best_found_path(ants[best], float(entire_lengths[best]))
+
+        increments = self.get_increments(entire_lengths, best_path_lens)
+
+        weights = self.update_strategy.weigh_tours(entire_lengths, best_path_lens)
+        if weights is not None:
+            increments = increments * weights
+
+        self.ants.pheromone_increment[ants] = increments
+        self.update_strategy.on_tours_finished(len(ants))
+
+    def evaporate_pheromone_trails(self):
+        self.apply_deposits()
+
+        self.pheromone *= self.evaporation
+        np.maximum(self.pheromone, self.lower_bound, out=self.pheromone)
+        self.invalidate_transition_weights()
+
+        # both operations are monotonic, so they give the maximum of the
+        # evaporated pheromone when they are applied to the old maximum
+        self.max_pheromone_level = max(self.max_pheromone_level * self.evaporation, self.lower_bound)
+
+    # ant arrived to its next node -- update its state and return the node
+    # and the edge it goes to next, or None if the next node has to be selected
+    def process_arrival(self, i):
+        graph = self.graph
+        ants = self.ants
+
+        # determine whether ant carries food
+        next_node = ants.next_node[i]
+        if next_node == graph.end_node:
+            if not ants.has_food[i]:
+                ants.recently_acquired_food[i] = True
+            ants.has_food[i] = True
+        elif next_node == graph.start_node:
+            if ants.has_food[i]:
+                ants.recently_deposited_food[i] = True
+            ants.has_food[i] = False
+
+        path_len = int(ants.path_len[i])
+
+        if ants.has_food[i] and path_len:
+            # ant is coming back to start on given path
+            # add pheromones, but don't add them to edge before end
+            if ants.recently_acquired_food[i]:
+                # calculate pheromone increments for each edge
+                self.calculate_pheromone_increments(i)
+                ants.recently_acquired_food[i] = False
+            else:
+                self.add_pheromones_to_edge(i)
+
+            # ant is going in a reversed path (the path may be shortened when
+            # the increments are calculated)
+            path_len = int(ants.path_len[i]) - 1
+            ants.path_len[i] = path_len
+            return int(ants.path[i, path_len]), int(ants.path_edges[i, path_len])
+
+        # ant is looking for food
+        # save last node to ant's path
+        ants.save_node_to_path(i)
+
+        # add pheromones to the last edge before ant deposited food
+        if ants.recently_deposited_food[i]:
+            self.add_pheromones_to_edge(i)
+            ants.recently_deposited_food[i] = False
+
+        return None
+
+    # process_arrival for all the ants at once, the ants walking back are sent
+    # further, the ants looking for food are returned
+    def process_arrivals(self):
+        graph = self.graph
+        ants = self.ants
+
+        # determine whether ants carry food
+        at_end = ants.next_node == graph.end_node
+        at_start = (ants.next_node == graph.start_node) & ~at_end
+        ants.recently_acquired_food |= at_end & ~ants.has_food
+        ants.recently_deposited_food |= at_start & ants.has_food
+        ants.has_food[at_end] = True
+        ants.has_food[at_start] = False
+
+        walking_back = ants.has_food & (ants.path_len > 0)
+        acquired = walking_back & ants.recently_acquired_food
+        deposited = ~walking_back & ants.recently_deposited_food
+
+        # the same deposits in the same order as from process_arrival
+        depositing = np.flatnonzero((walking_back & ~acquired) | deposited)
+        self.deposit_edges.extend(ants.last_edge[depositing].tolist())
+        self.deposit_increments.extend(ants.pheromone_increment[depositing].tolist())
+
+        if acquired.any():
+            self.calculate_pheromone_increments_many(np.flatnonzero(acquired))
+
+        ants.recently_acquired_food[acquired] = False
+        ants.recently_deposited_food[deposited] = False
+
+        # ants are going in reversed paths
+        returning = np.flatnonzero(walking_back)
+        ants.path_len[returning] -= 1
+        path_lens = ants.path_len[returning]
+        self.send_ants(returning, ants.path[returning, path_lens], ants.path_edges[returning, path_lens])
+
+        # ants looking for food save last nodes to their paths
+        searching = np.flatnonzero(~walking_back)
+        ants.save_nodes_to_paths(searching)
+
+        return searching
+
+    def send_ant(self, i, new_next_node, edge):
+        ants = self.ants
+
+        # ant looking for food remembers the edge it took
+        if not ants.has_food[i]:
+            ants.path_edges[i, ants.path_len[i] - 1] = edge
+
+        # save current edge
+        ants.last_edge[i] = edge
+
+        # update next node
+        ants.last_node[i] = ants.next_node[i]
+        ants.next_node[i] = new_next_node
+
+    # send_ant for many (distinct) ants at once
+    def send_ants(self, ants, new_next_nodes, edges):
+        table = self.ants
+
+        searching = ~table.has_food[ants]
+        table.path_edges[ants[searching], table.path_len[ants[searching]] - 1] = edges[searching]
+
+        table.last_edge[ants] = edges
+        table.last_node[ants] = table.next_node[ants]
+        table.next_node[ants] = new_next_nodes
+
+    # ant arrived to its next node -- update its state and send it further
+    def move_ant(self, i):
+        next_step = self.process_arrival(i)
+
+        if next_step is None:
+            # calculate the new next node from the up to date pheromone
+            self.apply_deposits()
+            next_step = self.get_next_node(i)
+            self.update_strategy.on_edges_taken([next_step[1]])
+
+        self.send_ant(i, *next_step)
+
+    # one iteration -- every ant walks over one edge, pheromones of all the
+    # ants are deposited first (at once) and then all the ants looking for
+    # food select their next nodes
+    def step(self):
+        choosing_ants = self.process_arrivals()
+        self.apply_deposits()
+
+        if len(choosing_ants):
+            if self.mode == 'batched':
+                next_nodes, edges = self.select_next_nodes(choosing_ants)
+            else:
+                next_steps = [self.get_next_node(i) for i in choosing_ants.tolist()]
+                next_nodes = np.array([node for node, _ in next_steps])
+                edges = np.array([edge for _, edge in next_steps])
+
+            self.update_strategy.on_edges_taken(edges)
+            self.send_ants(choosing_ants, next_nodes, edges)
+
+        self.evaporate_pheromone_trails()
+        self.iteration_cnt += 1
+
+    # changes of the graph while the colony runs (nodes are given by their
+    # indices) -- the cached weights of the entries are inserted and deleted
+    # together with the entries and only the weights and the candidate lists
+    # of the nodes of the changed edges are recomputed
+
+    def update_candidates(self, edges):
+        if self.candidate_edges is not None:
+            nodes = np.unique(np.concatenate([self.graph.edge_from[edges], self.graph.edge_to[edges]]))
+            self.candidate_edges[nodes] = self.graph.get_candidate_edges(self.candidate_cnt, nodes)
+
+    def update_edge_lengths(self, edges):
+        if self.heuristic is not None:
+            self.heuristic[edges] = (1 / self.graph.edge_length[edges])**self.beta
+        self.invalidate_transition_weights(edges)
+        self.update_candidates(edges)
+
+        # the best found path keeps its nodes, but its length may change
+        if np.isin(self.best_found_path_edges, edges).any():
+            self.best_found_path_len = sum(self.graph.edge_length[self.best_found_path_edges].tolist())
+
+    # returns the index of the new edge
+    def add_edge(self, from_node, to_node):
+        edge, entries = self.graph.add_edge(from_node, to_node)
+
+        for entry in entries:
+            self.transition_weights = np.insert(self.transition_weights, entry, 0.0)
+            self.cumulative_weights = np.insert(self.cumulative_weights, entry, 0.0)
+
+        if edge == len(self.pheromone):
+            self.pheromone = np.append(self.pheromone, self.lower_bound)
+            if self.heuristic is not None:
+                self.heuristic = np.append(self.heuristic, 0.0)
+
+        # the new edge (or an edge removed before) gets the highest pheromone
+        # level of the edges of its nodes, with the minimal level it would
+        # hardly ever be tried next to the converged trails
+        graph = self.graph
+        neighbour_edges = np.concatenate([graph.entry_edge[graph.indptr[node]:graph.indptr[node + 1]] for node in (from_node, to_node)])
+        self.pheromone[edge] = self.pheromone[neighbour_edges].max()
+
+        self.update_edge_lengths(np.array([edge]))
+
+        return edge
+
+    def remove_edge(self, edge):
+        graph = self.graph
+
+        # the ants would get stuck in the start
+        if graph.start_node in (graph.edge_from[edge], graph.edge_to[edge]) and graph.get_degree(graph.start_node) == 1:
+            raise ValueError('The last edge of the start node cannot be removed!')
+
+        self.apply_deposits()
+        self.invalidate_transition_weights(np.array([edge]))
+
+        for entry in graph.remove_edge(edge):
+            self.transition_weights = np.delete(self.transition_weights, entry)
+            self.cumulative_weights = np.delete(self.cumulative_weights, entry)
+        self.update_candidates(np.array([edge]))
+
+        pheromone_level = self.pheromone[edge]
+        self.pheromone[edge] = self.lower_bound
+        if pheromone_level >= self.max_pheromone_level:
+            self.max_pheromone_level = float(self.pheromone.max())
+
+        # ants on the edge or with the edge in their paths start from scratch
+        self.ants.reset(self.ants.find_ants_using_edge(edge))
+
+        if edge in self.best_found_path_edges:
+            self.best_found_path_len = sys.maxsize
+            self.best_found_path = []
+            self.best_found_path_edges = []
+
+    def move_node(self, node, x, y):
+        self.update_edge_lengths(self.graph.move_node(node, x, y))
+
+    # the whole state of the solver as JSON serializable metadata and arrays
+    def get_state(self):
+        metadata = {name: getattr(self, name) for name in SOLVER_PARAMETERS}
+        metadata.update({
+            'ants': len(self.ants),
+            'iteration_cnt': self.iteration_cnt,
+            'best_found_path_len': self.best_found_path_len,
+            'best_found_path': self.best_found_path,
+            'best_found_path_edges': self.best_found_path_edges,
+            'max_pheromone_level': self.max_pheromone_level,
+            'pheromone_bounds': [self.lower_bound, self.upper_bound],
+            'seed': self.random_streams.get_seed()
+        })
+
+        arrays = {
+            'pheromone': self.pheromone,
+            'deposit_edges': np.array(self.deposit_edges, dtype=np.int64),
+            'deposit_increments': np.array(self.deposit_increments, dtype=np.float64)
+        }
+        arrays.update(self.ants.get_arrays())
+        arrays.update(self.random_streams.get_arrays())
+
+        metadata['strategy_state'], strategy_arrays = self.update_strategy.get_state()
+        arrays.update(strategy_arrays)
+
+        return metadata, arrays
+
+    # creates the solver from get_state of a solver on the same graph, the
+    # arrays are used as they are (without copying)
+    @classmethod
+    def from_state(cls, graph, metadata, arrays, mode='reference'):
+        parameters = {name: metadata[name] for name in SOLVER_PARAMETERS}
+        solver = cls(graph, metadata['ants'], mode=mode, seed=get_seed_sequence(metadata['seed']), **parameters)
+
+        solver.iteration_cnt = metadata['iteration_cnt']
+        solver.best_found_path_len = metadata['best_found_path_len']
+        solver.best_found_path = metadata['best_found_path']
+        solver.best_found_path_edges = metadata['best_found_path_edges']
+        solver.max_pheromone_level = metadata['max_pheromone_level']
+        solver.lower_bound, solver.upper_bound = metadata['pheromone_bounds']
+
+        solver.pheromone = arrays['pheromone']
+        solver.deposit_edges = arrays['deposit_edges'].tolist()
+        solver.deposit_increments = arrays['deposit_increments'].tolist()
+        solver.ants.set_arrays(arrays)
+        solver.random_streams.set_arrays(arrays)
+        solver.update_strategy.set_state(metadata['strategy_state'], arrays)
+
+        return solver
+
+    def run(self, iterations):
+        for _ in range(iterations):
+            self.step()
+
+        return self.best_found_path, self.best_found_path_len
@@ -0,0 +1,166 @@
+# ******************************* strategies.py *****************************
+#  Course: Soft Computing (SFC) - FIT BUT
+#  Project name: Shortest path search simulation using ACO
+#  Author: Beranek Tomas (xberan46)
+#  Date: 26.11.2022
+#  Up2date sources: https://github.com/TomasBeranek/but-sfc-project
+# ***************************************************************************
+
+
+import numpy as np
+
+
+# the best found path is reinforced by ELITIST_WEIGHT times its increment
+# per as many finished tours as there are ants
+ELITIST_WEIGHT = 6
+
+# only the RANK_WIDTH - 1 shortest of the recent tours deposit, the r-th
+# shortest (from 0) with weight RANK_WIDTH - 1 - r, and the best found path
+# is reinforced with weight RANK_WIDTH
+RANK_WIDTH = 6
+
+# the lower bound of MMAS is the upper bound divided by MMAS_BOUNDS_RATIO
+# times the number of nodes
+MMAS_BOUNDS_RATIO = 2
+
+# ACS takes the best neighbour with probability ACS_EXPLOITATION, every edge
+# an ant takes loses ACS_LOCAL_EVAPORATION of its pheromone above the
+# lower bound -- the usual 0.9 and 0.1 (for TSP) make the ants stick to the
+# first found paths of the example graphs
+ACS_EXPLOITATION = 0.5
+ACS_LOCAL_EVAPORATION = 0.2
+
+
+# ants walk asynchronously, so there are no iterations in which all of them
+# finish a tour -- the strategies compare a tour with as many tours finished
+# last as there are ants, and the weight of the best found path is spread
+# over these tours
+class AntSystem:
+    # every ant deposits its increment on its way back
+    exploitation = 0.0
+
+    def __init__(self, solver):
+        self.solver = solver
+
+    # weights of the increments of the finished tours (in the order they
+    # were finished) and the best found path lengths after each of them,
+    # None is the same as all the weights equal to 1
+    def weigh_tours(self, tour_lens, best_path_lens):
+        return None
+
+    def on_tours_finished(self, tour_cnt):
+        pass
+
+    def on_new_best_path(self):
+        pass
+
+    # the ants took the edges on their way to food
+    def on_edges_taken(self, edges):
+        pass
+
+    # state of the strategy as JSON serializable metadata and arrays
+    def get_state(self):
+        return {}, {}
+
+    def set_state(self, metadata, arrays):
+        pass
+
+
+class RecentToursStrategy(AntSystem):
+    # keeps the lengths of the tours finished last in a ring buffer
+    def __init__(self, solver):
+        super().__init__(solver)
+        self.recent_tour_lens = np.full(len(solver.ants), np.inf)
+        self.recent_tour_pos = 0
+
+    # rank of each tour (from 0) among the recent tours when it was finished
+    def rank_tours(self, tour_lens):
+        ranks = []
+
+        for tour_len in tour_lens:
+            self.recent_tour_lens[self.recent_tour_pos] = tour_len
+            self.recent_tour_pos = (self.recent_tour_pos + 1) % len(self.recent_tour_lens)
+            ranks.append(np.count_nonzero(self.recent_tour_lens < tour_len))
+
+        return np.array(ranks)
+
+    # the best found path gets the weight per as many tours as there are ants
+    def reinforce_best_path(self, weight, tour_cnt):
+        solver = self.solver
+        if not solver.best_found_path_edges:
+            return
+
+        increment = weight * tour_cnt / len(solver.ants) * solver.get_increments(solver.best_found_path_len, solver.best_found_path_len)
+        solver.deposit_edges.extend(solver.best_found_path_edges)
+        solver.deposit_increments.extend([float(increment)] * len(solver.best_found_path_edges))
+
+    def get_state(self):
+        return {'recent_tour_pos': self.recent_tour_pos}, {'recent_tour_lens': self.recent_tour_lens}
+
+    def set_state(self, metadata, arrays):
+        self.recent_tour_pos = metadata['recent_tour_pos']
+        self.recent_tour_lens = arrays['recent_tour_lens']
+
+
+class ElitistAntSystem(RecentToursStrategy):
+    # every ant deposits and the best found path is reinforced
+    def on_tours_finished(self, tour_cnt):
+        self.reinforce_best_path(ELITIST_WEIGHT, tour_cnt)
+
+
+class RankBasedAntSystem(RecentToursStrategy):
+    def weigh_tours(self, tour_lens, best_path_lens):
+        return np.maximum(RANK_WIDTH - 1 - self.rank_tours(tour_lens), 0)
+
+    def on_tours_finished(self, tour_cnt):
+        self.reinforce_best_path(RANK_WIDTH, tour_cnt)
+
+
+class MaxMinAntSystem(RecentToursStrategy):
+    # only the shortest of the recent tours deposits and the pheromone is
+    # kept between the bounds derived from the best found path -- the upper
+    # bound is the level an edge of the best found path converges to and
+    # the lower bound keeps every edge possible to take
+    def weigh_tours(self, tour_lens, best_path_lens):
+        return (self.rank_tours(tour_lens) == 0).astype(np.float64)
+
+    def on_new_best_path(self):
+        solver = self.solver
+        if solver.evaporation >= 1:
+            return
+
+        increment = solver.get_increments(solver.best_found_path_len, solver.best_found_path_len)
+        upper_bound = min(increment / (1 - solver.evaporation), solver.max_pheromone)
+        solver.set_pheromone_bounds(upper_bound / (MMAS_BOUNDS_RATIO * solver.graph.node_cnt), upper_bound)
+
+
+class AntColonySystem(AntSystem):
+    # pseudo-random proportional selection, the taken edges lose pheromone
+    # right away (local update) and only the ants which found the best path
+    # so far deposit
+    exploitation = ACS_EXPLOITATION
+
+    def weigh_tours(self, tour_lens, best_path_lens):
+        return (np.asarray(tour_lens) <= np.asarray(best_path_lens)).astype(np.float64)
+
+    # an edge taken k times at once loses the same pheromone as if it was
+    # taken k times one after another
+    def on_edges_taken(self, edges):
+        solver = self.solver
+        edges, counts = np.unique(edges, return_counts=True)
+
+        levels = solver.pheromone[edges]
+        solver.pheromone[edges] = solver.lower_bound + (1 - ACS_LOCAL_EVAPORATION)**counts * (levels - solver.lower_bound)
+        solver.invalidate_transition_weights(edges)
+
+        if levels.max() >= solver.max_pheromone_level:
+            solver.max_pheromone_level = float(solver.pheromone.max())
+
+
+STRATEGY_CLASSES = {
+    'as': AntSystem,
+    'elitist': ElitistAntSystem,
+    'rank': RankBasedAntSystem,
+    'mmas': MaxMinAntSystem,
+    'acs': AntColonySystem
+}
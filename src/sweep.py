@@ -0,0 +1,251 @@
+#!/usr/bin/env python3.8
+
+# ******************************* sweep.py **********************************
+#  Course: Soft Computing (SFC) - FIT BUT
+#  Project name: Shortest path search simulation using ACO
+#  Author: Beranek Tomas (xberan46)
+#  Date: 26.11.2022
+#  Up2date sources: https://github.com/TomasBeranek/but-sfc-project
+# ***************************************************************************
+
+
+import argparse
+import csv
+import itertools
+import math
+import multiprocessing as mp
+import os
+import random
+import sys
+
+from benchmark import DEFAULT_BENCHMARK_GRAPHS, find_shortest_path_len, load_benchmark_graph, mean, measure_solver_run
+from options import INCREMENT_TYPES, STRATEGIES
+
+
+# swept parameters in the order of the CSV columns
+SWEEP_PARAMETERS = ['alpha', 'beta', 'evaporation', 'increment_type', 'strategy', 'candidates', 'local_search', 'ants']
+
+# settings of the whole sweep, written with every run -- runs with other
+# settings are neither skipped nor ranked
+SETTING_COLUMNS = ['iterations', 'patience', 'tolerance', 'mode', 'graph_seed']
+
+# columns identifying a run and the measured columns
+RUN_COLUMNS = ['graph'] + SWEEP_PARAMETERS + SETTING_COLUMNS + ['seed']
+RESULT_COLUMNS = ['best_path_len', 'quality', 'iterations_run', 'stop_reason', 'iterations_to_tolerance', 'time_to_tolerance', 'elapsed_time', 'iterations_per_s']
+
+# values of the local search option
+LOCAL_SEARCH_VALUES = ['off', 'on']
+
+# graphs loaded by a worker process and their optima, every worker loads
+# each graph only once
+WORKER_GRAPHS = {}
+
+
+def parse_list(value_type):
+    def parse(text):
+        try:
+            return [value_type(value) for value in text.split(',')]
+        except ValueError:
+            raise argparse.ArgumentTypeError(f'invalid list \'{text}\'')
+
+    return parse
+
+
+def parse_choices(choices, name):
+    def parse(text):
+        values = text.split(',')
+        for value in values:
+            if value not in choices:
+                raise argparse.ArgumentTypeError(f'invalid {name} \'{value}\' (choose from {", ".join(choices)})')
+        return values
+
+    return parse
+
+
+def init_parser():
+    parser = argparse.ArgumentParser(description='Sweep of the ACO parameters -- seeded headless colonies run in a process pool, every finished run is appended to a CSV file and configurations are ranked by time to the optimum.')
+
+    parser.add_argument('graphs', nargs='*', help='JSON graph files or specifications of generated graphs -- grid:ROWSxCOLS, geometric:NODES[xDEGREE], scale-free:NODES (default: graphs/ examples, grid:10x10, geometric:200, scale-free:200)')
+    parser.add_argument('--alpha', type=parse_list(float), default=[0.5, 1, 2], help='comma separated values of alpha (default: 0.5,1,2)')
+    parser.add_argument('--beta', type=parse_list(float), default=[0.5, 1, 2], help='comma separated values of beta (default: 0.5,1,2)')
+    parser.add_argument('--evaporation', type=parse_list(float), default=[0.9, 0.98], help='comma separated values of evaporation (default: 0.9,0.98)')
+    parser.add_argument('--increment-type', type=parse_choices(INCREMENT_TYPES, 'increment type'), default=list(INCREMENT_TYPES), help=f'comma separated increment types (default: {",".join(INCREMENT_TYPES)})')
+    parser.add_argument('--strategy', type=parse_choices(STRATEGIES, 'strategy'), default=['as'], help=f'comma separated pheromone update strategies -- {",".join(STRATEGIES)} (default: as)')
+    parser.add_argument('--candidates', type=parse_list(int), default=[0], help='comma separated sizes of candidate lists, 0 for all the neighbours (default: 0)')
+    parser.add_argument('--local-search', type=parse_choices(LOCAL_SEARCH_VALUES, 'local search value'), default=['off'], help='comma separated on/off values of shortening found paths by shortcuts (default: off)')
+    parser.add_argument('-a', '--ants', type=parse_list(int), default=[100], help='comma separated numbers of ants (default: 100)')
+    parser.add_argument('--sample', type=int, default=None, help='run only SAMPLE configurations drawn at random from the grid (default: the whole grid)')
+    parser.add_argument('--sample-seed', type=int, default=0, help='seed of the drawn configurations (default: 0)')
+    parser.add_argument('-i', '--iterations', type=int, default=1000, help='number of iterations of each run (default: 1000)')
+    parser.add_argument('--patience', type=int, default=0, help='a run stops when its best found path hasn\'t improved for PATIENCE iterations, so converged colonies don\'t waste the workers, 0 to run all the iterations (default: 0)')
+    parser.add_argument('--seeds', type=int, default=3, help='number of runs (with seeds 0..SEEDS-1) of each configuration on each graph (default: 3)')
+    parser.add_argument('--tolerance', type=float, default=5, help='a path at most TOLERANCE %% longer than the optimum counts as found (default: 5)')
+    parser.add_argument('--batched', action='store_true', help='select next nodes of all ants at once')
+    parser.add_argument('--graph-seed', type=int, default=0, help='seed of the generated graphs (default: 0)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of worker processes (default: number of CPUs)')
+    parser.add_argument('-o', '--output', type=str, default='sweep.csv', help='CSV file the runs are appended to, the runs already in it are skipped (default: sweep.csv)')
+    parser.add_argument('--top', type=int, default=5, help='number of the best configurations printed for each graph (default: 5)')
+
+    return parser
+
+
+# the grid of configurations, or a random sample of it
+def get_configurations(args):
+    grid = [dict(zip(SWEEP_PARAMETERS, values)) for values in itertools.product(args.alpha, args.beta, args.evaporation, args.increment_type, args.strategy, args.candidates, args.local_search, args.ants)]
+
+    if args.sample is not None and args.sample < len(grid):
+        grid = random.Random(args.sample_seed).sample(grid, args.sample)
+
+    return grid
+
+
+def get_settings(args):
+    return {
+        'iterations': args.iterations,
+        'patience': args.patience,
+        # the same tolerance is written the same way however it was given
+        'tolerance': float(args.tolerance),
+        'mode': 'batched' if args.batched else 'reference',
+        'graph_seed': args.graph_seed
+    }
+
+
+# values are compared as they are written in the CSV file
+def get_run_key(run):
+    return tuple(str(run[column]) for column in RUN_COLUMNS)
+
+
+def has_settings(run, settings):
+    return all(run[column] == str(value) for column, value in settings.items())
+
+
+# raises ValueError for a file with other columns (e.g. from an older
+# version), its runs couldn't be told apart
+def read_finished_runs(file_path):
+    if not os.path.exists(file_path):
+        return []
+
+    with open(file_path, newline='') as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames is not None and reader.fieldnames != RUN_COLUMNS + RESULT_COLUMNS:
+            raise ValueError(f'{file_path} has different columns than this sweep writes, use another output file')
+        return list(reader)
+
+
+def run_sweep_job(job):
+    graph_name, configuration, settings, seed = job
+
+    if graph_name not in WORKER_GRAPHS:
+        graph = load_benchmark_graph(graph_name, settings['graph_seed'])
+        WORKER_GRAPHS[graph_name] = graph, find_shortest_path_len(graph)
+    graph, optimum = WORKER_GRAPHS[graph_name]
+
+    solver_params = {name: configuration[name] for name in ['alpha', 'beta', 'evaporation', 'increment_type', 'strategy']}
+    solver_params['candidate_cnt'] = configuration['candidates'] or None
+    solver_params['local_search'] = configuration['local_search'] == 'on'
+    result = measure_solver_run(graph, configuration['ants'], settings['iterations'], seed, optimum, settings['tolerance'], dict(solver_params, mode=settings['mode']), settings['patience'])
+
+    run = {'graph': graph_name, **configuration, **settings, 'seed': seed}
+    run.update({column: result[column] for column in RESULT_COLUMNS if column != 'iterations_run'})
+    run['iterations_run'] = result['iterations']
+    return run
+
+
+# runs the jobs which aren't in the CSV file yet, every finished run is
+# written (and flushed) at once, so an interrupted sweep continues where it
+# stopped, returns the runs with the settings of this sweep
+def run_sweep(args):
+    graphs = args.graphs or DEFAULT_BENCHMARK_GRAPHS
+    settings = get_settings(args)
+
+    finished_runs = read_finished_runs(args.output)
+    finished_keys = {get_run_key(run) for run in finished_runs}
+
+    jobs = []
+    for graph_name in graphs:
+        for configuration in get_configurations(args):
+            for seed in range(args.seeds):
+                if get_run_key({'graph': graph_name, **configuration, **settings, 'seed': seed}) not in finished_keys:
+                    jobs.append((graph_name, configuration, settings, seed))
+
+    finished_cnt = sum(has_settings(run, settings) for run in finished_runs)
+    print(f'{finished_cnt} runs with these settings already finished, {len(jobs)} runs to go', file=sys.stderr)
+
+    write_header = not finished_runs
+    with open(args.output, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RUN_COLUMNS + RESULT_COLUMNS)
+        if write_header:
+            writer.writeheader()
+
+        # each run is a separate task, so the runs are spread evenly
+        with mp.get_context('spawn').Pool(args.workers) as pool:
+            for done_cnt, run in enumerate(pool.imap_unordered(run_sweep_job, jobs), 1):
+                writer.writerow(run)
+                f.flush()
+                print(f'\r{done_cnt}/{len(jobs)} runs', end='', file=sys.stderr)
+
+    if jobs:
+        print(file=sys.stderr)
+
+    return [run for run in read_finished_runs(args.output) if has_settings(run, settings)]
+
+
+def none_last(value):
+    return math.inf if value is None else value
+
+
+def parse_value(text):
+    return float(text) if text else None
+
+
+# configurations of each graph sorted by the portion of runs which found a
+# path within the tolerance, then by their mean time to find it and then by
+# the mean quality of the best paths
+def rank_configurations(runs):
+    groups = {}
+    for run in runs:
+        key = (run['graph'],) + tuple(run[name] for name in SWEEP_PARAMETERS)
+        groups.setdefault(key, []).append(run)
+
+    rankings = {}
+    for key, group in groups.items():
+        times = [parse_value(run['time_to_tolerance']) for run in group]
+        rankings.setdefault(key[0], []).append({
+            **dict(zip(SWEEP_PARAMETERS, key[1:])),
+            'runs': len(group),
+            'success_rate': sum(time is not None for time in times) / len(group),
+            'mean_time_to_tolerance': mean(times),
+            'mean_iterations_to_tolerance': mean([parse_value(run['iterations_to_tolerance']) for run in group]),
+            'mean_quality': mean([parse_value(run['quality']) for run in group])
+        })
+
+    for configurations in rankings.values():
+        configurations.sort(key=lambda configuration: (-configuration['success_rate'], none_last(configuration['mean_time_to_tolerance']), none_last(configuration['mean_quality'])))
+
+    return rankings
+
+
+def format_value(value, width, precision):
+    return f'{"-":>{width}}' if value is None else f'{value:>{width}.{precision}f}'
+
+
+def print_rankings(rankings, top):
+    for graph_name, configurations in rankings.items():
+        print(f'{graph_name}:')
+        print(f'  {"alpha":>6} {"beta":>6} {"evap":>6} {"increment type":<15} {"strategy":<9} {"cand":>5} {"ls":>3} {"ants":>6} {"runs":>5} {"success":>8} {"time [s]":>9} {"iterations":>11} {"quality":>8}')
+
+        for configuration in configurations[:top]:
+            print(f'  {configuration["alpha"]:>6} {configuration["beta"]:>6} {configuration["evaporation"]:>6} {configuration["increment_type"]:<15} {configuration["strategy"]:<9} {configuration["candidates"]:>5} {configuration["local_search"]:>3} {configuration["ants"]:>6} {configuration["runs"]:>5} '
+                  f'{configuration["success_rate"]:>8.0%} {format_value(configuration["mean_time_to_tolerance"], 9, 3)} {format_value(configuration["mean_iterations_to_tolerance"], 11, 1)} {format_value(configuration["mean_quality"], 8, 3)}')
+
+
+if __name__ == '__main__':
+    parser = init_parser()
+    args = parser.parse_args()
+
+    try:
+        runs = run_sweep(args)
+    except ValueError as error:
+        parser.error(str(error))
+
+    print_rankings(rank_configurations(runs), args.top)
@@ -0,0 +1,64 @@
+# ******************************* validation.py *****************************
+#  Course: Soft Computing (SFC) - FIT BUT
+#  Project name: Shortest path search simulation using ACO
+#  Author: Beranek Tomas (xberan46)
+#  Date: 26.11.2022
+#  Up2date sources: https://github.com/TomasBeranek/but-sfc-project
+# ***************************************************************************
+
+
+import sys
+
+
+class bcolors:
+    HEADER = '\033[95m'
+    OKBLUE = '\033[94m'
+    OKCYAN = '\033[96m'
+    OKGREEN = '\033[92m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+    UNDERLINE = '\033[4m'
+
+
+def print_graph_error(message):
+    print(f'{bcolors.FAIL}ERROR{bcolors.ENDC}: {message}', file=sys.stderr)
+    sys.exit(1)
+
+
+# for long-running processes (the solver service), which must not exit
+# because of one invalid graph
+def raise_graph_error(message):
+    raise ValueError(message)
+
+
+# graph is checked in the input (JSON) format, before it is restructured
+def check_graph_correctness(graph):
+    node_ids = set()
+
+    for node in graph["nodes"]:
+        if node["id"] in node_ids:
+            print_graph_error(f'Multiple nodes have the same ID (ID: {node["id"]})!')
+        node_ids.add(node["id"])
+
+    if graph["start_node_id"] not in node_ids:
+        print_graph_error('Start node has invalid ID!')
+
+    if graph["end_node_id"] not in node_ids:
+        print_graph_error('End node has invalid ID!')
+
+    for edge in graph["edges"]:
+        node1 = edge["from_node_id"]
+        node2 = edge["to_node_id"]
+
+        if node1 == node2:
+            print_graph_error('Edges cannot start and end in the same node!')
+
+        if node1 not in node_ids:
+            print_graph_error(f'Edge is connected to a non-existing node (ID: {node1})!')
+
+        if node2 not in node_ids:
+            print_graph_error(f'Edge is connected to a non-existing node (ID: {node2})!')
+
+    return